@@ -0,0 +1,264 @@
+"""Autoplayer: searches every reachable placement and plays the best one.
+
+Boards are searched as lists of row bitmasks (the same layout as
+Board.row_masks), so trying a placement is a handful of integer operations
+instead of a copy of the game. Each candidate board is scored with the
+classic hand-tuned features: aggregate height, complete lines, holes and
+bumpiness.
+
+Run ``python ai.py [classic|boss] [games]`` for a headless soak test.
+"""
+import sys
+import time
+from collections import deque
+
+from engine import TetrisGame, GRID_WIDTH
+from shapes import SHAPES, ROTATION_COUNTS
+
+# Feature weights: aggregate height, lines, holes, bumpiness
+WEIGHTS = (-0.510066, 0.760666, -0.35663, -0.184483)
+
+# Score given to a board the next piece cannot even spawn on
+TOP_OUT = -1e9
+
+SPAWN_Y = 0
+
+# Time between the autoplayer's inputs, like a quick human
+INPUT_MS = 120
+
+# Moves are TetrisGame.apply_action names
+LEFT, RIGHT, ROTATE = 'left', 'right', 'rotate'
+
+
+def fits(rows, offsets, x, y, width=GRID_WIDTH):
+    """Same test as TetrisGame.fits, on a list of row masks"""
+    if x + offsets.min_x < 0 or x + offsets.max_x >= width or y + offsets.max_y >= len(rows):
+        return False
+    for dy, mask in offsets.row_masks:
+        if y + dy >= 0 and rows[y + dy] & (mask << x if x >= 0 else mask >> -x):
+            return False
+    return True
+
+
+def column_tops(rows, width=GRID_WIDTH):
+    """Highest filled row per column (len(rows) when empty)"""
+    tops = [len(rows)] * width
+    pending = (1 << width) - 1
+    for y, mask in enumerate(rows):
+        found = mask & pending
+        while found:
+            low = found & -found
+            tops[low.bit_length() - 1] = y
+            found ^= low
+        pending &= ~mask
+        if not pending:
+            break
+    return tops
+
+
+def placements(rows, shape, rotation, x, y, width=GRID_WIDTH):
+    """Every (rotation, x, landing row, moves) reachable by shifting and rotating at row y, then dropping"""
+    rotations = SHAPES[shape]
+    count = ROTATION_COUNTS[shape]
+    if not fits(rows, rotations[rotation], x, y, width):
+        return []
+
+    tops = column_tops(rows, width)
+    seen = {(rotation, x): ()}
+    queue = deque([(rotation, x)])
+    found = []
+    while queue:
+        rotation, x = queue.popleft()
+        moves = seen[rotation, x]
+        offsets = rotations[rotation]
+
+        # Drop straight down: from the column tops unless tucked under an overhang
+        landing = min(tops[x + dx] - 1 - dy for dx, dy in offsets.column_bottoms)
+        if y > landing:
+            landing = y
+            while fits(rows, offsets, x, landing + 1, width):
+                landing += 1
+        found.append((rotation, x, landing, moves))
+
+        for key, move in (((rotation, x - 1), LEFT), ((rotation, x + 1), RIGHT), (((rotation + 1) % count, x), ROTATE)):
+            if key not in seen and fits(rows, rotations[key[0]], key[1], y, width):
+                seen[key] = moves + (move,)
+                queue.append(key)
+    return found
+
+
+def place(rows, offsets, x, y, full_row):
+    """Board after locking offsets at (x, y) and clearing full rows, plus the number of rows cleared"""
+    rows = rows[:]
+    for dy, mask in offsets.row_masks:
+        if y + dy >= 0:
+            rows[y + dy] |= mask << x if x >= 0 else mask >> -x
+    kept = [row for row in rows if row != full_row]
+    cleared = len(rows) - len(kept)
+    if cleared:
+        kept[0:0] = [0] * cleared
+    return kept, cleared
+
+
+def evaluate(rows, lines, weights=WEIGHTS, width=GRID_WIDTH):
+    """Weighted sum of aggregate height, lines, holes and bumpiness"""
+    height = len(rows)
+    heights = [0] * width
+    covered = 0
+    holes = 0
+    for y, row in enumerate(rows):
+        new = row & ~covered
+        while new:
+            low = new & -new
+            heights[low.bit_length() - 1] = height - y
+            new ^= low
+        holes += bin(covered & ~row).count('1')
+        covered |= row
+    bumpiness = sum(abs(heights[i] - heights[i + 1]) for i in range(width - 1))
+    return weights[0] * sum(heights) + weights[1] * lines + weights[2] * holes + weights[3] * bumpiness
+
+
+class AutoPlayer:
+    """Chooses and plays a placement for each new piece.
+
+    The current piece's placements are all scored; the best beam_width of
+    them are then re-scored by the best placement of the next piece on
+    the resulting board. Lookahead stops early once time_budget seconds
+    have been spent on a move, keeping the best plan found so far. The
+    planned inputs are then played one every input_ms (all at once when it
+    is 0), and the plan is made again from wherever the piece is when
+    gravity has moved it or an input was blocked.
+    """
+    def __init__(self, beam_width=8, time_budget=0.05, lookahead=True, weights=WEIGHTS, input_ms=INPUT_MS):
+        self.beam_width = beam_width
+        self.time_budget = time_budget
+        self.lookahead = lookahead
+        self.weights = weights
+        self.input_ms = input_ms
+        self.planned_piece = None
+        # Row the current plan's moves were searched on
+        self.planned_y = None
+
+        # Planned inputs not played yet, and ms until the next one is due
+        self.queued = deque()
+        self.wait = 0
+
+        # Stats across all moves
+        self.evaluated = 0
+        self.search_time = 0.0
+
+    def choose(self, game):
+        """Best (rotation, x, landing row, moves) for the current piece, or None when it cannot move"""
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        board = game.board
+        rows = board.row_masks[:]
+        full_row = board.full_row
+        width = board.width
+        piece = game.current_piece
+
+        candidates = []
+        for placement in placements(rows, piece.shape, piece.rotation, piece.x, piece.y, width):
+            rotation, x, y, moves = placement
+            after, lines = place(rows, SHAPES[piece.shape][rotation], x, y, full_row)
+            candidates.append((evaluate(after, lines, self.weights, width), placement, after, lines))
+        self.evaluated += len(candidates)
+        if not candidates:
+            self.search_time += time.perf_counter() - start
+            return None
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        best_score, best = candidates[0][:2]
+        if self.lookahead and self.beam_width > 0:
+            best_score = None
+            next_shape = game.next_piece.shape
+            for score, placement, after, lines in candidates[:self.beam_width]:
+                follow = TOP_OUT
+                for rotation, x, y, moves in placements(after, next_shape, 0, width // 2 - 2, SPAWN_Y, width):
+                    board, more = place(after, SHAPES[next_shape][rotation], x, y, full_row)
+                    follow = max(follow, evaluate(board, lines + more, self.weights, width))
+                    self.evaluated += 1
+                if best_score is None or follow > best_score:
+                    best_score, best = follow, placement
+                if time.perf_counter() > deadline:
+                    break
+
+        self.search_time += time.perf_counter() - start
+        return best
+
+    def play(self, game, act=None, dt=0):
+        """Call once a frame, dt being the ms since the last call; returns True if it planned or played.
+
+        A new piece gets a plan, whose inputs (ending in a hard drop) are
+        then played one every input_ms, the first one right away. Inputs go
+        through act(action), game.apply_action by default, so they can be
+        recorded; act must return whether the input had any effect.
+        """
+        self.wait -= dt
+        piece = game.current_piece
+        acted = False
+        if piece is not self.planned_piece:
+            if not self.plan(game):
+                return False
+            self.wait = 0
+            acted = True
+        while self.queued and self.wait <= 0:
+            # Gravity has moved the piece since the plan was made, so its moves may no longer fit
+            if piece.y != self.planned_y and not self.plan(game):
+                break
+            self.wait = self.input_ms
+            acted = True
+            if not (act or game.apply_action)(self.queued.popleft()):
+                # Blocked after all: plan again from where the piece is, for the next input
+                self.plan(game)
+                break
+        return acted
+
+    def plan(self, game):
+        """Queue the inputs for the current piece's best placement; returns False if there are none"""
+        self.queued.clear()
+        # Full rows still on the board are about to shift everything down; wait for the clear
+        if game.pending_line_clears:
+            return False
+        self.planned_piece = game.current_piece
+        self.planned_y = game.current_piece.y
+
+        best = self.choose(game)
+        if best is None:
+            return False
+        self.queued.extend(best[3])
+        self.queued.append('hard_drop')
+        return True
+
+    def boards_per_second(self):
+        return self.evaluated / self.search_time if self.search_time else 0.0
+
+
+def play_game(boss_mode=False, seed=None, player=None, frame_ms=16, max_frames=30000):
+    """Let the autoplayer run one game headless at frame_ms per frame; returns its stats"""
+    player = player or AutoPlayer(input_ms=0)
+    game = TetrisGame(boss_mode, seed)
+    frames = 0
+    alive = True
+    while alive and not game.game_won and frames < max_frames:
+        player.play(game, dt=frame_ms)
+        alive = game.advance(frame_ms)
+        frames += 1
+    return {
+        'score': game.score,
+        'lines': game.lines_cleared,
+        'level': game.level,
+        'won': game.game_won,
+        'topped_out': not alive,
+        'boss_health': game.boss.health if game.boss else None,
+        'seconds': frames * frame_ms / 1000,
+    }
+
+
+if __name__ == '__main__':
+    boss_mode = len(sys.argv) > 1 and sys.argv[1] == 'boss'
+    games = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    player = AutoPlayer(input_ms=0)
+    for seed in range(games):
+        print(play_game(boss_mode, seed, player))
+    print(f"{player.boards_per_second():,.0f} boards evaluated per second")
@@ -0,0 +1,108 @@
+"""Sound effects and music: effects are decoded once and played through a reserved channel pool"""
+import pygame
+
+# Effect name -> (file, max simultaneous voices)
+SOUNDS = {
+    'line_clear': ('sfx/dropop.wav', 2),
+    'hard_drop': ('sfx/dblock.mp3', 3),
+}
+
+# Track name -> (candidate files, volume); the first file that loads is played
+MUSIC = {
+    'menu': (('music/menutet.mp3',), 0.4),
+    'classic': (('music/tetrizz.mp3',), 0.5),
+    'boss': (('music/TETrizzz.mp3', 'music/TetrizzLord.mp3'), 0.5),
+}
+
+CHANNELS = 8
+
+
+class AudioManager:
+    """Plays named effects and music tracks.
+
+    Every effect is decoded when the manager is created, so playing one never
+    touches the disk. Effects share CHANNELS reserved mixer channels; when a
+    sound already has its maximum number of voices, or every channel is
+    busy, the oldest voice is cut off and reused. Missing files and a missing
+    audio device are tolerated: the affected sounds are simply silent.
+    """
+    def __init__(self, channels=CHANNELS):
+        self.sounds = {}
+        self.limits = {}
+        self.channels = []
+        self.started = []
+        self.playing = []
+        self.clock = 0
+        self.track = None
+        self.enabled = pygame.mixer.get_init() is not None
+        if not self.enabled:
+            return
+
+        if pygame.mixer.get_num_channels() < channels:
+            pygame.mixer.set_num_channels(channels)
+        # Reserved channels are never picked by Sound.play(), so the pool is ours alone
+        pygame.mixer.set_reserved(channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.started = [0] * channels
+        self.playing = [None] * channels
+
+        for name, (path, limit) in SOUNDS.items():
+            try:
+                self.sounds[name] = pygame.mixer.Sound(path)
+            except (pygame.error, FileNotFoundError):
+                continue
+            self.limits[name] = limit
+
+    def play(self, name):
+        sound = self.sounds.get(name)
+        if sound is None:
+            return
+        index = self.pick_channel(name)
+        self.clock += 1
+        self.started[index] = self.clock
+        self.playing[index] = name
+        self.channels[index].play(sound)
+
+    def pick_channel(self, name):
+        """Channel for a new voice of name, stealing the oldest voice if needed"""
+        voices = []
+        free = None
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                if free is None:
+                    free = index
+            elif self.playing[index] == name:
+                voices.append(index)
+
+        if len(voices) >= self.limits[name]:
+            return min(voices, key=self.started.__getitem__)
+        if free is not None:
+            return free
+        return min(range(len(self.channels)), key=self.started.__getitem__)
+
+    def play_music(self, track):
+        """Switch to a looping music track; asking for the current track keeps it playing"""
+        if not self.enabled or track == self.track:
+            return
+        self.track = track
+        paths, volume = MUSIC[track]
+        for path in paths:
+            try:
+                pygame.mixer.music.load(path)
+            except (pygame.error, FileNotFoundError):
+                continue
+            pygame.mixer.music.play(-1)
+            pygame.mixer.music.set_volume(volume)
+            return
+        pygame.mixer.music.stop()
+
+
+_audio = None
+
+
+def get_audio():
+    """Shared manager, created on first use after pygame.init()"""
+    global _audio
+    if _audio is None:
+        _audio = AudioManager()
+    return _audio
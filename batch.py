@@ -0,0 +1,263 @@
+"""NumPy batched simulation: N independent classic-mode boards stepped in lockstep.
+
+Each call to BatchTetris.step places the current piece of every live board
+(rotate, shift, hard drop), locks it, clears full rows and updates score,
+level and fall speed using the same rules as engine.TetrisGame. All of it
+is done with array operations across the batch instead of a Python loop
+over TetrisGame instances.
+
+Run ``python batch.py`` for a differential check against the scalar engine
+followed by a quick throughput measurement.
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from board import EMPTY
+from engine import TetrisGame, GRID_WIDTH, GRID_HEIGHT, GARBAGE_CELL, FALL_SPEED_CURVE
+from shapes import SHAPES, SHAPE_NAMES, ROTATION_COUNTS
+
+# Scoring table and level curve shared with engine.TetrisGame.update
+SCORE_VALUES = np.array([0, 100, 300, 500, 800], dtype=np.int64)
+
+SPAWN_Y = 0
+
+# OFFSETS[shape, rotation, cell] -> (dx, dy); rotations past a shape's count wrap around
+OFFSETS = np.array([
+    [SHAPES[shape][rotation % ROTATION_COUNTS[shape]].cells for rotation in range(4)]
+    for shape in SHAPE_NAMES
+], dtype=np.int64)
+ROTATIONS = np.array([ROTATION_COUNTS[shape] for shape in SHAPE_NAMES], dtype=np.int64)
+
+
+def fall_speed_for_level(level):
+    start, step, fastest = FALL_SPEED_CURVE
+    return np.maximum(fastest, start - (level - 1) * step)
+
+
+class BatchTetris:
+    def __init__(self, count, width=GRID_WIDTH, height=GRID_HEIGHT, seed=None):
+        self.count = count
+        self.width = width
+        self.height = height
+        self.spawn_x = width // 2 - 2
+        self.rng = np.random.default_rng(seed)
+
+        # Cells use the same byte encoding as board.Board (palette index | CORRUPTED)
+        self.cells = np.zeros((count, height, width), dtype=np.uint8)
+        self.pieces = self.random_pieces(count)
+        self.next_pieces = self.random_pieces(count)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.lines_cleared = np.zeros(count, dtype=np.int64)
+        self.level = np.ones(count, dtype=np.int64)
+        self.fall_speed = fall_speed_for_level(self.level)
+        self.alive = np.ones(count, dtype=bool)
+
+    def reset(self, mask):
+        """Start fresh games on the boards selected by mask"""
+        boards = np.nonzero(mask)[0]
+        self.cells[boards] = EMPTY
+        self.pieces[boards] = self.random_pieces(len(boards))
+        self.next_pieces[boards] = self.random_pieces(len(boards))
+        self.score[boards] = 0
+        self.lines_cleared[boards] = 0
+        self.level[boards] = 1
+        self.fall_speed[boards] = fall_speed_for_level(self.level[boards])
+        self.alive[boards] = True
+
+    def random_pieces(self, count):
+        return self.rng.integers(0, len(SHAPE_NAMES), size=count)
+
+    def fits(self, boards, shapes, rotations, xs, ys):
+        """Vectorized collision check, one (shape, rotation, x, y) per board index"""
+        offsets = OFFSETS[shapes, rotations]
+        cx = xs[:, None] + offsets[..., 0]
+        cy = ys[:, None] + offsets[..., 1]
+        inside = (cx >= 0) & (cx < self.width) & (cy < self.height)
+        hit = self.cells[boards[:, None], np.clip(cy, 0, self.height - 1), np.clip(cx, 0, self.width - 1)] != EMPTY
+        hit &= cy >= 0
+        return inside.all(axis=1) & ~hit.any(axis=1)
+
+    def landing_rows(self, boards, shapes, rotations, xs, ys):
+        """Row where each piece stops when dropped straight down from ys"""
+        offsets = OFFSETS[shapes, rotations]
+        steps = np.arange(self.height + 1)
+        cx = xs[:, None, None] + offsets[:, None, :, 0]
+        cy = ys[:, None, None] + steps[None, :, None] + offsets[:, None, :, 1]
+        inside = (cx >= 0) & (cx < self.width) & (cy < self.height)
+        hit = self.cells[boards[:, None, None], np.clip(cy, 0, self.height - 1), np.clip(cx, 0, self.width - 1)] != EMPTY
+        hit &= cy >= 0
+        blocked = ~inside.all(axis=2) | hit.any(axis=2)
+        # First blocked step minus one is how far the piece can fall
+        return ys + np.argmax(blocked, axis=1) - 1
+
+    def step(self, rotations, xs):
+        """Place every live board's current piece.
+
+        rotations is the number of rotate presses, xs the target column; like
+        the keyboard, the piece rotates and shifts at the spawn row and stops
+        when blocked, then hard drops. Returns the lines cleared per board.
+        """
+        boards = np.nonzero(self.alive)[0]
+        shapes = self.pieces[boards]
+        targets = np.asarray(xs)[boards]
+        presses = np.asarray(rotations)[boards]
+        x = np.full(len(boards), self.spawn_x, dtype=np.int64)
+        y = np.full(len(boards), SPAWN_Y, dtype=np.int64)
+        rotation = np.zeros(len(boards), dtype=np.int64)
+
+        # Rotate at the spawn position
+        for press in range(int(presses.max(initial=0))):
+            want = presses > press
+            candidate = (rotation + 1) % ROTATIONS[shapes]
+            ok = want & self.fits(boards, shapes, candidate, x, y)
+            rotation = np.where(ok, candidate, rotation)
+
+        # Shift one column at a time towards the target
+        for _ in range(self.width):
+            direction = np.sign(targets - x)
+            if not direction.any():
+                break
+            ok = (direction != 0) & self.fits(boards, shapes, rotation, x + direction, y)
+            if not ok.any():
+                break
+            x = np.where(ok, x + direction, x)
+
+        # Hard drop: two points per row dropped
+        landing = self.landing_rows(boards, shapes, rotation, x, y)
+        self.score[boards] += 2 * (landing - y)
+
+        # Lock the pieces (cell value is the palette index, i.e. shape index + 1)
+        offsets = OFFSETS[shapes, rotation]
+        self.cells[boards[:, None], landing[:, None] + offsets[..., 1], x[:, None] + offsets[..., 0]] = (shapes + 1)[:, None]
+
+        cleared = np.zeros(self.count, dtype=np.int64)
+        cleared[boards] = self.clear_lines(boards)
+
+        # Spawn the next pieces and check for game over
+        self.pieces[boards] = self.next_pieces[boards]
+        self.next_pieces[boards] = self.random_pieces(len(boards))
+        spawn_ok = self.fits(boards, self.pieces[boards], np.zeros(len(boards), dtype=np.int64),
+                             np.full(len(boards), self.spawn_x), np.full(len(boards), SPAWN_Y))
+        self.alive[boards] = spawn_ok
+        return cleared
+
+    def clear_lines(self, boards):
+        """Remove full rows on the given boards and apply scoring/leveling"""
+        full = (self.cells[boards] != EMPTY).all(axis=2)
+        counts = full.sum(axis=1)
+        hit = counts > 0
+        if hit.any():
+            rows = boards[hit]
+            # Stable sort puts full rows on top and keeps the rest in order
+            order = np.argsort(~full[hit], axis=1, kind='stable')
+            compacted = np.take_along_axis(self.cells[rows], order[:, :, None], axis=1)
+            compacted[np.arange(self.height)[None, :] < counts[hit][:, None]] = EMPTY
+            self.cells[rows] = compacted
+
+            self.score[rows] += SCORE_VALUES[np.minimum(counts[hit], 4)] * self.level[rows]
+            self.lines_cleared[rows] += counts[hit]
+            self.level[rows] = self.lines_cleared[rows] // 10 + 1
+            self.fall_speed[rows] = fall_speed_for_level(self.level[rows])
+        return counts
+
+    def add_garbage_lines(self, counts):
+        """Push counts[i] garbage rows (80% filled, at least one gap) into board i"""
+        counts = np.asarray(counts, dtype=np.int64) * self.alive
+        for count in np.unique(counts[counts > 0]).tolist():
+            rows = np.nonzero(counts == count)[0]
+            garbage = np.where(self.rng.random((len(rows), count, self.width)) < 0.8, GARBAGE_CELL, EMPTY).astype(np.uint8)
+            gaps = self.rng.integers(0, self.width, size=(len(rows), count))
+            garbage[np.arange(len(rows))[:, None], np.arange(count)[None, :], gaps] = EMPTY
+            self.cells[rows] = np.concatenate([self.cells[rows][:, count:], garbage], axis=1)
+
+
+def lowest_placements(batch):
+    """Pick, per board, the rotation/column whose straight drop lands deepest"""
+    boards = np.arange(batch.count)
+    best = np.full(batch.count, -1)
+    rotations = np.zeros(batch.count, dtype=np.int64)
+    xs = np.full(batch.count, batch.spawn_x, dtype=np.int64)
+    spawn_y = np.full(batch.count, SPAWN_Y)
+    for rotation in range(4):
+        for x in range(-2, batch.width):
+            candidate_rotation = np.full(batch.count, rotation) % ROTATIONS[batch.pieces]
+            candidate_x = np.full(batch.count, x)
+            ok = batch.fits(boards, batch.pieces, candidate_rotation, candidate_x, spawn_y)
+            depth = np.where(ok, batch.landing_rows(boards, batch.pieces, candidate_rotation, candidate_x, spawn_y)
+                             + OFFSETS[batch.pieces, candidate_rotation, :, 1].max(axis=1), -1)
+            better = depth > best
+            best = np.where(better, depth, best)
+            rotations = np.where(better, rotation, rotations)
+            xs = np.where(better, x, xs)
+    return rotations, xs
+
+
+def differential_check(games=64, placements=400, seed=0):
+    """Play the same placements on TetrisGame and BatchTetris and compare every step"""
+    random.seed(seed)
+    choices = np.random.default_rng(seed)
+    scalar = [TetrisGame() for _ in range(games)]
+    batch = BatchTetris(games, seed=seed)
+    for i, game in enumerate(scalar):
+        # Skip the initial line clear animation delay so clears happen on the next update
+        game.animation_time = 301
+        batch.pieces[i] = SHAPE_NAMES.index(game.current_piece.shape)
+        batch.next_pieces[i] = SHAPE_NAMES.index(game.next_piece.shape)
+
+    for step in range(placements):
+        rotations, xs = lowest_placements(batch)
+        # Mix in random moves so blocked paths and top-outs get exercised too
+        wild = choices.random(games) < 0.05
+        rotations = np.where(wild, choices.integers(0, 4, size=games), rotations)
+        xs = np.where(wild, choices.integers(-2, GRID_WIDTH, size=games), xs)
+        live = batch.alive.copy()
+        batch.step(rotations, xs)
+
+        for i, game in enumerate(scalar):
+            if not live[i]:
+                continue
+            for _ in range(rotations[i]):
+                game.rotate_piece()
+            while game.current_piece.x != xs[i] and game.move_piece(1 if xs[i] > game.current_piece.x else -1, 0):
+                pass
+            before = game.current_piece
+            game.hard_drop()
+            alive = True
+            if game.current_piece is before:
+                # Zero-distance hard drops leave the piece for gravity to lock
+                alive = game.update(game.fall_speed)
+            if alive:
+                alive = game.update(0) and game.is_valid_position(game.current_piece)
+
+            assert alive == batch.alive[i], (step, i, 'alive')
+            if not alive:
+                # A topped-out TetrisGame never resolves its last pending clear
+                continue
+            board = np.array([list(game.board.row(y)) for y in range(GRID_HEIGHT)], dtype=np.uint8)
+            assert (board == batch.cells[i]).all(), (step, i, 'cells')
+            assert game.score == batch.score[i], (step, i, game.score, batch.score[i])
+            assert game.level == batch.level[i] and game.lines_cleared == batch.lines_cleared[i], (step, i)
+            assert game.base_fall_speed == batch.fall_speed[i], (step, i)
+            batch.next_pieces[i] = SHAPE_NAMES.index(game.next_piece.shape)
+    return int(batch.lines_cleared.sum())
+
+
+if __name__ == '__main__':
+    lines = differential_check()
+    print(f"differential check passed ({lines} lines cleared)")
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    batch = BatchTetris(count, seed=1)
+    rng = np.random.default_rng(1)
+    placed = 0
+    start = time.perf_counter()
+    for _ in range(200):
+        placed += int(batch.alive.sum())
+        batch.step(rng.integers(0, 4, size=count), rng.integers(-2, GRID_WIDTH, size=count))
+        batch.add_garbage_lines(rng.random(count) < 0.01)
+        batch.reset(~batch.alive)
+    elapsed = time.perf_counter() - start
+    print(f"{placed / elapsed:,.0f} placements/s across {count} boards")
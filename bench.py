@@ -0,0 +1,344 @@
+"""Benchmarks for the engine and renderer hot paths.
+
+Each scenario builds a seeded game (and a GameView drawing to an offscreen
+surface under the dummy SDL drivers) and times the hot paths on it:
+collision checks, locking a piece, a frame of TetrisGame.advance, the board
+layer and a full frame draw. Results are written as JSON; ``--compare``
+checks them against a stored baseline and exits with status 1 when any
+timing got slower than the threshold allows. Comparisons use the fastest
+batch by default, which is far less sensitive to a busy machine than the
+median.
+
+``--scaling`` instead times the engine on boards from the default 10x20 up
+to 128x1000: hard dropping an I piece that clears four rows, pushing a
+garbage row and collision checks. Only what a row of cells costs should
+grow with the board (pushing garbage is linear in the width); nothing
+should grow with its height.
+
+    python bench.py --out bench.json
+    python bench.py --compare bench.json [--threshold 0.2]
+    python bench.py --scaling [--out scaling.json]
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import copy
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+import pygame
+
+from engine import TetrisGame, Tetromino, PALETTE, GARBAGE_CELL, TETROMINO_COLORS
+from board import CORRUPTED
+from shapes import SHAPES
+
+# Seconds spent timing each benchmark, and how many batches that time is split into
+MIN_TIME = 0.3
+BATCHES = 15
+
+SEED = 1234
+
+# Board sizes (width, height) timed by --scaling
+BOARD_SIZES = ((10, 20), (16, 40), (32, 100), (64, 400), (128, 1000))
+
+
+def fill_rows(game, rows, rng, corrupted=0.0):
+    """Fill the bottom `rows` rows with random blocks, leaving one gap per row"""
+    board = game.board
+    for y in range(board.height - rows, board.height):
+        gap = rng.randrange(board.width)
+        for x in range(board.width):
+            if x != gap:
+                cell = rng.randrange(1, len(PALETTE) - 1)
+                if rng.random() < corrupted:
+                    cell |= CORRUPTED
+                board.set(x, y, cell)
+
+
+def scenario_empty():
+    return TetrisGame(False, SEED), None
+
+
+def scenario_half_full():
+    game = TetrisGame(False, SEED)
+    fill_rows(game, game.board.height // 2, random.Random(SEED))
+    return game, None
+
+
+def scenario_nearly_topped_out():
+    game = TetrisGame(False, SEED)
+    fill_rows(game, game.board.height - 4, random.Random(SEED))
+    return game, None
+
+
+def scenario_boss_phase3():
+    """Phase 3 boss with every attack effect running at once"""
+    game = TetrisGame(True, SEED)
+    fill_rows(game, 8, random.Random(SEED), corrupted=0.3)
+    game.add_garbage_lines(2)
+    boss = game.boss
+    boss.take_damage(70)
+    boss.stun_timer = 0
+    boss.attack_timer = boss.attack_cooldown * 0.9
+    boss.shake_intensity = 3
+    boss.shake_timer = 10 ** 9
+    game.speed_boost_timer = 10 ** 9
+    game.time_pressure_timer = 10 ** 9
+    game.boss_attacks_active.append('piece_corruption')
+    game.next_piece.is_corrupted = True
+    return game, None
+
+
+def scenario_particle_storm():
+    """Board right after a run of tetrises, with the particle pool full of debris"""
+    game = TetrisGame(False, SEED)
+    fill_rows(game, 6, random.Random(SEED))
+
+    def storm(view):
+        view.particles.rng = np.random.default_rng(SEED)
+        board = game.board
+        rows = list(range(board.height - 4, board.height))
+        for _ in range(8):
+            for y in rows:
+                for x in range(board.width):
+                    if not game.board.is_filled(x, y):
+                        game.board.set(x, y, GARBAGE_CELL)
+            view.on_lines_full(rows)
+            for _ in range(5):
+                view.update(16)
+    return game, storm
+
+
+SCENARIOS = {
+    'empty': scenario_empty,
+    'half_full': scenario_half_full,
+    'nearly_topped_out': scenario_nearly_topped_out,
+    'boss_phase3': scenario_boss_phase3,
+    'particle_storm': scenario_particle_storm,
+}
+
+
+def measure(call, setup=None, min_time=MIN_TIME, batches=BATCHES):
+    """Per-call timings in microseconds; setup() runs untimed before every call"""
+    # Calibrate how many calls make up one batch
+    start = time.perf_counter()
+    calls = 0
+    while time.perf_counter() - start < min_time / batches / 4 or calls < 1:
+        if setup:
+            setup()
+        call()
+        calls += 1
+    per_batch = max(1, int(calls * 4))
+
+    samples = []
+    for _ in range(batches):
+        elapsed = 0.0
+        for _ in range(per_batch):
+            if setup:
+                setup()
+            begin = time.perf_counter()
+            call()
+            elapsed += time.perf_counter() - begin
+        samples.append(elapsed / per_batch * 1e6)
+    return {
+        'median_us': round(statistics.median(samples), 3),
+        'min_us': round(min(samples), 3),
+        'mean_us': round(statistics.fmean(samples), 3),
+        'calls': per_batch * batches,
+    }
+
+
+def bench_scenario(name, build, min_time):
+    from main import GameView, WINDOW_WIDTH, WINDOW_HEIGHT
+
+    game, prepare_view = build()
+    surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)).convert()
+    results = {}
+
+    # Collision checks for every column of the current piece, as movement and the AI do
+    piece = game.current_piece
+    xs = range(-2, game.board.width)
+    results['is_valid_position'] = measure(
+        lambda: [game.is_valid_position(piece, x - piece.x, 0) for x in xs], min_time=min_time)
+    results['is_valid_position']['checks_per_call'] = len(xs)
+
+    # Locking the current piece where it lands, putting the board back after every call
+    state = {'game': copy.deepcopy(game)}
+    locked = state['game']
+    dropped = copy.copy(locked.current_piece)
+    dropped.y = locked.landing_row(dropped.shape, dropped.rotation, dropped.x, dropped.y)
+    board = locked.board
+    saved = board.snapshot()
+
+    def restore_board():
+        board.restore(saved)
+        locked.pending_line_clears = []
+        locked.line_clear_animation = []
+    results['place_piece'] = measure(lambda: locked.place_piece(dropped), setup=restore_board, min_time=min_time)
+
+    # One 16 ms frame; the game restarts from the scenario every 60 frames so it cannot drift far
+    state['frames'] = 0
+
+    def next_frame():
+        if state['frames'] % 60 == 0:
+            state['game'] = copy.deepcopy(game)
+        state['frames'] += 1
+    results['update'] = measure(lambda: state['game'].advance(16), setup=next_frame, min_time=min_time)
+
+    # Rendering
+    view = GameView(game)
+    if prepare_view:
+        prepare_view(view)
+    view.draw_full(surface)
+    results['draw_grid'] = measure(lambda: view.draw_grid(surface), min_time=min_time)
+
+    def invalidate_layer():
+        view.board_layer_key = None
+    results['draw_grid_rebuild'] = measure(lambda: view.draw_grid(surface), setup=invalidate_layer,
+                                           min_time=min_time)
+    results['draw'] = measure(lambda: view.draw_full(surface), min_time=min_time)
+
+    dirty_view = GameView(game, dirty_rects=True)
+    if prepare_view:
+        prepare_view(dirty_view)
+    dirty_view.draw(surface)
+    results['draw_dirty'] = measure(lambda: dirty_view.draw(surface), min_time=min_time)
+    return results
+
+
+def bench_board_size(width, height, min_time):
+    """Engine timings on an empty width x height board, bar four bottom rows waiting for an I piece"""
+    game = TetrisGame(False, SEED, width, height)
+    gap = width // 2
+    for y in range(height - 4, height):
+        for x in range(width):
+            if x != gap:
+                game.board.set(x, y, GARBAGE_CELL)
+    # A vertical I above the gap, with the line clear animation already over
+    rotation = next(r for r, offsets in enumerate(SHAPES['I']) if offsets.min_x == offsets.max_x)
+    piece = Tetromino('I', TETROMINO_COLORS['I'], width)
+    piece.rotation = rotation
+    piece.x = gap - SHAPES['I'][rotation].min_x
+    game.current_piece = piece
+    game.animation_time = 301
+    saved = game.snapshot()
+    results = {}
+
+    def clear_four():
+        game.hard_drop()
+        game.update_line_clears(0)
+    results['hard_drop_tetris'] = measure(clear_four, setup=lambda: game.restore(saved), min_time=min_time)
+    results['push_garbage_row'] = measure(lambda: game.add_garbage_lines(1), setup=lambda: game.restore(saved),
+                                          min_time=min_time)
+
+    # Collision checks around the spawn point and down on the stack
+    game.restore(saved)
+    spots = [(x, y) for x in range(gap - 4, gap + 4) for y in (0, height - 6)]
+    results['fits'] = measure(lambda: [game.fits('T', 0, x, y) for x, y in spots], min_time=min_time)
+    results['fits']['checks_per_call'] = len(spots)
+    return results
+
+
+def new_report():
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': {},
+    }
+
+
+def run(scenarios=None, min_time=MIN_TIME):
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    report = new_report()
+    for name in scenarios or SCENARIOS:
+        report['results'][name] = bench_scenario(name, SCENARIOS[name], min_time)
+    return report
+
+
+def run_scaling(min_time=MIN_TIME):
+    """Results are named board_<width>x<height>, so --compare works on them too"""
+    report = new_report()
+    for width, height in BOARD_SIZES:
+        report['results'][f'board_{width}x{height}'] = bench_board_size(width, height, min_time)
+    return report
+
+
+def print_scaling(report):
+    names = list(next(iter(report['results'].values())))
+    print(f"{'board':<20}" + ''.join(f"{name + ' us':>22}" for name in names))
+    for board, results in report['results'].items():
+        print(f"{board:<20}" + ''.join(f"{results[name]['min_us']:>22.2f}" for name in names))
+
+
+def compare(report, baseline, threshold, stat='min_us'):
+    """Print each timing against the baseline; returns the list of regressions"""
+    regressions = []
+    print(f"{'scenario':<20} {'benchmark':<20} {'baseline us':>12} {'now us':>12} {'change':>8}")
+    for scenario, results in report['results'].items():
+        for name, result in results.items():
+            old = baseline['results'].get(scenario, {}).get(name)
+            if old is None:
+                print(f"{scenario:<20} {name:<20} {'-':>12} {result[stat]:>12.2f}      new")
+                continue
+            change = result[stat] / old[stat] - 1
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append((scenario, name, change))
+            print(f"{scenario:<20} {name:<20} {old[stat]:>12.2f} {result[stat]:>12.2f} "
+                  f"{change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--out', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare against a stored JSON result')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative slowdown counted as a regression (default 0.2)')
+    parser.add_argument('--stat', default='min_us', choices=('min_us', 'median_us', 'mean_us'),
+                        help='statistic compared against the baseline (default min_us)')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='only run this scenario (repeatable)')
+    parser.add_argument('--min-time', type=float, default=MIN_TIME, help='seconds spent per benchmark')
+    parser.add_argument('--scaling', action='store_true', help='time the engine across board sizes instead')
+    args = parser.parse_args()
+
+    if args.scaling:
+        report = run_scaling(args.min_time)
+        if not args.compare:
+            print_scaling(report)
+    else:
+        report = run(args.scenario, args.min_time)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.stat)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+    elif not args.out and not args.scaling:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""Packed board storage shared by the game and the simulation tools"""
+
+# Cell byte layout: low 7 bits are a palette index (0 = empty), top bit marks corruption
+EMPTY = 0
+CORRUPTED = 0x80
+PALETTE_MASK = 0x7F
+
+
+class Board:
+    """Grid of palette-indexed cells stored in a single bytearray.
+
+    Rows are addressed through a row-pointer table (``_rows``), so clearing
+    or pushing k rows only moves k row offsets around; the cell bytes of the
+    surviving rows are never copied. ``row_masks`` is the bitboard mirror of
+    the cells: bit x of ``row_masks[y]`` is set when (x, y) is occupied.
+    ``column_tops[x]`` is the row of the highest filled cell in column x
+    (``height`` when the column is empty).
+    ``version`` is bumped by every mutation so renderers can cache the board.
+    It only ever grows, restore() included, so a version never names two
+    different boards.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.full_row = (1 << width) - 1
+        self.cells = bytearray(width * height)
+        self._rows = [y * width for y in range(height)]
+        self.row_masks = [0] * height
+        self.column_tops = [height] * width
+        self._empty_row = bytes(width)
+        self.version = 0
+        self._snapshot = None
+        self._snapshot_version = -1
+
+    def get(self, x, y):
+        return self.cells[self._rows[y] + x]
+
+    def is_filled(self, x, y):
+        return (self.row_masks[y] >> x) & 1 == 1
+
+    def set(self, x, y, value):
+        self.cells[self._rows[y] + x] = value
+        self.version += 1
+        if value:
+            self.row_masks[y] |= 1 << x
+            if y < self.column_tops[x]:
+                self.column_tops[x] = y
+        else:
+            self.row_masks[y] &= ~(1 << x)
+            if y == self.column_tops[x]:
+                # Walk down to the next filled cell in this column
+                bit = 1 << x
+                top = y + 1
+                while top < self.height and not self.row_masks[top] & bit:
+                    top += 1
+                self.column_tops[x] = top
+
+    def row_offsets(self):
+        """Offset into cells of each logical row, top to bottom (do not modify)"""
+        return self._rows
+
+    def row(self, y):
+        """Read-only bytes of logical row y"""
+        start = self._rows[y]
+        return bytes(self.cells[start:start + self.width])
+
+    def is_row_full(self, y):
+        return self.row_masks[y] == self.full_row
+
+    def clear_rows(self, rows):
+        """Remove the given rows; everything above drops down and empty rows appear on top"""
+        self._clear_column_tops(rows)
+        freed = []
+        for y in sorted(rows, reverse=True):
+            freed.append(self._rows.pop(y))
+            del self.row_masks[y]
+
+        for start in freed:
+            self.cells[start:start + self.width] = self._empty_row
+        self._rows[0:0] = freed
+        self.row_masks[0:0] = [0] * len(freed)
+        self.version += 1
+
+    def push_row(self, values):
+        """Drop the top row and append a new bottom row (values: one cell byte per column)"""
+        mask = sum(1 << x for x, value in enumerate(values) if value)
+        self._push_column_tops(mask)
+        start = self._rows.pop(0)
+        self.row_masks.pop(0)
+        self.cells[start:start + self.width] = bytes(values)
+        self._rows.append(start)
+        self.row_masks.append(mask)
+        self.version += 1
+
+    def set_row(self, y, values):
+        """Overwrite logical row y (values: one cell byte per column)"""
+        start = self._rows[y]
+        self.cells[start:start + self.width] = bytes(values)
+        mask = sum(1 << x for x, value in enumerate(values) if value)
+        changed = self.row_masks[y] ^ mask
+        self.row_masks[y] = mask
+        self.version += 1
+        tops = self.column_tops
+        while changed:
+            low = changed & -changed
+            changed ^= low
+            x = low.bit_length() - 1
+            if mask & low:
+                tops[x] = min(tops[x], y)
+            elif tops[x] == y:
+                top = y + 1
+                while top < self.height and not self.row_masks[top] & low:
+                    top += 1
+                tops[x] = top
+
+    def dump(self):
+        """Every cell as bytes, rows top to bottom"""
+        cells, width = self.cells, self.width
+        return b''.join(cells[start:start + width] for start in self._rows)
+
+    def load(self, data):
+        """Replace every cell from a dump()"""
+        width = self.width
+        self.cells[:] = data
+        self._rows[:] = range(0, width * self.height, width)
+        self.row_masks[:] = [sum(1 << x for x in range(width) if data[start + x]) for start in self._rows]
+        self._update_column_tops()
+        self.version += 1
+
+    def snapshot(self):
+        """Immutable copy of the board; the same object is returned until the board changes"""
+        if self._snapshot_version != self.version:
+            self._snapshot = (bytes(self.cells), tuple(self._rows), tuple(self.row_masks), tuple(self.column_tops))
+            self._snapshot_version = self.version
+        return self._snapshot
+
+    def restore(self, snapshot):
+        """Put the board back to a snapshot() of it"""
+        cells, rows, masks, tops = snapshot
+        # In place, since callers hold on to row_offsets() and row_masks
+        self.cells[:] = cells
+        self._rows[:] = rows
+        self.row_masks[:] = masks
+        self.column_tops[:] = tops
+        self.version += 1
+        self._snapshot = snapshot
+        self._snapshot_version = self.version
+
+    def _clear_column_tops(self, rows):
+        """Move column_tops to where they will be once rows are removed; call before removing them.
+
+        Only columns whose top cell is in a removed row are searched, and only
+        down to their next surviving cell, so the cost does not grow with the
+        empty part of a tall board.
+        """
+        removed = set(rows)
+        masks = self.row_masks
+        height = self.height
+        tops = self.column_tops
+
+        def below(y):
+            # Removed rows under y, i.e. how far the row at y drops
+            return sum(1 for row in removed if row > y)
+
+        for x, top in enumerate(tops):
+            if top == height:
+                continue
+            if top not in removed:
+                tops[x] = top + below(top)
+                continue
+            bit = 1 << x
+            y = top + 1
+            while y < height and (y in removed or not masks[y] & bit):
+                y += 1
+            tops[x] = y + below(y) if y < height else height
+
+    def _push_column_tops(self, mask):
+        """Move column_tops up a row for push_row of a bottom row with this mask; call before pushing"""
+        masks = self.row_masks
+        height = self.height
+        tops = self.column_tops
+        for x, top in enumerate(tops):
+            if top == height:
+                tops[x] = height - 1 if mask >> x & 1 else height
+            elif top:
+                tops[x] = top - 1
+            else:
+                # The top cell is pushed out: find the next one down
+                bit = 1 << x
+                y = 1
+                while y < height and not masks[y] & bit:
+                    y += 1
+                tops[x] = y - 1 if y < height else (height - 1 if mask & bit else height)
+
+    def _update_column_tops(self):
+        """Recompute column_tops from the row masks, stopping once every column is found"""
+        tops = self.column_tops
+        tops[:] = [self.height] * self.width
+        pending = self.full_row
+        for y, mask in enumerate(self.row_masks):
+            found = mask & pending
+            while found:
+                low = found & -found
+                tops[low.bit_length() - 1] = y
+                found ^= low
+            pending &= ~mask
+            if not pending:
+                break
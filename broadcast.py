@@ -0,0 +1,529 @@
+"""Compact binary delta stream of a TetrisGame, for spectators and stream overlays.
+
+An Encoder watches one game and, called after every tick (or every frame),
+returns one frame holding only what changed since the last frame. A
+Decoder applies frames to a mirror TetrisGame that is only drawn, never
+simulated (see watch()). Every KEYFRAME_TICKS ticks, and whenever
+Encoder.keyframe() is called (e.g. a spectator joined), a keyframe carries
+the whole state, so a decoder can pick up the stream at any keyframe.
+
+Frame layout, little endian: u8 flags, u8 ticks since the previous frame,
+then one section per flag, in this order:
+
+    KEYFRAME  u16 width, u16 height; the board is empty apart from the rows sent
+    SHIFT     u8 n, then n ops: a row list     rows cleared (Board.clear_rows)
+                                0x80 | k       k empty rows pushed in from the bottom (k <= 127)
+    ROWS      u16 n, u16 width, then n times u16 row + width cell bytes
+    PIECE     u8 shape | rotation << 3 | corrupted << 5, i16 x, i16 y
+    NEXT      u8 shape | corrupted << 5
+    STATS     u64 score, u32 level, u32 lines
+    BOSS      u8 health, u8 phase
+    EFFECTS   u8 EFFECT_NAMES bits, row list of the rows flashing before a clear
+
+A row list is a u8 count (below 0x80) followed by that many u16 rows.
+
+Line clears and garbage travel as SHIFT ops rather than as the rows they
+move, so only rows that still differ afterwards are sent and a clear
+costs a few bytes instead of the whole stack. Frames are self-delimiting
+and can be concatenated. A tick that changes nothing produces no frame;
+an empty frame carries the time once MAX_TICKS ticks have gone by. Longer
+pushes are split into several ops, and a frame that would need more than
+MAX_OPS ops is sent as a keyframe instead.
+
+    python broadcast.py --check          encode autoplayer games, verify every decoded tick, report bandwidth
+    python broadcast.py watch REPLAY     play a replay through the encoder and draw what a spectator decodes
+"""
+import random
+import struct
+import sys
+import time
+
+from engine import TetrisGame, Tetromino, GRID_WIDTH, GRID_HEIGHT, TICK_MS, TETROMINO_COLORS, CORRUPTION_COLOR
+from shapes import SHAPE_NAMES
+
+# Frame flags, which are also the order of the sections
+KEYFRAME = 0x01
+SHIFT = 0x02
+ROWS = 0x04
+PIECE = 0x08
+NEXT = 0x10
+STATS = 0x20
+BOSS = 0x40
+EFFECTS = 0x80
+
+# SHIFT op byte for pushed rows; a clear op is a row list, whose count byte is below this
+PUSH = 0x80
+
+# Most rows one push op can carry, and most ops one SHIFT section can carry
+MAX_PUSH = 0x7F
+MAX_OPS = 255
+
+# Ticks between keyframes (five seconds)
+KEYFRAME_TICKS = 500
+
+# Most ticks one frame header can carry
+MAX_TICKS = 255
+
+# Bits of the EFFECTS section, lowest first
+EFFECT_NAMES = ('speed_boost', 'time_pressure', 'piece_corruption', 'grid_shake', 'stunned', 'attack_warning')
+
+SHAPE_INDEX = {shape: index for index, shape in enumerate(SHAPE_NAMES)}
+
+HEADER = struct.Struct('<BB')
+SIZE = struct.Struct('<HH')
+ROW = struct.Struct('<H')
+ROWS_HEADER = struct.Struct('<HH')
+PIECE_STRUCT = struct.Struct('<Bhh')
+STATS_STRUCT = struct.Struct('<QII')
+BOSS_STRUCT = struct.Struct('<BB')
+
+
+def pack_rows(rows):
+    return bytes((len(rows),)) + struct.pack(f'<{len(rows)}H', *rows)
+
+
+def unpack_rows(data, offset):
+    """The row list at offset, and the offset after it"""
+    count = data[offset]
+    return list(struct.unpack_from(f'<{count}H', data, offset + 1)), offset + 1 + 2 * count
+
+
+def piece_code(piece):
+    return SHAPE_INDEX[piece.shape] | piece.rotation << 3 | piece.is_corrupted << 5
+
+
+def effect_bits(game):
+    bits = ((game.speed_boost_timer > 0) | (game.time_pressure_timer > 0) << 1
+            | ('piece_corruption' in game.boss_attacks_active) << 2)
+    boss = game.boss
+    if boss:
+        warning = boss.attack_timer > boss.attack_cooldown * 0.8 and not boss.is_stunned
+        bits |= (boss.shake_timer > 0) << 3 | boss.is_stunned << 4 | warning << 5
+    return bits
+
+
+def visible_state(game):
+    """Everything frames carry about a game, for comparing a decoded game with its source"""
+    piece = game.current_piece
+    boss = game.boss
+    return (game.board.dump(), (piece_code(piece), piece.x, piece.y), piece_code(game.next_piece),
+            (game.score, game.level, game.lines_cleared), (boss.health, boss.phase) if boss else None,
+            effect_bits(game), tuple(game.line_clear_animation))
+
+
+class Encoder:
+    """Turns what changes in one TetrisGame into frames; call encode() after every tick or frame"""
+    def __init__(self, game, keyframe_ticks=KEYFRAME_TICKS):
+        self.game = game
+        self.keyframe_ticks = keyframe_ticks
+        board = game.board
+        self.empty_row = bytes(board.width)
+
+        # The board as the decoder has it, one bytes object per row
+        self.rows = [self.empty_row] * board.height
+        self.board_version = -1
+        # SHIFT ops since the last frame, already applied to self.rows
+        self.ops = []
+        self.full_rows = []
+        # Last value sent of each section
+        self.piece = self.next = self.stats = self.boss = self.effects = None
+
+        self.time = game.animation_time
+        self.ticks = 0
+        self.since_keyframe = 0
+        self.want_keyframe = True
+
+        self.bytes_sent = 0
+        self.frames = 0
+        self.keyframes = 0
+
+        game.subscribe('lines_full', self.on_lines_full)
+        game.subscribe('line_cleared', self.on_line_cleared)
+        game.subscribe('garbage_added', self.on_garbage_added)
+
+    def on_lines_full(self, rows):
+        self.full_rows = list(rows)
+
+    def on_line_cleared(self, count):
+        rows = self.full_rows
+        for y in sorted(rows, reverse=True):
+            del self.rows[y]
+        self.rows[0:0] = [self.empty_row] * len(rows)
+        self.ops.append(pack_rows(rows))
+
+    def on_garbage_added(self, count):
+        # More rows than the board has push every row out
+        self.rows = (self.rows + [self.empty_row] * min(count, len(self.rows)))[-len(self.rows):]
+        while count:
+            rows = min(count, MAX_PUSH)
+            self.ops.append(bytes((PUSH | rows,)))
+            count -= rows
+
+    def keyframe(self):
+        """Make the next frame a keyframe, e.g. because a spectator joined"""
+        self.want_keyframe = True
+
+    def encode(self):
+        """The frame for everything since the last call; b'' when there is nothing to send yet"""
+        game = self.game
+        # The game clock only moves forward while it runs; restore() can take it back
+        elapsed = max(0, (game.animation_time - self.time) // TICK_MS)
+        self.time = game.animation_time
+        self.ticks += elapsed
+        self.since_keyframe += elapsed
+
+        out = []
+        while self.ticks > MAX_TICKS:
+            out.append(HEADER.pack(0, MAX_TICKS))
+            self.ticks -= MAX_TICKS
+
+        # Too many ops for one SHIFT section: sending the whole board instead is cheaper anyway
+        key = self.want_keyframe or self.since_keyframe >= self.keyframe_ticks or len(self.ops) > MAX_OPS
+        parts = []
+        if key:
+            flags = KEYFRAME
+            parts.append(SIZE.pack(game.board.width, game.board.height))
+            self.rows = [self.empty_row] * len(self.rows)
+            self.board_version = -1
+            self.ops = []
+            self.want_keyframe = False
+            self.since_keyframe = 0
+            self.keyframes += 1
+        else:
+            flags = 0
+            if self.ops:
+                flags |= SHIFT
+                parts.append(bytes((len(self.ops),)))
+                parts.extend(self.ops)
+                self.ops = []
+
+        board = game.board
+        if board.version != self.board_version:
+            self.board_version = board.version
+            changed = self.changed_rows(board.dump(), board.width)
+            if changed:
+                flags |= ROWS
+                parts.append(ROWS_HEADER.pack(len(changed), board.width))
+                parts.extend(changed)
+
+        piece = game.current_piece
+        value = (piece_code(piece), piece.x, piece.y)
+        if key or value != self.piece:
+            flags |= PIECE
+            parts.append(PIECE_STRUCT.pack(*value))
+            self.piece = value
+
+        value = piece_code(game.next_piece)
+        if key or value != self.next:
+            flags |= NEXT
+            parts.append(bytes((value,)))
+            self.next = value
+
+        value = (game.score, game.level, game.lines_cleared)
+        if key or value != self.stats:
+            flags |= STATS
+            parts.append(STATS_STRUCT.pack(*value))
+            self.stats = value
+
+        boss = game.boss
+        if boss:
+            value = (boss.health, boss.phase)
+            if key or value != self.boss:
+                flags |= BOSS
+                parts.append(BOSS_STRUCT.pack(*value))
+                self.boss = value
+
+        value = (effect_bits(game), tuple(game.line_clear_animation))
+        if key or value != self.effects:
+            flags |= EFFECTS
+            parts.append(bytes((value[0],)) + pack_rows(value[1]))
+            self.effects = value
+
+        if flags or self.ticks == MAX_TICKS:
+            out.append(HEADER.pack(flags, self.ticks))
+            out.extend(parts)
+            self.ticks = 0
+        frame = b''.join(out)
+        self.bytes_sent += len(frame)
+        self.frames += len(out) > 0
+        return frame
+
+    def changed_rows(self, cells, width):
+        """ROWS entries for the rows of cells (a Board.dump) that the decoder does not have yet"""
+        rows = self.rows
+        changed = []
+        for y in range(len(rows)):
+            row = cells[y * width:(y + 1) * width]
+            if row != rows[y]:
+                rows[y] = row
+                changed.append(ROW.pack(y) + row)
+        return changed
+
+
+def set_piece(piece, code):
+    """piece, or a new Tetromino when the shape changed, showing a piece_code()"""
+    shape = SHAPE_NAMES[code & 7]
+    if piece.shape != shape:
+        piece = Tetromino(shape, TETROMINO_COLORS[shape])
+    piece.rotation = code >> 3 & 3
+    piece.is_corrupted = bool(code & 0x20)
+    piece.color = CORRUPTION_COLOR if piece.is_corrupted else TETROMINO_COLORS[shape]
+    return piece
+
+
+class Decoder:
+    """Applies frames to a mirror TetrisGame, ``game``, which is None until the first keyframe.
+
+    Emits the game's events for what changed, so a GameView on it plays
+    the matching sounds and particles.
+    """
+    def __init__(self):
+        self.game = None
+        self.ticks = 0
+        self.shake_rng = random.Random()
+
+    def decode(self, data):
+        """Apply one or more whole frames; returns how many ticks they cover"""
+        ticks = 0
+        offset = 0
+        while offset < len(data):
+            offset, frame_ticks = self.apply(data, offset)
+            ticks += frame_ticks
+        self.ticks += ticks
+        return ticks
+
+    def apply(self, data, offset):
+        flags, ticks = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        boss_mode = bool(flags & BOSS)
+        if flags & KEYFRAME:
+            width, height = SIZE.unpack_from(data, offset)
+            offset += SIZE.size
+            game = self.game
+            if game is None or game.boss_mode != boss_mode or (game.board.width, game.board.height) != (width, height):
+                game = self.game = TetrisGame(boss_mode, 0, width, height)
+            game.board.load(bytes(len(game.board.cells)))
+        elif self.game is None:
+            # Joined mid-stream: nothing to apply this to until the next keyframe
+            return self.skip(data, offset, flags), ticks
+        else:
+            game = self.game
+        board = game.board
+        events = []
+
+        if flags & SHIFT:
+            count = data[offset]
+            offset += 1
+            for _ in range(count):
+                op = data[offset]
+                if op & PUSH:
+                    offset += 1
+                    for _ in range(op & ~PUSH):
+                        board.push_row(bytes(board.width))
+                    events.append(('garbage_added', op & ~PUSH))
+                else:
+                    rows, offset = unpack_rows(data, offset)
+                    board.clear_rows(rows)
+                    events.append(('line_cleared', len(rows)))
+
+        if flags & ROWS:
+            count, width = ROWS_HEADER.unpack_from(data, offset)
+            offset += ROWS_HEADER.size
+            for _ in range(count):
+                y = ROW.unpack_from(data, offset)[0]
+                offset += ROW.size
+                board.set_row(y, data[offset:offset + width])
+                offset += width
+
+        if flags & PIECE:
+            code, x, y = PIECE_STRUCT.unpack_from(data, offset)
+            offset += PIECE_STRUCT.size
+            piece = game.current_piece = set_piece(game.current_piece, code)
+            piece.x, piece.y = x, y
+
+        if flags & NEXT:
+            game.next_piece = set_piece(game.next_piece, data[offset])
+            offset += 1
+
+        if flags & STATS:
+            game.score, game.level, game.lines_cleared = STATS_STRUCT.unpack_from(data, offset)
+            offset += STATS_STRUCT.size
+
+        boss = game.boss
+        if flags & BOSS:
+            boss.health, boss.phase = BOSS_STRUCT.unpack_from(data, offset)
+            offset += BOSS_STRUCT.size
+            game.game_won = boss.health <= 0
+
+        if flags & EFFECTS:
+            bits = data[offset]
+            clearing, offset = unpack_rows(data, offset + 1)
+            game.speed_boost_timer = bits & 1
+            game.time_pressure_timer = bits >> 1 & 1
+            game.boss_attacks_active = ['piece_corruption'] if bits & 4 else []
+            if boss:
+                boss.shake_timer = bits >> 3 & 1
+                boss.stun_timer = bits >> 4 & 1
+                boss.attack_timer = boss.attack_cooldown if bits & 0x20 else 0
+            if clearing and clearing != game.line_clear_animation:
+                events.append(('lines_full', clearing))
+            game.line_clear_animation = clearing
+
+        # Screen shake is drawn, not sent: jitter locally while the boss shakes the grid
+        if boss and boss.shake_timer and ticks:
+            game.grid_shake_x = self.shake_rng.randint(-2, 2)
+            game.grid_shake_y = self.shake_rng.randint(-2, 2)
+        elif not (boss and boss.shake_timer):
+            game.grid_shake_x = game.grid_shake_y = 0
+
+        game.animation_time += ticks * TICK_MS
+        if boss:
+            boss.animation_time += ticks * TICK_MS
+        for event, arg in events:
+            game.emit(event, arg)
+        return offset, ticks
+
+    def skip(self, data, offset, flags):
+        """Offset past the sections of a frame, without applying them"""
+        if flags & SHIFT:
+            count = data[offset]
+            offset += 1
+            for _ in range(count):
+                offset = offset + 1 if data[offset] & PUSH else unpack_rows(data, offset)[1]
+        if flags & ROWS:
+            count, width = ROWS_HEADER.unpack_from(data, offset)
+            offset += ROWS_HEADER.size + count * (ROW.size + width)
+        if flags & PIECE:
+            offset += PIECE_STRUCT.size
+        if flags & NEXT:
+            offset += 1
+        if flags & STATS:
+            offset += STATS_STRUCT.size
+        if flags & BOSS:
+            offset += BOSS_STRUCT.size
+        if flags & EFFECTS:
+            offset = unpack_rows(data, offset + 1)[1]
+        return offset
+
+
+def check(seed=3, boss_mode=False, seconds=600, join_tick=1234, input_ticks=8, width=GRID_WIDTH, height=GRID_HEIGHT):
+    """Encode an autoplayer game tick by tick and verify that decoders, including one joining late, match it"""
+    from ai import AutoPlayer
+
+    game = TetrisGame(boss_mode, seed, width, height)
+    encoder = Encoder(game)
+    decoder = Decoder()
+    late = Decoder()
+    # Inputs one every input_ticks rather than all at once, like a quick human
+    player = AutoPlayer(time_budget=0.002, input_ms=input_ticks * TICK_MS)
+    encode_time = 0.0
+    ticks = 0
+    alive = True
+    while alive and not game.game_won and ticks < seconds * 1000 // TICK_MS:
+        player.play(game, dt=TICK_MS)
+        alive = game.advance(TICK_MS)
+        ticks += 1
+
+        start = time.perf_counter()
+        frame = encoder.encode()
+        encode_time += time.perf_counter() - start
+
+        decoder.decode(frame)
+        assert visible_state(decoder.game) == visible_state(game), f'decoder diverged at tick {ticks}'
+        if ticks >= join_tick:
+            late.decode(frame)
+            if late.game is not None:
+                assert visible_state(late.game) == visible_state(game), f'late decoder diverged at tick {ticks}'
+    assert decoder.ticks == ticks - encoder.ticks, 'decoder lost ticks'
+    assert late.game is not None or ticks < join_tick + KEYFRAME_TICKS, 'late decoder never synced'
+
+    game_seconds = ticks * TICK_MS / 1000
+    return {
+        'seconds': game_seconds,
+        'lines': game.lines_cleared,
+        'bytes_per_second': encoder.bytes_sent / game_seconds,
+        'frames_per_second': encoder.frames / game_seconds,
+        'keyframes': encoder.keyframes,
+        'encode_us': encode_time / ticks * 1e6,
+    }
+
+
+def check_limits(width=300, height=40):
+    """Verify that a board wider than 255 cells and stats past 16 and 32 bits survive a round trip"""
+    game = TetrisGame(False, 0, width, height)
+    encoder = Encoder(game)
+    decoder = Decoder()
+    decoder.decode(encoder.encode())
+    game.board.set_row(height - 1, bytes([1]) * (width - 1) + bytes(1))
+    game.score, game.level, game.lines_cleared = 2 ** 40, 70000, 2 ** 20
+    decoder.decode(encoder.encode())
+    assert visible_state(decoder.game) == visible_state(game), 'wide board or large stats did not round-trip'
+
+
+def check_shifts(seed=5):
+    """Verify that a push of more than MAX_PUSH rows, and more than MAX_OPS pushes, between two frames decode"""
+    game = TetrisGame(False, seed)
+    encoder = Encoder(game)
+    decoder = Decoder()
+    decoder.decode(encoder.encode())
+    for pushes, rows in ((1, 3 * MAX_PUSH + 5), (MAX_OPS + 20, 1)):
+        keyframes = encoder.keyframes
+        for _ in range(pushes):
+            game.add_garbage_lines(rows)
+        decoder.decode(encoder.encode())
+        assert visible_state(decoder.game) == visible_state(game), f'{pushes} pushes of {rows} rows did not decode'
+        assert (encoder.keyframes > keyframes) == (pushes > MAX_OPS), 'keyframe not sent for too many ops'
+
+
+def watch(path):
+    """Re-simulate a replay, but draw only what a Decoder rebuilds from the encoded frames"""
+    import pygame
+
+    import main
+    from replay import Replay, simulate_frame
+
+    replay = Replay.load(path)
+    game = replay.new_game()
+    encoder = Encoder(game)
+    decoder = Decoder()
+
+    pygame.init()
+    screen = pygame.display.set_mode((main.WINDOW_WIDTH, main.WINDOW_HEIGHT))
+    clock = pygame.time.Clock()
+    view = None
+    elapsed = 0
+    for dt, actions in replay.frames:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                pygame.quit()
+                return
+
+        simulate_frame(game, dt, actions)
+        decoder.decode(encoder.encode())
+        elapsed += dt
+        if view is None or view.game is not decoder.game:
+            view = main.GameView(decoder.game)
+        view.update(dt)
+        view.draw(screen)
+        pygame.display.flip()
+        if elapsed // 1000 != (elapsed - dt) // 1000:
+            pygame.display.set_caption(f"Spectating: {encoder.bytes_sent * 1000 / elapsed:.0f} bytes/s")
+        clock.tick(1000 / dt)
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == 'watch':
+        watch(sys.argv[2])
+        sys.exit()
+
+    check_limits()
+    check_shifts()
+    runs = (('classic', {}), ('boss', {'boss_mode': True}), ('classic 24x60', {'width': 24, 'height': 60, 'seconds': 120}))
+    for name, options in runs:
+        stats = check(**options)
+        print(f"broadcast check passed ({name}): {stats['seconds']:.0f} s, "
+              f"{stats['lines']} lines, {stats['bytes_per_second']:.0f} bytes/s in "
+              f"{stats['frames_per_second']:.1f} frames/s ({stats['keyframes']} keyframes), "
+              f"{stats['encode_us']:.1f} us per tick encoded, "
+              f"{1e6 / (stats['encode_us'] * 1000 / TICK_MS):,.0f} boards per core")
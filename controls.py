@@ -0,0 +1,155 @@
+"""Keyboard input: event filtering, auto-repeat and input-to-display latency.
+
+Key presses are played as soon as they are read. Holding left or right
+moves once, waits DAS_MS (delayed auto-shift) and then moves every ARR_MS
+(auto-repeat rate); holding soft drop repeats every SOFT_DROP_MS. Repeats
+are scheduled on time.perf_counter() timestamps rather than counted in
+frames, so their cadence does not depend on the frame rate, and a frame
+plays every repeat that fell due since the last one.
+
+Latency is measured from the moment an input is read from the event queue
+(or a repeat fell due) to the display update that first shows it. Time an
+event waits in the SDL queue before it is read is invisible to pygame; it
+is bounded by the frame interval.
+"""
+import pygame
+
+# Keyboard controls -> TetrisGame.apply_action names
+KEY_ACTIONS = {
+    pygame.K_LEFT: 'left', pygame.K_a: 'left',
+    pygame.K_RIGHT: 'right', pygame.K_d: 'right',
+    pygame.K_DOWN: 'soft_drop', pygame.K_s: 'soft_drop',
+    pygame.K_UP: 'rotate', pygame.K_w: 'rotate',
+    pygame.K_SPACE: 'hard_drop',
+}
+
+# Sent when (part of) the window was uncovered and has to be painted again
+EXPOSE_EVENTS = (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE)
+
+# The only events the game reads; everything else never reaches the queue
+ALLOWED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.WINDOWFOCUSLOST) + EXPOSE_EVENTS
+
+DAS_MS = 167
+ARR_MS = 33
+SOFT_DROP_MS = 33
+
+HORIZONTAL = ('left', 'right')
+
+
+def restrict_events():
+    """Keep only ALLOWED_EVENTS on the event queue; call after pygame.init()"""
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(ALLOWED_EVENTS)
+
+
+class LatencyHistogram:
+    """Latencies in bins of bin_ms, with one overflow bin past max_ms"""
+    def __init__(self, bin_ms=0.5, max_ms=250):
+        self.bin_ms = bin_ms
+        self.bins = [0] * (int(max_ms / bin_ms) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, ms):
+        self.bins[min(int(ms / self.bin_ms), len(self.bins) - 1)] += 1
+        self.count += 1
+        self.total += ms
+
+    def percentile(self, q):
+        """Upper edge of the bin holding the q-th quantile, in ms"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.bins):
+            seen += count
+            if seen >= rank:
+                return (index + 1) * self.bin_ms
+        return len(self.bins) * self.bin_ms
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self):
+        return (f"{self.count} inputs, mean {self.mean():.1f} ms, p50 {self.percentile(0.5):.1f} "
+                f"p95 {self.percentile(0.95):.1f} p99 {self.percentile(0.99):.1f} ms")
+
+
+class Controls:
+    """Turns key events into game actions with DAS/ARR, and times how long they take to show.
+
+    Actions are played through act(action), which returns whether the
+    action changed anything, e.g. InputRecorder.action.
+    """
+    def __init__(self, keymap=None, das_ms=DAS_MS, arr_ms=ARR_MS, soft_drop_ms=SOFT_DROP_MS):
+        self.keymap = KEY_ACTIONS if keymap is None else keymap
+        self.das = das_ms / 1000
+        self.arr = arr_ms / 1000
+        self.soft_drop = soft_drop_ms / 1000
+
+        # [action, time of the next repeat] per held key that repeats, in press order
+        self.held = []
+        # Times at which inputs that changed the game were read; cleared by shown()
+        self.unshown = []
+        self.latency = LatencyHistogram()
+
+    def reset(self):
+        """Forget held keys, e.g. on restart or when the window loses focus"""
+        self.held = []
+
+    def handle(self, event, now, act):
+        """Play a KEYDOWN/KEYUP read at time now; returns False for keys that are not game controls"""
+        action = self.keymap.get(event.key)
+        if action is None:
+            return False
+        self.release(action, now)
+        if event.type == pygame.KEYDOWN:
+            if act(action):
+                self.unshown.append(now)
+            if action in HORIZONTAL:
+                self.held.append([action, now + self.das])
+            elif action == 'soft_drop':
+                self.held.append([action, now + self.soft_drop])
+        return True
+
+    def release(self, action, now):
+        held = [entry for entry in self.held if entry[0] != action]
+        if len(held) == len(self.held):
+            return
+        self.held = held
+        # Letting go of one direction hands over to the other if it is still held, with a fresh delay
+        if action in HORIZONTAL:
+            for entry in held:
+                if entry[0] in HORIZONTAL:
+                    entry[1] = now + self.das
+
+    def update(self, now, act, board):
+        """Play every auto-repeat that has fallen due by now on the game with this board"""
+        # Moves played by one held key in one update at most: enough to cross the board
+        # either way, so ARR 0 moves straight to the wall
+        max_repeats = max(board.width, board.height)
+        horizontal = None
+        for entry in self.held:
+            if entry[0] in HORIZONTAL:
+                horizontal = entry
+        for entry in self.held:
+            action, due = entry
+            if action in HORIZONTAL and entry is not horizontal:
+                continue
+            interval = self.soft_drop if action == 'soft_drop' else self.arr
+            for _ in range(max_repeats):
+                if due > now:
+                    break
+                if not act(action):
+                    # Blocked: stay charged and move again as soon as there is room
+                    due = now
+                    break
+                self.unshown.append(due)
+                due += interval
+            entry[1] = due
+
+    def shown(self, now):
+        """Call right after the display update; records the latency of every input it showed"""
+        for read in self.unshown:
+            self.latency.record((now - read) * 1000)
+        self.unshown = []
@@ -0,0 +1,710 @@
+"""Pure-Python game rules: board state, pieces, scoring, leveling and the boss.
+
+Nothing in here touches pygame, so the rules can run headless at raw CPU
+speed. The pygame layer in main.py subscribes to the events emitted by
+TetrisGame (see TetrisGame.subscribe) for sounds and particles.
+"""
+import random
+from operator import attrgetter
+
+from board import Board, EMPTY, CORRUPTED, PALETTE_MASK
+from shapes import TETROMINOES, SHAPES, SHAPE_NAMES, ROTATION_COUNTS
+from timers import Timers
+
+# Default board size; every TetrisGame can have its own
+GRID_WIDTH = 10
+GRID_HEIGHT = 20
+
+CORRUPTION_COLOR = (100, 50, 50)
+
+# The simulation advances in fixed ticks of this many ms, whatever the frame rate
+TICK_MS = 10
+
+# Longest frame advance() catches up on; anything beyond that is dropped rather than
+# simulated, so a long stall slows the game down instead of snowballing
+MAX_FRAME_MS = 250
+
+# Enhanced Tetromino colors with gradients
+TETROMINO_COLORS = {
+    'I': (0, 240, 255),      # Bright cyan
+    'O': (255, 220, 0),      # Golden yellow
+    'T': (160, 80, 255),     # Purple
+    'S': (80, 255, 80),      # Bright green
+    'Z': (255, 80, 80),      # Bright red
+    'J': (80, 120, 255),     # Blue
+    'L': (255, 160, 0)       # Orange
+}
+
+# Shadow colors (darker versions)
+SHADOW_COLORS = {
+    'I': (0, 180, 200),
+    'O': (200, 170, 0),
+    'T': (120, 60, 200),
+    'S': (60, 200, 60),
+    'Z': (200, 60, 60),
+    'J': (60, 90, 200),
+    'L': (200, 120, 0)
+}
+
+# Board cells store an index into this palette (0 = empty)
+PALETTE = [None] + [TETROMINO_COLORS[shape] for shape in SHAPE_NAMES] + [CORRUPTION_COLOR]
+PALETTE_INDEX = {color: index for index, color in enumerate(PALETTE) if color is not None}
+GARBAGE_CELL = PALETTE_INDEX[CORRUPTION_COLOR] | CORRUPTED
+
+# Events emitted by TetrisGame and the arguments passed to subscribers
+#   lines_full(rows)          rows are full and about to be cleared (cells still on the board)
+#   line_cleared(count)       full rows were removed and scored
+#   hard_dropped(distance)    a hard drop happened (distance 0 means the piece did not move)
+#   garbage_added(count)      garbage rows were pushed in from the bottom
+#   boss_attack(attack)       the boss launched an attack
+EVENTS = ('lines_full', 'line_cleared', 'hard_dropped', 'garbage_added', 'boss_attack')
+
+# Player inputs accepted by TetrisGame.apply_action (the keyboard controls in main())
+ACTIONS = ('left', 'right', 'soft_drop', 'rotate', 'hard_drop')
+
+# Balance tables. Boss and TetrisGame read them through class attributes of the same name
+# in lower case, so a single game can be given its own (see sweep.py).
+# Boss attack cooldown (ms) in each phase
+ATTACK_COOLDOWNS = {1: 5000, 2: 2500, 3: 2000}
+# Boss damage by lines cleared at once
+LINE_DAMAGE = {1: 5, 2: 10, 3: 15, 4: 25}
+# Fall speed (ms per row) at level 1, how much less each level takes, and the fastest it gets
+FALL_SPEED_CURVE = (500, 25, 50)
+
+# Plain values saved by TetrisGame.snapshot() and Boss.snapshot(), next to their timers
+GAME_FIELDS = ('score', 'level', 'lines_cleared', 'fall_time', 'fall_speed', 'base_fall_speed', 'animation_time',
+               'grid_shake_x', 'grid_shake_y', 'line_clear_timer', 'game_won', 'accumulator', 'clock')
+BOSS_FIELDS = ('max_health', 'health', 'phase', 'attack_cooldown', 'animation_time', 'shake_intensity',
+               'last_attack', 'clock', 'attack_start', 'attack_held')
+_game_fields = attrgetter(*GAME_FIELDS)
+_boss_fields = attrgetter(*BOSS_FIELDS)
+
+
+class RandomStream(random.Random):
+    """random.Random that keeps its saved state until the next draw, so unused streams snapshot for free"""
+    state = None
+
+    def random(self):
+        self.state = None
+        return super().random()
+
+    def getrandbits(self, k):
+        self.state = None
+        return super().getrandbits(k)
+
+    def snapshot(self):
+        if self.state is None:
+            self.state = self.getstate()
+        return self.state
+
+    def restore(self, state):
+        # Nothing to do when the stream has not been drawn from since it was saved as this state
+        if state is not self.state:
+            self.setstate(state)
+            self.state = state
+
+
+class Boss:
+    attack_cooldowns = ATTACK_COOLDOWNS
+
+    def __init__(self, rng=None):
+        self.rng = rng or RandomStream()
+        self.max_health = 100
+        self.health = self.max_health
+        self.phase = 1
+        self.attack_cooldown = self.attack_cooldowns[1]  # milliseconds
+        self.animation_time = 0
+        self.shake_intensity = 0
+        self.last_attack = None
+
+        # Stun, grid shake and the next attack are timers expiring against clock (ms of updates).
+        # The attack timer counts from attack_start, and holds still at attack_held while stunned
+        self.clock = 0
+        self.timers = Timers()
+        self.attack_start = 0
+        self.attack_held = 0
+        self.schedule_attack()
+
+        # Boss attacks
+        self.attacks = {
+            1: ['garbage_lines', 'speed_boost'],
+            2: ['garbage_lines', 'speed_boost', 'grid_shake'],
+            3: ['garbage_lines', 'speed_boost', 'grid_shake', 'piece_theft', 'time_pressure']
+        }
+
+    def take_damage(self, damage):
+        if not self.is_stunned:
+            self.health -= damage
+            self.health = max(0, self.health)
+
+            # Phase transitions
+            if self.health <= 66 and self.phase == 1:
+                self.phase = 2
+                self.attack_cooldown = self.attack_cooldowns[2]
+                self.schedule_attack()
+            elif self.health <= 33 and self.phase == 2:
+                self.phase = 3
+                self.attack_cooldown = self.attack_cooldowns[3]
+                self.schedule_attack()
+
+            # Stun on big damage
+            if damage >= 20:  # Tetris damage
+                self.stun_timer = 1500
+
+    @property
+    def is_stunned(self):
+        return 'stun' in self.timers
+
+    @property
+    def stun_timer(self):
+        return self.timers.remaining('stun', self.clock)
+
+    @stun_timer.setter
+    def stun_timer(self, ms):
+        attack_timer = self.attack_timer
+        self.timers.start('stun', self.clock, ms)
+        # Carry the attack timer over, held or running
+        self.attack_timer = attack_timer
+
+    @property
+    def shake_timer(self):
+        return self.timers.remaining('shake', self.clock)
+
+    @shake_timer.setter
+    def shake_timer(self, ms):
+        self.timers.start('shake', self.clock, ms)
+
+    @property
+    def attack_timer(self):
+        """ms spent charging the next attack"""
+        return self.attack_held if self.is_stunned else self.clock - self.attack_start
+
+    @attack_timer.setter
+    def attack_timer(self, ms):
+        self.attack_held = ms
+        self.attack_start = self.clock - ms
+        self.schedule_attack()
+
+    def schedule_attack(self):
+        """Register when the next attack is due; call after changing attack_cooldown"""
+        if self.is_stunned:
+            self.timers.cancel('attack')
+        else:
+            self.timers.start('attack', self.attack_start, self.attack_cooldown)
+
+    def update(self, dt):
+        """Advance dt ms; returns True when an attack is due"""
+        self.animation_time += dt
+        self.clock += dt
+
+        if 'shake' in self.timers:
+            self.shake_intensity = max(0, self.shake_intensity - dt * 0.01)
+
+        expired = self.timers.expire(self.clock)
+        if 'stun' in expired:
+            # The update that ends a stun counts towards the next attack in full
+            self.attack_timer = self.attack_held + dt
+            expired += self.timers.expire(self.clock)
+        return 'attack' in expired
+
+    def get_random_attack(self):
+        available_attacks = self.attacks.get(self.phase, self.attacks[1])
+        # Avoid repeating the same attack
+        if self.last_attack and len(available_attacks) > 1:
+            available_attacks = [a for a in available_attacks if a != self.last_attack]
+        return self.rng.choice(available_attacks)
+
+    def execute_attack(self):
+        attack = self.get_random_attack()
+        self.last_attack = attack
+        self.attack_timer = 0
+        return attack
+
+    def snapshot(self):
+        return _boss_fields(self), self.timers.snapshot(), self.rng.snapshot()
+
+    def restore(self, snapshot):
+        fields, timers, rng = snapshot
+        self.__dict__.update(zip(BOSS_FIELDS, fields))
+        self.timers.restore(timers)
+        self.rng.restore(rng)
+
+
+class Tetromino:
+    def __init__(self, shape, color, board_width=GRID_WIDTH):
+        self.shape = shape
+        self.color = color
+        self.shadow_color = SHADOW_COLORS[shape]
+        self.x = board_width // 2 - 2
+        self.y = 0
+        self.rotation = 0
+        self.animation_offset = 0
+        self.pulse = 0
+        self.is_corrupted = False
+
+    @classmethod
+    def from_state(cls, state):
+        """New piece with the attributes of a saved piece.__dict__"""
+        piece = cls.__new__(cls)
+        piece.__dict__.update(state)
+        return piece
+
+    def get_rotated_shape(self):
+        return TETROMINOES[self.shape][self.rotation]
+
+    def get_offsets(self):
+        return SHAPES[self.shape][self.rotation]
+
+    def get_cells(self):
+        x, y = self.x, self.y
+        return [(x + dx, y + dy) for dx, dy in SHAPES[self.shape][self.rotation].cells]
+
+
+class TetrisGame:
+    line_damage = LINE_DAMAGE
+    fall_speed_curve = FALL_SPEED_CURVE
+
+    def __init__(self, boss_mode=False, seed=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.board = Board(width, height)
+        self.listeners = {event: [] for event in EVENTS}
+
+        # Every game has a seed (drawn from the global generator when not given) so it can be
+        # replayed. Each source of randomness gets its own stream, so e.g. screen shake never
+        # shifts the piece sequence.
+        if seed is None:
+            seed = random.randrange(1 << 63)
+        self.seed = seed
+        self.piece_rng = RandomStream(f'{seed}:pieces')
+        self.garbage_rng = RandomStream(f'{seed}:garbage')
+        self.shake_rng = RandomStream(f'{seed}:shake')
+
+        # Initialize boss mode first
+        self.boss_mode = boss_mode
+        self.boss = Boss(RandomStream(f'{seed}:boss')) if boss_mode else None
+        self.boss_attacks_active = []
+        self.game_won = False
+
+        # Speed boost and time pressure are timers expiring against clock (ms of updates)
+        self.clock = 0
+        self.timers = Timers()
+
+        # Safely call get_new_piece
+        self.current_piece = self.get_new_piece()
+        self.next_piece = self.get_new_piece()
+
+        self.score = 0
+        self.level = 1
+        self.lines_cleared = 0
+        self.fall_time = 0
+        self.fall_speed = self.fall_speed_curve[0]
+        self.base_fall_speed = self.fall_speed_curve[0]
+        self.line_clear_animation = []
+        self.animation_time = 0
+        self.grid_shake_x = 0
+        self.grid_shake_y = 0
+        self.pending_line_clears = []
+        self.line_clear_timer = 0
+
+        # Fixed-tick clock: time not yet simulated, and the falling piece's
+        # (piece, x, y, rotation) before the last tick, for render interpolation
+        self.accumulator = 0
+        self.tick_start = None
+
+        # Resting row per (shape, rotation, x) on the current surface, valid for one board version
+        self.landing_cache = {}
+        self.landing_version = -1
+
+    def subscribe(self, event, callback):
+        """Call callback(*args) whenever the game emits event"""
+        self.listeners[event].append(callback)
+
+    def emit(self, event, *args):
+        for callback in self.listeners[event]:
+            callback(*args)
+
+    def snapshot(self):
+        """Opaque, immutable copy of the game state for restore().
+
+        The board and random streams are shared with earlier snapshots for as
+        long as they have not changed, so taking one every tick stays cheap.
+        """
+        return (
+            _game_fields(self),
+            self.timers.snapshot(),
+            self.board.snapshot(),
+            self.current_piece.__dict__.copy(),
+            self.next_piece.__dict__.copy(),
+            tuple(self.boss_attacks_active),
+            tuple(self.pending_line_clears),
+            tuple(self.line_clear_animation),
+            self.piece_rng.snapshot(),
+            self.garbage_rng.snapshot(),
+            self.shake_rng.snapshot(),
+            self.boss.snapshot() if self.boss else None,
+        )
+
+    def restore(self, snapshot):
+        """Return to a snapshot() of this game; the pieces come back as new objects"""
+        (fields, timers, board, current_piece, next_piece, attacks, pending, animation,
+         piece_rng, garbage_rng, shake_rng, boss) = snapshot
+        self.__dict__.update(zip(GAME_FIELDS, fields))
+        self.timers.restore(timers)
+        self.board.restore(board)
+        self.current_piece = Tetromino.from_state(current_piece)
+        self.next_piece = Tetromino.from_state(next_piece)
+        self.boss_attacks_active = list(attacks)
+        self.pending_line_clears = list(pending)
+        self.line_clear_animation = list(animation)
+        self.piece_rng.restore(piece_rng)
+        self.garbage_rng.restore(garbage_rng)
+        self.shake_rng.restore(shake_rng)
+        if boss:
+            self.boss.restore(boss)
+        self.tick_start = None
+
+    @property
+    def speed_boost_timer(self):
+        return self.timers.remaining('speed_boost', self.clock)
+
+    @speed_boost_timer.setter
+    def speed_boost_timer(self, ms):
+        self.timers.start('speed_boost', self.clock, ms)
+
+    @property
+    def time_pressure_timer(self):
+        return self.timers.remaining('time_pressure', self.clock)
+
+    @time_pressure_timer.setter
+    def time_pressure_timer(self, ms):
+        self.timers.start('time_pressure', self.clock, ms)
+
+    def get_new_piece(self):
+        shape = self.piece_rng.choice(SHAPE_NAMES)
+        piece = Tetromino(shape, TETROMINO_COLORS[shape], self.board.width)
+        # Boss attack: make some pieces corrupted
+        if self.boss_mode and 'piece_corruption' in self.boss_attacks_active and self.piece_rng.random() < 0.3:
+            piece.is_corrupted = True
+            piece.color = CORRUPTION_COLOR
+
+        return piece
+
+    def cell_color(self, x, y):
+        """Color of the locked cell at (x, y), or None when it is empty"""
+        return PALETTE[self.board.get(x, y) & PALETTE_MASK]
+
+    def fits(self, shape, rotation, x, y):
+        """Check whether a shape/rotation placed at (x, y) collides with anything"""
+        offsets = SHAPES[shape][rotation]
+        board = self.board
+        if x + offsets.min_x < 0 or x + offsets.max_x >= board.width or y + offsets.max_y >= board.height:
+            return False
+
+        row_masks = board.row_masks
+        for dy, mask in offsets.row_masks:
+            if y + dy >= 0 and row_masks[y + dy] & (mask << x if x >= 0 else mask >> -x):
+                return False
+        return True
+
+    def landing_row(self, shape, rotation, x, y):
+        """Row where a shape at (x, y) comes to rest when dropped straight down"""
+        board = self.board
+        if self.landing_version != board.version:
+            self.landing_cache.clear()
+            self.landing_version = board.version
+
+        key = (shape, rotation, x)
+        surface = self.landing_cache.get(key)
+        if surface is None:
+            tops = board.column_tops
+            surface = min(tops[x + dx] - 1 - dy for dx, dy in SHAPES[shape][rotation].column_bottoms)
+            self.landing_cache[key] = surface
+        if y <= surface:
+            return surface
+
+        # Below the top of some column, i.e. tucked under an overhang: step down instead
+        while self.fits(shape, rotation, x, y + 1):
+            y += 1
+        return y
+
+    def is_valid_position(self, piece, dx=0, dy=0, rotation=None):
+        if rotation is None:
+            rotation = piece.rotation
+        return self.fits(piece.shape, rotation, piece.x + dx, piece.y + dy)
+
+    def place_piece(self, piece):
+        cell = PALETTE_INDEX[piece.color]
+        if piece.is_corrupted: # Mark corrupted Cells
+            cell |= CORRUPTED
+
+        touched_rows = set()
+        for x, y in piece.get_cells():
+            if y >= 0:
+                self.board.set(x, y, cell)
+                touched_rows.add(y)
+
+        # Only rows touched by this piece (or still waiting to clear) can be full
+        touched_rows.update(self.pending_line_clears)
+        lines_to_clear = [y for y in sorted(touched_rows) if self.board.is_row_full(y)]
+
+        # Add line clear animation
+        if lines_to_clear:
+            self.line_clear_animation = lines_to_clear[:]
+            self.pending_line_clears = lines_to_clear[:]
+            self.line_clear_timer = 0
+            self.emit('lines_full', lines_to_clear)
+
+    def move_piece(self, dx, dy):
+        if self.is_valid_position(self.current_piece, dx, dy):
+            self.current_piece.x += dx
+            self.current_piece.y += dy
+            return True
+        return False
+
+    def rotate_piece(self):
+        rotations = ROTATION_COUNTS[self.current_piece.shape]
+        new_rotation = (self.current_piece.rotation + 1) % rotations
+
+        if self.is_valid_position(self.current_piece, 0, 0, new_rotation):
+            self.current_piece.rotation = new_rotation
+            return True
+        return False
+
+    def apply_action(self, action):
+        """Play one of ACTIONS the way the keyboard does; returns whether it had any effect"""
+        if action == 'left':
+            return self.move_piece(-1, 0)
+        if action == 'right':
+            return self.move_piece(1, 0)
+        if action == 'soft_drop':
+            if self.move_piece(0, 1):
+                self.score += 1
+                return True
+            return False
+        if action == 'rotate':
+            return self.rotate_piece()
+        if action == 'hard_drop':
+            piece = self.current_piece
+            self.hard_drop()
+            return self.current_piece is not piece
+        raise ValueError(f"unknown action {action!r}")
+
+    def add_garbage_lines(self, count=1):
+        """Boss attack: add garbage lines from bottom"""
+        width = self.board.width
+        for _ in range(count):
+            # Add garbage line at bottom (the top line is pushed out)
+            garbage_line = [GARBAGE_CELL if self.garbage_rng.random() < 0.8 else EMPTY for _ in range(width)]
+            # Ensure there's at least one gap
+            gap_pos = self.garbage_rng.randint(0, width - 1)
+            garbage_line[gap_pos] = EMPTY
+
+            self.board.push_row(garbage_line)
+
+        self.emit('garbage_added', count)
+
+    def execute_boss_attack(self, attack):
+        """Execute a boss attack"""
+        self.emit('boss_attack', attack)
+
+        if attack == 'garbage_lines':
+            self.add_garbage_lines(self.garbage_rng.randint(1, 2))
+
+        elif attack == 'speed_boost':
+            self.speed_boost_timer = 5000  # 5 seconds of fast fall
+
+        elif attack == 'piece_corruption':
+            if 'piece_corruption' not in self.boss_attacks_active:
+                self.boss_attacks_active.append('piece_corruption')
+
+        elif attack == 'grid_shake':
+            self.boss.shake_intensity = 3
+            self.boss.shake_timer = 2000
+
+        elif attack == 'piece_theft':
+            # Steal next piece and give a bad one (random)
+            self.next_piece = self.get_new_piece()
+
+        elif attack == 'time_pressure':
+            self.time_pressure_timer = 10000  # 10 seconds of extreme speed
+
+    def advance(self, dt):
+        """Run the fixed ticks that dt ms of real time add up to; returns False once the game is over"""
+        self.accumulator = min(self.accumulator + dt, MAX_FRAME_MS)
+        while self.accumulator >= TICK_MS and not self.game_won:
+            self.accumulator -= TICK_MS
+            piece = self.current_piece
+            self.tick_start = (piece, piece.x, piece.y, piece.rotation)
+            if not self.update(TICK_MS):
+                return False
+        return True
+
+    def skip_frames(self, frames, frame_ms):
+        """advance(frame_ms) `frames` times over, for headless runs with no input in between.
+
+        Ticks in which nothing can happen (see idle_ticks) are merged into a
+        single update(), so the cost goes with the number of events rather
+        than frames. Stops at the end of the first frame in which the piece
+        locked or the game ended. Returns (frames run, alive); the game is
+        left just as those advance() calls would leave it, bar the cosmetic
+        screen shake.
+        """
+        start = self.accumulator
+        ticks = (start + frames * frame_ms) // TICK_MS
+        piece = self.current_piece
+        alive = True
+        tick = 0
+        while tick < ticks and not self.game_won:
+            idle = min(self.idle_ticks(), ticks - tick - 1)
+            if idle:
+                # Nothing happens in these, so they cannot lock the piece or end the game
+                self.update(idle * TICK_MS)
+                tick += idle
+            current = self.current_piece
+            self.tick_start = (current, current.x, current.y, current.rotation)
+            alive = self.update(TICK_MS)
+            tick += 1
+            if not alive or self.game_won or self.current_piece is not piece:
+                # Finish the frame this tick fell in, like advance() would
+                frames = -(-(tick * TICK_MS - start) // frame_ms)
+                self.accumulator = start + frames * frame_ms - tick * TICK_MS
+                return frames, alive and self.advance(0)
+        self.accumulator = start + frames * frame_ms - tick * TICK_MS
+        return frames, True
+
+    def idle_ticks(self):
+        """How many of the coming ticks only pass time: no gravity step, line clear or timer running out"""
+        if 'piece_corruption' in self.boss_attacks_active and 'time_pressure' not in self.timers:
+            return 0
+        # Ticks before the one where each thing happens
+        idle = [(self.fall_speed - self.fall_time - 1) // TICK_MS]
+        if self.line_clear_animation:
+            idle.append((300 - self.animation_time) // TICK_MS)
+        expiry = self.timers.next_expiry()
+        if expiry is not None:
+            idle.append((expiry - self.clock - 1) // TICK_MS)
+        if self.boss_mode and self.boss and not self.game_won:
+            expiry = self.boss.timers.next_expiry()
+            if expiry is not None:
+                idle.append((expiry - self.boss.clock - 1) // TICK_MS)
+        return max(0, min(idle))
+
+    def tick_fraction(self):
+        """How far real time has got into the next tick, from 0 to 1"""
+        return self.accumulator / TICK_MS
+
+    def update(self, dt):
+        """Advance the game by one step of dt milliseconds; returns False once the game is over"""
+        self.animation_time += dt
+        # Effects of attacks launched in this step run from the start of it
+        self.update_boss(dt)
+        self.clock += dt
+        self.update_effects(dt)
+        self.update_line_clears(dt)
+        return self.update_gravity(dt)
+
+    def update_boss(self, dt):
+        # Update boss
+        if self.boss_mode and self.boss and not self.game_won:
+            # Execute boss attacks
+            if self.boss.update(dt):
+                attack = self.boss.execute_attack()
+                self.execute_boss_attack(attack)
+
+    def update_effects(self, dt):
+        # Expired boss attack effects are simply gone; the fall speed below only looks at the rest
+        self.timers.expire(self.clock)
+
+        # Remove piece corruption when time pressure ends
+        if 'time_pressure' not in self.timers and 'piece_corruption' in self.boss_attacks_active:
+            self.boss_attacks_active.remove('piece_corruption')
+
+        # Update grid shake
+        if self.boss and 'shake' in self.boss.timers:
+            shake_amount = int(self.boss.shake_intensity)
+            self.grid_shake_x = self.shake_rng.randint(-shake_amount, shake_amount)
+            self.grid_shake_y = self.shake_rng.randint(-shake_amount, shake_amount)
+        else:
+            self.grid_shake_x = 0
+            self.grid_shake_y = 0
+
+        # Calculate current fall speed with boss effects
+        current_fall_speed = self.base_fall_speed
+        if 'speed_boost' in self.timers:
+            current_fall_speed //= 2
+        if 'time_pressure' in self.timers:
+            current_fall_speed //= 4
+
+        self.fall_speed = current_fall_speed
+
+    def update_line_clears(self, dt):
+        # Update line clear timer
+        if self.line_clear_animation:
+            self.line_clear_timer += dt
+        # Clear line clear animation
+        if self.line_clear_animation and self.animation_time > 300:
+            if self.pending_line_clears:
+                # Clear lines (rows above drop down, empty rows appear on top)
+                self.board.clear_rows(self.pending_line_clears)
+
+                lines_cleared = len(self.pending_line_clears)
+                self.lines_cleared += lines_cleared
+
+                # Enhanced scoring
+                score_values = {0: 0, 1: 100, 2: 300, 3: 500, 4: 800}
+                line_score = score_values.get(lines_cleared, 0) * self.level
+                self.score += line_score
+
+                # Boss damage
+                if self.boss_mode and self.boss and lines_cleared > 0:
+                    self.boss.take_damage(self.line_damage[lines_cleared])
+
+                    # Check win condition
+                    if self.boss.health <= 0:
+                        self.game_won = True
+
+                # Level progression
+                self.level = self.lines_cleared // 10 + 1
+                self.base_fall_speed = self.level_fall_speed(self.level)
+
+                self.pending_line_clears = []
+                self.emit('line_cleared', lines_cleared)
+
+            self.line_clear_animation = []
+            self.line_clear_timer = 0
+
+    def level_fall_speed(self, level):
+        start, step, fastest = self.fall_speed_curve
+        return max(fastest, start - (level - 1) * step)
+
+    def update_gravity(self, dt):
+        self.fall_time += dt
+
+        # Leftover time carries over, and a step longer than fall_speed drops several rows
+        while self.fall_time >= self.fall_speed:
+            self.fall_time -= self.fall_speed
+            if not self.move_piece(0, 1):
+                self.place_piece(self.current_piece)
+                self.current_piece = self.next_piece
+                self.next_piece = self.get_new_piece()
+                self.fall_time = 0
+
+                # Check game over
+                if not self.is_valid_position(self.current_piece):
+                    return False
+
+        return True
+
+    def hard_drop(self):
+        piece = self.current_piece
+        drop_distance = self.landing_row(piece.shape, piece.rotation, piece.x, piece.y) - piece.y
+        piece.y += drop_distance
+        self.score += 2 * drop_distance
+
+        if drop_distance > 0:
+            # fixed bug placed block moved yippeeeeeeee
+            self.place_piece(self.current_piece)
+            self.current_piece = self.next_piece
+            self.next_piece = self.get_new_piece()
+            self.fall_time = 0  # Reset fall timer
+
+        self.emit('hard_dropped', drop_distance)
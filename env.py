@@ -0,0 +1,136 @@
+"""Gym-style reset/step wrapper around TetrisGame for training agents.
+
+Observations are a dict of NumPy arrays that are allocated once per
+environment and overwritten in place on every reset/step; copy them if you
+need to keep a transition around.
+"""
+import numpy as np
+
+from engine import TetrisGame, GRID_WIDTH, GRID_HEIGHT
+from shapes import SHAPE_NAMES, ROTATION_COUNTS
+
+# Per-frame actions, mirroring the keyboard controls in main()
+NOOP, LEFT, RIGHT, SOFT_DROP, ROTATE, HARD_DROP = range(6)
+FRAME_ACTIONS = 6
+ACTION_NAMES = (None, 'left', 'right', 'soft_drop', 'rotate', 'hard_drop')
+
+# Boss effects reported in the 'effects' observation, in this order
+EFFECTS = ('speed_boost', 'time_pressure', 'piece_corruption', 'grid_shake', 'stunned')
+
+# Placement actions encode (rotation, x) as rotation * placement_columns + (x - PLACEMENT_MIN_X),
+# placement_columns being width - PLACEMENT_MIN_X (PLACEMENT_COLUMNS on the standard board)
+PLACEMENT_MIN_X = -2
+PLACEMENT_COLUMNS = GRID_WIDTH - PLACEMENT_MIN_X
+PLACEMENT_ACTIONS = 4 * PLACEMENT_COLUMNS
+
+
+class TetrisEnv:
+    def __init__(self, boss_mode=False, placement_actions=False, frame_ms=16, max_lock_frames=1000,
+                 width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.boss_mode = boss_mode
+        self.placement_actions = placement_actions
+        self.frame_ms = frame_ms
+        self.max_lock_frames = max_lock_frames
+        self.width = width
+        self.height = height
+        self.placement_columns = width - PLACEMENT_MIN_X
+        self.action_count = 4 * self.placement_columns if placement_actions else FRAME_ACTIONS
+        self.game = None
+
+        # Preallocated observation buffers
+        self.observation = {
+            'board': np.zeros((height, width), dtype=np.uint8),
+            # shape index, rotation, x, y
+            'piece': np.zeros(4, dtype=np.int16),
+            'next_piece': np.zeros(1, dtype=np.int16),
+            # score, level, lines
+            'stats': np.zeros(3, dtype=np.int64),
+            # health, max health, phase, attack timer, attack cooldown
+            'boss': np.zeros(5, dtype=np.float32),
+            'effects': np.zeros(len(EFFECTS), dtype=np.uint8),
+        }
+        # Physical row of each logical row, refreshed only when the board changes
+        self._row_index = np.zeros(height, dtype=np.intp)
+        self._row_version = -1
+        self._cells = None
+
+    def reset(self, seed=None):
+        self.game = TetrisGame(self.boss_mode, seed, self.width, self.height)
+        board = self.game.board
+        # Zero-copy view of the packed board; rows are reordered through the row-pointer table
+        self._cells = np.frombuffer(board.cells, dtype=np.uint8).reshape(board.height, board.width)
+        self._row_version = -1
+        self._write_observation()
+        return self.observation
+
+    def step(self, action):
+        game = self.game
+        score_before = game.score
+        lines_before = game.lines_cleared
+
+        if self.placement_actions:
+            alive = self._place(int(action))
+        else:
+            alive = self._frame(int(action))
+
+        done = not alive or game.game_won
+        self._write_observation()
+        info = {'lines': game.lines_cleared - lines_before, 'won': game.game_won}
+        return self.observation, game.score - score_before, done, info
+
+    def _frame(self, action):
+        game = self.game
+        if action != NOOP:
+            game.apply_action(ACTION_NAMES[action])
+        return game.advance(self.frame_ms)
+
+    def _place(self, action):
+        game = self.game
+        rotation, column = divmod(action, self.placement_columns)
+        x = column + PLACEMENT_MIN_X
+        piece = game.current_piece
+
+        for _ in range(rotation % ROTATION_COUNTS[piece.shape]):
+            game.rotate_piece()
+        while piece.x != x and game.move_piece(1 if x > piece.x else -1, 0):
+            pass
+        game.hard_drop()
+
+        # A piece that could not drop is locked by gravity on the following frames
+        for _ in range(self.max_lock_frames):
+            if not game.advance(self.frame_ms):
+                return False
+            if game.current_piece is not piece or game.game_won:
+                break
+        return game.is_valid_position(game.current_piece)
+
+    def _write_observation(self):
+        game = self.game
+        obs = self.observation
+
+        board = game.board
+        if board.version != self._row_version:
+            # Copied into the existing array, then turned from offsets into row numbers in place
+            self._row_index[:] = board.row_offsets()
+            np.floor_divide(self._row_index, board.width, out=self._row_index)
+            self._row_version = board.version
+        np.take(self._cells, self._row_index, axis=0, out=obs['board'])
+
+        piece = game.current_piece
+        obs['piece'][:] = (SHAPE_NAMES.index(piece.shape), piece.rotation, piece.x, piece.y)
+        obs['next_piece'][0] = SHAPE_NAMES.index(game.next_piece.shape)
+        obs['stats'][:] = (game.score, game.level, game.lines_cleared)
+
+        effects = obs['effects']
+        effects[0] = game.speed_boost_timer > 0
+        effects[1] = game.time_pressure_timer > 0
+        effects[2] = 'piece_corruption' in game.boss_attacks_active
+
+        boss = game.boss
+        if boss:
+            obs['boss'][:] = (boss.health, boss.max_health, boss.phase, boss.attack_timer, boss.attack_cooldown)
+            effects[3] = boss.shake_timer > 0
+            effects[4] = boss.is_stunned
+        else:
+            obs['boss'][:] = 0
+            effects[3:] = 0
@@ -0,0 +1,61 @@
+"""Cached fonts, rendered text and panel surfaces for the HUD"""
+import pygame
+
+# Rendered strings kept before the text cache starts over
+TEXT_CACHE_LIMIT = 512
+
+_fonts = {}
+
+
+def get_font(size):
+    """Default font at the given size, loaded once"""
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+
+class Hud:
+    """Renders text and panels once and hands back the cached surface until their inputs change"""
+    def __init__(self):
+        self.texts = {}
+        self.panels = {}
+        self.overlays = {}
+
+    def text(self, text, size, color):
+        key = (text, size, color)
+        surface = self.texts.get(key)
+        if surface is None:
+            # Score-like strings never repeat, so drop everything rather than grow forever
+            if len(self.texts) >= TEXT_CACHE_LIMIT:
+                self.texts.clear()
+            surface = self.texts[key] = get_font(size).render(text, True, color)
+        return surface
+
+    def panel(self, name, key, size, background, render):
+        """Surface for panel name; render(surface) is only called when key differs from last time"""
+        cached = self.panels.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        surface = cached[1] if cached is not None and cached[1].get_size() == size else self.new_surface(size)
+        surface.fill(background)
+        render(surface)
+        self.panels[name] = (key, surface)
+        return surface
+
+    def overlay(self, size, color, alpha):
+        """Translucent full-screen fill for the game over and victory screens"""
+        key = (size, color, alpha)
+        surface = self.overlays.get(key)
+        if surface is None:
+            surface = self.overlays[key] = pygame.Surface(size)
+            surface.set_alpha(alpha)
+            surface.fill(color)
+        return surface
+
+    def new_surface(self, size):
+        surface = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
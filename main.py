@@ -1,21 +1,67 @@
 import pygame
-import random
+import os
 import sys
 import math
+import time
 
-# Initialize Pygame
-pygame.init()
+import numpy as np
+
+from sprites import get_atlas, animation_bucket
+from hud import Hud, get_font
+from audio import get_audio
+from ai import AutoPlayer
+from replay import InputRecorder
+from profiler import Profiler
+from controls import Controls, EXPOSE_EVENTS, restrict_events
+from versus import VersusClient, apply_state, mirror_game, HOST, PORT
+
+from board import EMPTY, CORRUPTED, PALETTE_MASK
+from engine import TetrisGame, GRID_WIDTH, GRID_HEIGHT, CORRUPTION_COLOR, PALETTE
+from shapes import SHAPES
 
 # Constants
-GRID_WIDTH = 10
-GRID_HEIGHT = 20
 CELL_SIZE = 32
 GRID_X_OFFSET = 60
 GRID_Y_OFFSET = 60
 
+# The well is sized for a default board at CELL_SIZE. Other boards are zoomed to fit it, down to
+# MIN_CELL_SIZE pixels per cell, and scroll when they still do not fit
+WELL_WIDTH = GRID_WIDTH * CELL_SIZE
+WELL_HEIGHT = GRID_HEIGHT * CELL_SIZE
+MIN_CELL_SIZE = 5
+
+# Grid lines are left out below this cell size, where they would cover the blocks
+MIN_GRID_LINE_CELL = 10
+
+# Board size for new games as WIDTHxHEIGHT, e.g. TETRIZZ_BOARD=64x400 for the stress variant
+BOARD_SIZE = tuple(int(n) for n in os.environ.get('TETRIZZ_BOARD', f'{GRID_WIDTH}x{GRID_HEIGHT}').split('x'))
+
 WINDOW_WIDTH = GRID_WIDTH * CELL_SIZE + 2 * GRID_X_OFFSET + 350
 WINDOW_HEIGHT = GRID_HEIGHT * CELL_SIZE + 2 * GRID_Y_OFFSET + 40
 
+# Every game is recorded; the last one is kept here so bug reports can include an exact repro
+REPLAY_PATH = 'replays/last_game.json.gz'
+
+# F3 toggles the frame profiler overlay, F4 writes the last frames as a Chrome trace here
+TRACE_PATH = 'traces/trace-{}.json'
+PROFILER_Y = GRID_Y_OFFSET + GRID_HEIGHT * CELL_SIZE + 10
+PROFILER_RECT = (10, PROFILER_Y, WINDOW_WIDTH - 20, WINDOW_HEIGHT - PROFILER_Y - 5)
+
+# Match server for versus mode, as host:port
+VERSUS_SERVER = os.environ.get('TETRIZZ_SERVER', f'{HOST}:{PORT}')
+
+# Screen regions redrawn independently in dirty-rect mode
+UI_X = GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20
+BOARD_RECT = (GRID_X_OFFSET - 5, GRID_Y_OFFSET - 5, GRID_WIDTH * CELL_SIZE + 10, GRID_HEIGHT * CELL_SIZE + 10)
+NEXT_RECT = (UI_X, GRID_Y_OFFSET, 150, 125)
+SCORE_RECT = (UI_X, GRID_Y_OFFSET + 140, 150, 200)
+CONTROLS_RECT = (UI_X, GRID_Y_OFFSET + 355, 150, 200)
+BOSS_RECT = (UI_X, GRID_Y_OFFSET + 350, 262, 145)
+
+# Versus mode: the opponent's well, drawn at OPPONENT_CELL pixels per cell, with a caption below
+OPPONENT_CELL = 16
+OPPONENT_RECT = (UI_X + 165, GRID_Y_OFFSET, GRID_WIDTH * OPPONENT_CELL, GRID_HEIGHT * OPPONENT_CELL + 60)
+
 # Modern color palette
 BACKGROUND = (15, 15, 23)
 GRID_BG = (25, 25, 35)
@@ -29,701 +75,365 @@ SUCCESS = (80, 200, 120)
 WARNING = (255, 180, 80)
 DANGER = (255, 100, 100)
 BOSS_COLOR = (150, 50, 200)
-CORRUPTION_COLOR = (100, 50, 50)
 
-# Enhanced Tetromino colors with gradients
-TETROMINO_COLORS = {
-    'I': (0, 240, 255),      # Bright cyan
-    'O': (255, 220, 0),      # Golden yellow
-    'T': (160, 80, 255),     # Purple
-    'S': (80, 255, 80),      # Bright green
-    'Z': (255, 80, 80),      # Bright red
-    'J': (80, 120, 255),     # Blue
-    'L': (255, 160, 0)       # Orange
-}
+# Shadow color of each palette entry, as used for locked cells
+PALETTE_SHADOWS = [None] + [tuple(max(0, c - 60) for c in color) for color in PALETTE[1:]]
 
-# Shadow colors (darker versions)
-SHADOW_COLORS = {
-    'I': (0, 180, 200),
-    'O': (200, 170, 0),
-    'T': (120, 60, 200),
-    'S': (60, 200, 60),
-    'Z': (200, 60, 60),
-    'J': (60, 90, 200),
-    'L': (200, 120, 0)
-}
 
-# Tetromino shapes
-TETROMINOES = {
-    'I': [['.....',
-           '..#..',
-           '..#..',
-           '..#..',
-           '..#..'],
-          ['.....',
-           '.....',
-           '####.',
-           '.....',
-           '.....']],
-    
-    'O': [['.....',
-           '.....',
-           '.##..',
-           '.##..',
-           '.....']],
+class ParticlePool:
+    """Fixed-capacity particle storage: one array per attribute, dead slots recycled through a free list"""
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int16)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.size = np.zeros(capacity, dtype=np.uint8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.free = list(range(capacity - 1, -1, -1))
+        self.rng = np.random.default_rng()
     
-    'T': [['.....',
-           '.....',
-           '..#..',
-           '.###.',
-           '.....'],
-          ['.....',
-           '.....',
-           '.#...',
-           '.##..',
-           '.#...'],
-          ['.....',
-           '.....',
-           '.....',
-           '.###.',
-           '..#..'],
-          ['.....',
-           '.....',
-           '.#...',
-           '##...',
-           '.#...']],
+    def __len__(self):
+        return self.capacity - len(self.free)
     
-    'S': [['.....',
-           '.....',
-           '..##.',
-           '.##..',
-           '.....'],
-          ['.....',
-           '.#...',
-           '.##..',
-           '..#..',
-           '.....']],
+    def emit(self, x, y, color, velocity_scale=1.0):
+        """Spawn one burst (what used to be a ParticleEffect) at (x, y)"""
+        particle_count = 12 if velocity_scale > 1 else 8
+        particle_count = min(particle_count, len(self.free))
+        if not particle_count:
+            return
+        slots = self.free[-particle_count:]
+        del self.free[-particle_count:]
+        
+        self.x[slots] = x
+        self.y[slots] = y
+        self.vx[slots] = self.rng.uniform(-3, 3, particle_count) * velocity_scale
+        self.vy[slots] = self.rng.uniform(-5, -1, particle_count) * velocity_scale
+        self.life[slots] = int(30 * velocity_scale)
+        self.color[slots] = color
+        self.size[slots] = self.rng.integers(2, 5, particle_count)
+        self.alive[slots] = True
     
-    'Z': [['.....',
-           '.....',
-           '##...',
-           '.##..',
-           '.....'],
-          ['.....',
-           '..#..',
-           '.##..',
-           '.#...',
-           '.....']],
+    def update(self):
+        if len(self.free) == self.capacity:
+            return
+        alive = self.alive
+        self.x[alive] += self.vx[alive]
+        self.y[alive] += self.vy[alive]
+        self.vy[alive] += 0.2  # gravity
+        self.life[alive] -= 1
+        
+        dead = alive & (self.life <= 0)
+        if dead.any():
+            alive &= ~dead
+            self.free.extend(np.nonzero(dead)[0].tolist())
     
-    'J': [['.....',
-           '..#..',
-           '..#..',
-           '.##..',
-           '.....'],
-          ['.....',
-           '.....',
-           '#....',
-           '###..',
-           '.....'],
-          ['.....',
-           '.##..',
-           '.#...',
-           '.#...',
-           '.....'],
-          ['.....',
-           '.....',
-           '###..',
-           '..#..',
-           '.....']],
+    def bounds(self):
+        """Rect covering every live particle, or None when there are none"""
+        if len(self.free) == self.capacity:
+            return None
+        alive = self.alive
+        left, top = int(self.x[alive].min()) - 4, int(self.y[alive].min()) - 4
+        right, bottom = int(self.x[alive].max()) + 4, int(self.y[alive].max()) + 4
+        return pygame.Rect(left, top, right - left + 1, bottom - top + 1)
     
-    'L': [['.....',
-           '..#..',
-           '..#..',
-           '..##.',
-           '.....'],
-          ['.....',
-           '.....',
-           '###..',
-           '#....',
-           '.....'],
-          ['.....',
-           '##...',
-           '.#...',
-           '.#...',
-           '.....'],
-          ['.....',
-           '.....',
-           '..#..',
-           '###..',
-           '.....']]
-}
+    def draw(self, screen):
+        if len(self.free) == self.capacity:
+            return
+        slots = np.nonzero(self.alive)[0]
+        xs = self.x[slots].astype(np.int32).tolist()
+        ys = self.y[slots].astype(np.int32).tolist()
+        sizes = np.maximum(1, self.life[slots] // 10).tolist()
+        colors = self.color[slots].tolist()
+        for x, y, size, color in zip(xs, ys, sizes, colors):
+            pygame.draw.circle(screen, color, (x, y), size)
 
-class ParticleEffect:
-    def __init__(self, x, y, color, velocity_scale=1.0):
-        self.particles = []
-        particle_count = 12 if velocity_scale > 1 else 8
-        for _ in range(particle_count):
-            self.particles.append({
-                'x': x,
-                'y': y,
-                'vx': random.uniform(-3, 3) * velocity_scale,
-                'vy': random.uniform(-5, -1) * velocity_scale,
-                'life': int(30 * velocity_scale),
-                'color': color,
-                'size': random.randint(2, 4)
-            })
+
+class GameView:
+    """Pygame front end for a TetrisGame: drawing, particles and sound effects.
     
-    def update(self):
-        for particle in self.particles[:]:
-            particle['x'] += particle['vx']
-            particle['y'] += particle['vy']
-            particle['vy'] += 0.2  # gravity
-            particle['life'] -= 1
-            if particle['life'] <= 0:
-                self.particles.remove(particle)
+    In dirty-rect mode draw() only repaints the regions whose inputs changed
+    and returns their rects for pygame.display.update; it returns None when
+    it repainted the whole screen (first frame, screen shake, victory).
+    """
+    def __init__(self, game, dirty_rects=False):
+        self.game = game
+        self.dirty_rects = dirty_rects
+        self.particles = ParticlePool()
+        
+        # Viewport onto the board: first visible column and row, and how many of each fit
+        board = game.board
+        self.cell = max(MIN_CELL_SIZE, min(CELL_SIZE, WELL_WIDTH // board.width, WELL_HEIGHT // board.height))
+        self.columns = min(board.width, WELL_WIDTH // self.cell)
+        self.rows = min(board.height, WELL_HEIGHT // self.cell)
+        self.left = 0
+        self.top = 0
+        # Screen position of the viewport, centred in the well
+        self.well_rect = pygame.Rect(GRID_X_OFFSET + (WELL_WIDTH - self.columns * self.cell) // 2,
+                                     GRID_Y_OFFSET + (WELL_HEIGHT - self.rows * self.cell) // 2,
+                                     self.columns * self.cell, self.rows * self.cell)
+        self.sprites = get_atlas(self.cell)
+        self.hud = Hud()
+        self.audio = get_audio()
+        self.bucket_time = None
+        self.bucket = 0
+        
+        # Retained surface with the grid and the locked, non-animated cells
+        self.board_layer = None
+        self.board_layer_key = None
+        self.animated_cells = []
+        
+        # Dirty-rect bookkeeping: what each region showed when it was last drawn
+        self.needs_full_redraw = True
+        self.drawn = {}
+        self.drawn_piece_rects = []
+        self.drawn_particle_rect = None
+        # (name, rect, state function, draw method name); looked up per draw so instrumented methods are used
+        self.regions = [
+            ('next', pygame.Rect(NEXT_RECT), self.next_piece_state, 'draw_next_piece'),
+            ('score', pygame.Rect(SCORE_RECT), self.score_panel_state, 'draw_score_panel'),
+        ]
+        if game.boss_mode:
+            self.regions.append(('boss', pygame.Rect(BOSS_RECT), self.boss_panel_state, 'draw_boss_panel'))
+        else:
+            self.regions.append(('controls', pygame.Rect(CONTROLS_RECT), lambda: None, 'draw_controls'))
+        game.subscribe('lines_full', self.on_lines_full)
+        game.subscribe('line_cleared', self.on_line_cleared)
+        game.subscribe('hard_dropped', self.on_hard_dropped)
+        game.subscribe('garbage_added', self.on_garbage_added)
     
-    def draw(self, screen):
-        for particle in self.particles:
-            alpha = particle['life'] / 30.0
-            size = max(1, int(3 * alpha))
-            pygame.draw.circle(screen, particle['color'], 
-                             (int(particle['x']), int(particle['y'])), size)
-class Boss:
-    def __init__(self):
-        self.max_health = 100
-        self.health = self.max_health
-        self.phase = 1
-        self.attack_timer = 0
-        self.attack_cooldown = 5000  # milliseconds
-        self.is_stunned = False
-        self.stun_timer = 0
-        self.animation_time = 0
-        self.shake_intensity = 0
-        self.shake_timer = 0
-        self.last_attack = None
-        
-        # Boss attacks
-        self.attacks = {
-            1: ['garbage_lines', 'speed_boost'],
-            2: ['garbage_lines', 'speed_boost', 'grid_shake'],
-            3: ['garbage_lines', 'speed_boost', 'grid_shake', 'piece_theft', 'time_pressure']
-        }
+    def on_lines_full(self, rows):
+        # Add particles for line clear effect
+        game = self.game
+        for y in rows:
+            for x in range(self.left, self.left + self.columns):
+                px, py = self.cell_center(x, y)
+                self.particles.emit(px + game.grid_shake_x, py + game.grid_shake_y, game.cell_color(x, y), 1.5)
     
-    def take_damage(self, damage):
-        if not self.is_stunned:
-            self.health -= damage
-            self.health = max(0, self.health)
-            
-            # Phase transitions
-            if self.health <= 66 and self.phase == 1:
-                self.phase = 2
-                self.attack_cooldown = 2500
-            elif self.health <= 33 and self.phase == 2:
-                self.phase = 3
-                self.attack_cooldown = 2000
-            
-            # Stun on big damage
-            if damage >= 20:  # Tetris damage
-                self.is_stunned = True
-                self.stun_timer = 1500
+    def on_line_cleared(self, count):
+        self.audio.play('line_clear')
     
-    def update(self, dt):
-        self.animation_time += dt
-        
-        if self.is_stunned:
-            self.stun_timer -= dt
-            if self.stun_timer <= 0:
-                self.is_stunned = False
-        
-        if self.shake_timer > 0:
-            self.shake_timer -= dt
-            self.shake_intensity = max(0, self.shake_intensity - dt * 0.01)
+    def on_hard_dropped(self, distance):
+        self.audio.play('hard_drop')
         
-        if not self.is_stunned:
-            self.attack_timer += dt
+        # Add drop effect
+        if distance > 0:
+            piece = self.game.current_piece
+            for x, y in piece.get_cells():
+                px, py = self.cell_center(x, y)
+                self.particles.emit(px, py, piece.color)
+    
+    def on_garbage_added(self, count):
+        # Add particles for garbage lines
+        bottom = self.game.board.height - 1
+        for x in range(self.left, self.left + self.columns):
+            if self.game.board.is_filled(x, bottom):
+                px, py = self.cell_center(x, bottom)
+                self.particles.emit(px, py, CORRUPTION_COLOR, 0.5)
+    
+    def update(self, dt):
+        # Update particles
+        self.particles.update()
+    
+    def cell_position(self, x, y):
+        """Screen position of the top-left corner of board cell (x, y)"""
+        return (self.well_rect.x + (x - self.left) * self.cell, self.well_rect.y + (y - self.top) * self.cell)
     
-    def should_attack(self):
-        return self.attack_timer >= self.attack_cooldown and not self.is_stunned
+    def cell_center(self, x, y):
+        px, py = self.cell_position(x, y)
+        return px + self.cell // 2, py + self.cell // 2
     
-    def get_random_attack(self):
-        available_attacks = self.attacks.get(self.phase, self.attacks[1])
-        # Avoid repeating the same attack
-        if self.last_attack and len(available_attacks) > 1:
-            available_attacks = [a for a in available_attacks if a != self.last_attack]
-        return random.choice(available_attacks)
+    def is_visible(self, x, y):
+        return self.left <= x < self.left + self.columns and self.top <= y < self.top + self.rows
     
-    def execute_attack(self):
-        attack = self.get_random_attack()
-        self.last_attack = attack
-        self.attack_timer = 0
-        return attack
+    def follow(self):
+        """Scroll the viewport to keep the falling piece's column and landing row in view"""
+        piece = self.game.current_piece
+        board = self.game.board
+        self.left = scroll_start(self.left, piece.x + 1, self.columns, board.width)
+        if self.rows < board.height:
+            # Follow the stack rather than the piece, which spends most of its fall out of view on tall boards
+            self.top = scroll_start(self.top, self.ghost_y() + 1, self.rows, board.height)
     
-    def draw(self, screen, x, y, width, height):
+    def boss_face_color(self):
+        boss = self.game.boss
+        # Boss face color based on health/stun
+        if boss.is_stunned:
+            boss_face_color = (100, 100, 200)
+        elif boss.health < 30:
+            boss_face_color = DANGER
+        else:
+            boss_face_color = BOSS_COLOR
+        
+        # Animated boss face
+        pulse = abs(math.sin(boss.animation_time * 0.005)) * 0.2 + 0.8
+        return tuple(int(c * pulse) for c in boss_face_color)
+    
+    def draw_boss(self, screen, x, y, width, height):
+        """Health bar, name and health text; the animated avatar is drawn by draw_boss_avatar"""
+        boss = self.game.boss
+        
         # Boss health bar background
         health_bg = pygame.Rect(x, y, width, 20)
         pygame.draw.rect(screen, (50, 50, 50), health_bg, border_radius=10)
         
         # Health bar
-        health_width = int((self.health / self.max_health) * width)
-        health_color = DANGER if self.health < 30 else WARNING if self.health < 60 else SUCCESS
+        health_width = int((boss.health / boss.max_health) * width)
+        health_color = DANGER if boss.health < 30 else WARNING if boss.health < 60 else SUCCESS
         if health_width > 0:
             health_bar = pygame.Rect(x, y, health_width, 20)
             pygame.draw.rect(screen, health_color, health_bar, border_radius=10)
         
         # Boss name and phase
-        font = pygame.font.Font(None, 24)
-        boss_text = font.render(f"TETRIS OVERLORD - Phase {self.phase}", True, BOSS_COLOR)
+        boss_text = self.hud.text(f"TETRIS OVERLORD - Phase {boss.phase}", 24, BOSS_COLOR)
         screen.blit(boss_text, (x, y - 47))
         
         # Health text
-        health_text = font.render(f"{self.health}/{self.max_health}", True, TEXT_PRIMARY)
+        health_text = self.hud.text(f"{boss.health}/{boss.max_health}", 24, TEXT_PRIMARY)
         screen.blit(health_text, (x + width - 60, y - 25))
+    
+    def draw_boss_avatar(self, screen, x, y, width):
+        boss = self.game.boss
         
         # Boss avatar (animated)
         avatar_rect = pygame.Rect(x + width + 10, y - 15, 50, 50)
         
-        # Boss face color based on health/stun
-        if self.is_stunned:
-            boss_face_color = (100, 100, 200)
-        elif self.health < 30:
-            boss_face_color = DANGER
-        else:
-            boss_face_color = BOSS_COLOR
-        
-        # Animated boss face
-        pulse = abs(math.sin(self.animation_time * 0.005)) * 0.2 + 0.8
-        face_color = tuple(int(c * pulse) for c in boss_face_color)
+        face_color = self.boss_face_color()
         
         pygame.draw.rect(screen, face_color, avatar_rect, border_radius=8)
         pygame.draw.rect(screen, TEXT_PRIMARY, avatar_rect, 2, border_radius=8)
         
         # Boss eyes
-        eye_size = 6 if not self.is_stunned else 4
+        eye_size = 6 if not boss.is_stunned else 4
         eye_y = avatar_rect.y + 15
         pygame.draw.circle(screen, (255, 0, 0), (avatar_rect.x + 15, eye_y), eye_size)
         pygame.draw.circle(screen, (255, 0, 0), (avatar_rect.x + 35, eye_y), eye_size)
         
         # Boss mouth
-        if self.is_stunned:
+        if boss.is_stunned:
             # Dizzy mouth
             pygame.draw.arc(screen, TEXT_PRIMARY, (avatar_rect.x + 15, avatar_rect.y + 25, 20, 15), 0, math.pi, 2)
         else:
             # Evil grin
             pygame.draw.arc(screen, TEXT_PRIMARY, (avatar_rect.x + 15, avatar_rect.y + 30, 20, 10), math.pi, 2 * math.pi, 2)
-
-class Tetromino:
-    def __init__(self, shape, color):
-        self.shape = shape
-        self.color = color
-        self.shadow_color = SHADOW_COLORS[shape]
-        self.x = GRID_WIDTH // 2 - 2
-        self.y = 0
-        self.rotation = 0
-        self.animation_offset = 0
-        self.pulse = 0
-        self.is_corrupted = False
-    
-    def get_rotated_shape(self):
-        return TETROMINOES[self.shape][self.rotation]
-    
-    def get_cells(self):
-        cells = []
-        shape = self.get_rotated_shape()
-        for i, row in enumerate(shape):
-            for j, cell in enumerate(row):
-                if cell == '#':
-                    cells.append((self.x + j, self.y + i))
-        return cells
-
-class TetrisGame:
-    def __init__(self, boss_mode=False):
-        self.grid = [[None for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-        self.corrupted_grid = [[False for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-        
-        # Initialize boss mode first
-        self.boss_mode = boss_mode
-        self.boss = Boss() if boss_mode else None
-        self.boss_attacks_active = []
-        self.speed_boost_timer = 0
-        self.time_pressure_timer = 0
-        self.game_won = False
-
-        # Safely call get_new_piece
-        self.current_piece = self.get_new_piece()
-        self.next_piece = self.get_new_piece()
-
-        self.score = 0
-        self.level = 1
-        self.lines_cleared = 0
-        self.fall_time = 0
-        self.fall_speed = 500
-        self.base_fall_speed = 500
-        self.particles = []
-        self.line_clear_animation = []
-        self.animation_time = 0
-        self.grid_shake_x = 0
-        self.grid_shake_y = 0
-        self.pending_line_clears = []
-        self.line_clear_timer = 0
-        
-    def get_new_piece(self):
-        shape = random.choice(list(TETROMINOES.keys()))
-        piece = Tetromino(shape, TETROMINO_COLORS[shape])
-        # Boss attack: make some pieces corrupted
-        if self.boss_mode and 'piece_corruption' in self.boss_attacks_active and random.random() < 0.3:
-            piece.is_corrupted = True
-            piece.color = CORRUPTION_COLOR
-        
-        return piece
-    
-    def is_valid_position(self, piece, dx=0, dy=0, rotation=None):
-        if rotation is None:
-            rotation = piece.rotation
-        
-        old_rotation = piece.rotation
-        piece.rotation = rotation
-        
-        for x, y in piece.get_cells():
-            x += dx
-            y += dy
-            
-            if x < 0 or x >= GRID_WIDTH or y >= GRID_HEIGHT:
-                piece.rotation = old_rotation
-                return False
-            
-            if y >= 0 and self.grid[y][x] is not None:
-                piece.rotation = old_rotation
-                return False
-        
-        piece.rotation = old_rotation
-        return True
-    
-    def place_piece(self, piece):
-        for x, y in piece.get_cells():
-            if y >= 0:
-                self.grid[y][x] = piece.color
-                if piece.is_corrupted: # Mark corrupted Cells
-                    self.corrupted_grid[y][x] = True
-
-        lines_to_clear = []
-        for y in range(GRID_HEIGHT):
-            if all(cell is not None for cell in self.grid[y]):
-                lines_to_clear.append(y)
-        
-        # Add line clear animation
-        if lines_to_clear:
-            self.line_clear_animation = lines_to_clear[:]
-            self.pending_line_clears = lines_to_clear[:]
-            self.line_clear_timer = 0 
-            # Add particles for line clear effect
-            for y in lines_to_clear:
-                for x in range(GRID_WIDTH):
-                    px = GRID_X_OFFSET + x * CELL_SIZE + CELL_SIZE // 2 + self.grid_shake_x
-                    py = GRID_Y_OFFSET + y * CELL_SIZE + CELL_SIZE // 2 + self.grid_shake_y
-                    self.particles.append(ParticleEffect(px, py, self.grid[y][x], 1.5))
-
-    def move_piece(self, dx, dy):
-        if self.is_valid_position(self.current_piece, dx, dy):
-            self.current_piece.x += dx
-            self.current_piece.y += dy
-            return True
-        return False
-    
-    def rotate_piece(self):
-        rotations = len(TETROMINOES[self.current_piece.shape])
-        new_rotation = (self.current_piece.rotation + 1) % rotations
-        
-        if self.is_valid_position(self.current_piece, 0, 0, new_rotation):
-            self.current_piece.rotation = new_rotation
-            return True
-        return False
-    
-    def add_garbage_lines(self, count=1):
-        """Boss attack: add garbage lines from bottom"""
-        for _ in range(count):
-            # Remove top line
-            self.grid.pop(0)
-            self.corrupted_grid.pop(0)
-            
-            # Add garbage line at bottom
-            garbage_line = [CORRUPTION_COLOR if random.random() < 0.8 else None for _ in range(GRID_WIDTH)]
-            # Ensure there's at least one gap
-            gap_pos = random.randint(0, GRID_WIDTH - 1)
-            garbage_line[gap_pos] = None
-            
-            self.grid.append(garbage_line)
-            self.corrupted_grid.append([cell is not None for cell in garbage_line])
-        
-        # Add particles for garbage lines
-        for x in range(GRID_WIDTH):
-            if self.grid[-1][x] is not None:
-                px = GRID_X_OFFSET + x * CELL_SIZE + CELL_SIZE // 2
-                py = GRID_Y_OFFSET + (GRID_HEIGHT - 1) * CELL_SIZE + CELL_SIZE // 2
-                self.particles.append(ParticleEffect(px, py, CORRUPTION_COLOR, 0.5))
-    
-    def execute_boss_attack(self, attack):
-        """Execute a boss attack"""
-        if attack == 'garbage_lines':
-            self.add_garbage_lines(random.randint(1, 2))
-            
-        elif attack == 'speed_boost':
-            self.speed_boost_timer = 5000  # 5 seconds of fast fall
-            
-        elif attack == 'piece_corruption':
-            if 'piece_corruption' not in self.boss_attacks_active:
-                self.boss_attacks_active.append('piece_corruption')
-            
-        elif attack == 'grid_shake':
-            self.boss.shake_intensity = 3
-            self.boss.shake_timer = 2000
-            
-        elif attack == 'piece_theft':
-            # Steal next piece and give a bad one (random)
-            self.next_piece = self.get_new_piece()
-            
-        elif attack == 'time_pressure':
-            self.time_pressure_timer = 10000  # 10 seconds of extreme speed
-    
-    def update(self, dt):
-        self.animation_time += dt
-        
-        # Update boss
-        if self.boss_mode and self.boss and not self.game_won:
-            self.boss.update(dt)
-            
-            # Execute boss attacks
-            if self.boss.should_attack():
-                attack = self.boss.execute_attack()
-                self.execute_boss_attack(attack)
-        
-        # Update boss attack timers
-        if self.speed_boost_timer > 0:
-            self.speed_boost_timer -= dt
-        
-        if self.time_pressure_timer > 0:
-            self.time_pressure_timer -= dt
-        else:
-            # Remove piece corruption when time pressure ends
-            if 'piece_corruption' in self.boss_attacks_active:
-                self.boss_attacks_active.remove('piece_corruption')
-        
-        # Update grid shake
-        if self.boss and self.boss.shake_timer > 0:
-            shake_amount = int(self.boss.shake_intensity)
-            self.grid_shake_x = random.randint(-shake_amount, shake_amount)
-            self.grid_shake_y = random.randint(-shake_amount, shake_amount)
-        else:
-            self.grid_shake_x = 0
-            self.grid_shake_y = 0
-        
-        # Calculate current fall speed with boss effects
-        current_fall_speed = self.base_fall_speed
-        if self.speed_boost_timer > 0:
-            current_fall_speed //= 2
-        if self.time_pressure_timer > 0:
-            current_fall_speed //= 4
-        
-        self.fall_speed = current_fall_speed
-
-        # Update particles
-        for particle_effect in self.particles[:]:
-            particle_effect.update()
-            if not particle_effect.particles:
-                self.particles.remove(particle_effect)
-        """"""
-        # Update line clear timer
-        if self.line_clear_animation:
-            self.line_clear_timer += dt
-        # Clear line clear animation
-        if self.line_clear_animation and self.animation_time > 300:
-            if self.pending_line_clears:
-                # Clear lines (clear from bottom to top to avoid index shifting issues)
-                clear_effect = pygame.mixer.Sound('sfx/dropop.wav')
-                clear_effect.play()
-                lines_cleared = len(self.pending_line_clears)
-                for y in sorted(self.pending_line_clears, reverse=True):
-                    del self.grid[y]
-                    del self.corrupted_grid[y]
-                for _ in range(lines_cleared):
-                    self.grid.insert(0, [None for _ in range(GRID_WIDTH)])
-                    self.corrupted_grid.insert(0, [False for _ in range(GRID_WIDTH)])
-            
-                lines_cleared = len(self.pending_line_clears)
-                self.lines_cleared += lines_cleared
-                
-                # Enhanced scoring
-                score_values = {0: 0, 1: 100, 2: 300, 3: 500, 4: 800}
-                line_score = score_values.get(lines_cleared, 0) * self.level
-                self.score += line_score
-                
-                # Boss damage
-                if self.boss_mode and self.boss and lines_cleared > 0:
-                    damage = lines_cleared * 5
-                    if lines_cleared == 4:  # Tetris
-                        damage = 25
-                    self.boss.take_damage(damage)
-                    
-                    # Check win condition
-                    if self.boss.health <= 0:
-                        self.game_won = True
-                
-                # Level progression
-                self.level = self.lines_cleared // 10 + 1
-                self.base_fall_speed = max(50, 500 - (self.level - 1) * 25)
-
-                self.pending_line_clears = []
-
-            self.line_clear_animation = []
-            self.line_clear_timer = 0
-        
-        self.fall_time += dt
-        
-        if self.fall_time >= self.fall_speed:
-            if not self.move_piece(0, 1):
-                self.place_piece(self.current_piece)
-                self.current_piece = self.next_piece
-                self.next_piece = self.get_new_piece()
-                
-                # Check game over
-                if not self.is_valid_position(self.current_piece):
-                    return False
-            
-            self.fall_time = 0
-        
-        return True
-    
-    def hard_drop(self):
-        drop_effect = pygame.mixer.Sound('sfx/dblock.mp3')
-        drop_effect.play()
-        drop_distance = 0
-        while self.move_piece(0, 1):
-            drop_distance += 1
-            self.score += 2
-        
-        # Add drop effect
-        if drop_distance > 0:
-            # fixed bug placed block moved yippeeeeeeee
-            self.place_piece(self.current_piece)
-            self.current_piece = self.next_piece
-            self.next_piece = self.get_new_piece()
-            self.fall_time = 0  # Reset fall timer
-            for x, y in self.current_piece.get_cells():
-                px = GRID_X_OFFSET + x * CELL_SIZE + CELL_SIZE // 2
-                py = GRID_Y_OFFSET + y * CELL_SIZE + CELL_SIZE // 2
-                self.particles.append(ParticleEffect(px, py, self.current_piece.color))
     
     def draw_rounded_rect(self, screen, color, rect, radius=4):
         """Draw a rounded rectangle"""
         pygame.draw.rect(screen, color, rect, border_radius=radius)
     
-    def draw_cell_with_gradient(self, screen, x, y, color, shadow_color, highlight=False, corrupted=False):
-        adjusted_x = x + self.grid_shake_x // 2
-        adjusted_y = y + self.grid_shake_y // 2
-        
-        """Draw a cell with gradient effect"""
-        rect = pygame.Rect(
-            GRID_X_OFFSET + adjusted_x * CELL_SIZE + 1,
-            GRID_Y_OFFSET + adjusted_y * CELL_SIZE + 1,
-            CELL_SIZE - 2,
-            CELL_SIZE - 2
-        )
-        
-        # Corrupted blocks have special color
+    def animation_bucket(self):
+        """Pulse/flicker phase for this frame, computed once per animation time"""
+        if self.bucket_time != self.game.animation_time:
+            self.bucket_time = self.game.animation_time
+            self.bucket = animation_bucket(self.bucket_time)
+        return self.bucket
+    
+    def draw_cell_with_gradient(self, screen, x, y, color, shadow_color, highlight=False, corrupted=False, lift=0):
+        """Draw a cell with gradient effect, lift pixels above its row"""
+        # Corrupted blocks flicker, highlighted blocks pulse
         if corrupted:
-            # Flickering corruption effect
-            flicker = abs(math.sin(self.animation_time * 0.01)) * 0.5 + 0.5
-            corruption_color = tuple(int(c * flicker) for c in CORRUPTION_COLOR)
-            self.draw_rounded_rect(screen, corruption_color, rect, 3)
-            
-            # Corruption overlay
-            overlay_rect = pygame.Rect(rect.x + 4, rect.y + 4, rect.width - 8, rect.height - 8)
-            pygame.draw.rect(screen, (150, 0, 0), overlay_rect, 1)
+            sprite = self.sprites.cell(CORRUPTION_COLOR, None, corrupted_bucket=self.animation_bucket())
+        elif highlight:
+            sprite = self.sprites.cell(color, shadow_color, highlight_bucket=self.animation_bucket())
         else:
-            # Normal block rendering
-            self.draw_rounded_rect(screen, color, rect, 3)
-        
-            # Highlight effect
-            if highlight:
-                pulse = abs(math.sin(self.animation_time * 0.01)) * 0.3 + 0.7
-                highlight_color = tuple(min(255, max(0, int(c * pulse))) for c in color)
-                self.draw_rounded_rect(screen, highlight_color, rect, 3)
-        
-        # Inner highlight
-        if not corrupted:
-            inner_rect = pygame.Rect(rect.x + 2, rect.y + 2, rect.width - 8, 4)
-            highlight_color = tuple(min(255, max(0, c + 40)) for c in color)
-            self.draw_rounded_rect(screen, highlight_color, inner_rect, 2)
-        
-            # Shadow - ensure no negative values
-            shadow_rect = pygame.Rect(rect.x + 2, rect.bottom - 6, rect.width - 4, 4)
-            safe_shadow_color = tuple(max(0, min(255, c)) for c in shadow_color)
-            self.draw_rounded_rect(screen, safe_shadow_color, shadow_rect, 2)
+            sprite = self.sprites.cell(color, shadow_color)
+        
+        px, py = self.cell_position(x, y)
+        screen.blit(sprite, (px + 1 + self.game.grid_shake_x, py + 1 + self.game.grid_shake_y - lift))
     
-    def draw_grid(self, screen):
+    def render_board_layer(self):
+        """Re-render the grid and locked cells; animated cells are left for draw_grid"""
+        game = self.game
+        cell = self.cell
+        width, height = self.well_rect.size
+        if self.board_layer is None:
+            self.board_layer = pygame.Surface((width + 10, height + 10))
+        layer = self.board_layer
+        
         # Draw background
-        grid_bg_rect = pygame.Rect(
-            GRID_X_OFFSET - 5 + self.grid_shake_x, 
-            GRID_Y_OFFSET - 5 + self.grid_shake_y,
-            GRID_WIDTH * CELL_SIZE + 10, 
-            GRID_HEIGHT * CELL_SIZE + 10
-        )
-        self.draw_rounded_rect(screen, GRID_BG, grid_bg_rect, 8)
+        layer.fill(BACKGROUND)
+        self.draw_rounded_rect(layer, GRID_BG, layer.get_rect(), 8)
         
         # Draw grid lines
-        for x in range(GRID_WIDTH + 1):
-            start_pos = (GRID_X_OFFSET + x * CELL_SIZE + self.grid_shake_x, GRID_Y_OFFSET + self.grid_shake_y)
-            end_pos = (GRID_X_OFFSET + x * CELL_SIZE + self.grid_shake_x, GRID_Y_OFFSET + GRID_HEIGHT * CELL_SIZE + self.grid_shake_y)
-            pygame.draw.line(screen, GRID_LINE, start_pos, end_pos, 1)
-        
-        for y in range(GRID_HEIGHT + 1):
-            start_pos = (GRID_X_OFFSET + self.grid_shake_x, GRID_Y_OFFSET + y * CELL_SIZE + self.grid_shake_y)
-            end_pos = (GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + self.grid_shake_x, GRID_Y_OFFSET + y * CELL_SIZE + self.grid_shake_y)
-            pygame.draw.line(screen, GRID_LINE, start_pos, end_pos, 1)
-        
-        # Draw placed pieces
-        for y in range(GRID_HEIGHT):
-            for x in range(GRID_WIDTH):
-                if self.grid[y][x] is not None:
-                    # Check if this line is being cleared
-                    highlight = y in self.line_clear_animation
-                    shadow_color = tuple(max(0, c - 60) for c in self.grid[y][x])
-                    self.draw_cell_with_gradient(screen, x, y, self.grid[y][x], shadow_color, highlight, self.corrupted_grid[y][x])
+        if cell >= MIN_GRID_LINE_CELL:
+            for x in range(self.columns + 1):
+                pygame.draw.line(layer, GRID_LINE, (5 + x * cell, 5), (5 + x * cell, 5 + height), 1)
+            
+            for y in range(self.rows + 1):
+                pygame.draw.line(layer, GRID_LINE, (5, 5 + y * cell), (5 + width, 5 + y * cell), 1)
+        
+        # Draw placed pieces in view; pulsing and flickering cells are redrawn every frame instead
+        board = game.board
+        left, top = self.left, self.top
+        visible = ((1 << self.columns) - 1) << left
+        self.animated_cells = []
+        for y in range(top, top + self.rows):
+            if not board.row_masks[y] & visible:
+                continue
+            # Check if this line is being cleared
+            highlight = y in game.line_clear_animation
+            for x, value in enumerate(board.row(y)[left:left + self.columns], left):
+                if value == EMPTY:
+                    continue
+                index = value & PALETTE_MASK
+                if highlight or value & CORRUPTED:
+                    self.animated_cells.append((x, y, PALETTE[index], PALETTE_SHADOWS[index], highlight, value & CORRUPTED))
+                else:
+                    sprite = self.sprites.cell(PALETTE[index], PALETTE_SHADOWS[index])
+                    layer.blit(sprite, (5 + (x - left) * cell + 1, 5 + (y - top) * cell + 1))
     
-    def draw_piece(self, screen, piece, ghost=False):
-        alpha = 0.3 if ghost else 1.0
-        
+    def draw_grid(self, screen):
+        # The layer only changes when the board or the line clear animation does
+        game = self.game
+        key = (game.board.version, tuple(game.line_clear_animation), self.left, self.top)
+        if key != self.board_layer_key:
+            self.render_board_layer()
+            self.board_layer_key = key
+        
+        screen.blit(self.board_layer, (self.well_rect.x - 5 + game.grid_shake_x, self.well_rect.y - 5 + game.grid_shake_y))
+        for x, y, color, shadow_color, highlight, corrupted in self.animated_cells:
+            self.draw_cell_with_gradient(screen, x, y, color, shadow_color, highlight, corrupted)
+    
+    def draw_piece(self, screen, piece):
+        lift = self.fall_lift() if piece is self.game.current_piece else 0
         for x, y in piece.get_cells():
-            if y >= 0:
-                if ghost:
-                    # Draw ghost piece
-                    rect = pygame.Rect(
-                        GRID_X_OFFSET + x * CELL_SIZE + 1 + self.grid_shake_x,
-                        GRID_Y_OFFSET + y * CELL_SIZE + 1 + self.grid_shake_y,
-                        CELL_SIZE - 2,
-                        CELL_SIZE - 2
-                    )
-                    ghost_color = tuple(max(0, c // 3) for c in piece.color)
-                    pygame.draw.rect(screen, ghost_color, rect, 2, border_radius=3)
-                else:
-                    shadow_color = tuple(max(0, c - 60) for c in piece.color)
-                    self.draw_cell_with_gradient(screen, x, y, piece.color, piece.shadow_color, True, piece.is_corrupted)
+            # Cells sliding in from above the view only appear once they are fully inside it
+            if self.is_visible(x, y) and (y - self.top) * self.cell >= lift:
+                self.draw_cell_with_gradient(screen, x, y, piece.color, piece.shadow_color, True, piece.is_corrupted,
+                                             lift)
+    
+    def fall_lift(self):
+        """Pixels above its row to draw the falling piece, interpolating its fall between the last two ticks"""
+        game = self.game
+        if game.tick_start is None:
+            return 0
+        piece, x, y, rotation = game.tick_start
+        current = game.current_piece
+        if piece is not current or current.x != x or current.rotation != rotation or current.y <= y:
+            return 0
+        return int((current.y - y) * self.cell * (1 - game.tick_fraction()))
+    
+    def ghost_y(self):
+        """Row where the current piece would land"""
+        piece = self.game.current_piece
+        return self.game.landing_row(piece.shape, piece.rotation, piece.x, piece.y)
     
     def draw_ghost_piece(self, screen):
-        if not self.current_piece:
+        if not self.game.current_piece:
             return
         """Draw the ghost piece showing where the current piece will land"""
-        ghost_piece = Tetromino(self.current_piece.shape, self.current_piece.color)
-        ghost_piece.x = self.current_piece.x
-        ghost_piece.y = self.current_piece.y
-        ghost_piece.rotation = self.current_piece.rotation
-        
-        # Move ghost piece down until it can't move anymore
-        while self.is_valid_position(ghost_piece, 0, 1):
-            ghost_piece.y += 1
+        piece = self.game.current_piece
+        ghost_y = self.ghost_y()
         
         # Only draw if ghost is below current piece
-        if ghost_piece.y > self.current_piece.y:
-            self.draw_piece(screen, ghost_piece, ghost=True)
+        if ghost_y > piece.y:
+            sprite = self.sprites.ghost(piece.color)
+            for dx, dy in SHAPES[piece.shape][piece.rotation].cells:
+                if self.is_visible(piece.x + dx, ghost_y + dy):
+                    px, py = self.cell_position(piece.x + dx, ghost_y + dy)
+                    screen.blit(sprite, (px + 1 + self.game.grid_shake_x, py + 1 + self.game.grid_shake_y))
     
     def draw_ui_panel(self, screen, x, y, width, height, title):
         """Draw a styled UI panel"""
@@ -732,144 +442,153 @@ class TetrisGame:
         pygame.draw.rect(screen, UI_BORDER, panel_rect, 2, border_radius=8)
         
         if title:
-            font = pygame.font.Font(None, 24)
-            title_text = font.render(title, True, TEXT_PRIMARY)
+            title_text = self.hud.text(title, 24, TEXT_PRIMARY)
             screen.blit(title_text, (x + 10, y + 8))
         
         return panel_rect
     
     def draw_next_piece(self, screen):
-        ui_x = GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20
-        ui_y = GRID_Y_OFFSET
+        panel = self.hud.panel('next', self.next_piece_state(), NEXT_RECT[2:], BACKGROUND, self.render_next_piece)
+        screen.blit(panel, NEXT_RECT[:2])
+    
+    def render_next_piece(self, screen):
+        # Drawn onto the panel's own surface, so coordinates are relative to NEXT_RECT
+        ui_x = 0
+        ui_y = 0
         
         panel = self.draw_ui_panel(screen, ui_x, ui_y, 150, 125, "Next")
         
         # Draw next piece
-        if self.next_piece:
-            shape = self.next_piece.get_rotated_shape()
+        if self.game.next_piece:
+            shape = self.game.next_piece.get_rotated_shape()
             piece_width = len(shape[0])
             piece_height = len(shape)
 
             start_x = ui_x + 5 + (150 - piece_width * 20) // 2
             start_y = ui_y + 20 + (80 - piece_height * 20) // 2
             
-            for i, row in enumerate(shape):
-                for j, cell in enumerate(row):
-                    if cell == '#':
-                        mini_rect = pygame.Rect(
-                            start_x + j * 20,
-                            start_y + i * 20,
-                            18,
-                            18
-                        )
-                        color = self.next_piece.color
-                        if self.next_piece.is_corrupted:
-                            # Flickering corruption effect
-                            flicker = abs(math.sin(self.animation_time * 0.01)) * 0.5 + 0.5
-                            color = tuple(int(c * flicker) for c in CORRUPTION_COLOR)
-                        
-                        self.draw_rounded_rect(screen, color, mini_rect, 3)
+            if self.game.next_piece.is_corrupted:
+                # Flickering corruption effect
+                sprite = self.sprites.mini(CORRUPTION_COLOR, 18, self.animation_bucket())
+            else:
+                sprite = self.sprites.mini(self.game.next_piece.color, 18)
+            
+            for j, i in self.game.next_piece.get_offsets().cells:
+                screen.blit(sprite, (start_x + j * 20, start_y + i * 20))
     
     def draw_score_panel(self, screen):
-        ui_x = GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20
-        ui_y = GRID_Y_OFFSET + 140
+        panel = self.hud.panel('score', self.score_panel_state(), SCORE_RECT[2:], BACKGROUND, self.render_score_panel)
+        screen.blit(panel, SCORE_RECT[:2])
+    
+    def render_score_panel(self, screen):
+        # Relative to SCORE_RECT
+        ui_x = 0
+        ui_y = 0
         
         panel_rect = self.draw_ui_panel(screen, ui_x, ui_y, 150, 200, "STATS")
         
-        font = pygame.font.Font(None, 20)
+        text = self.hud.text
         y_offset = ui_y + 35
         
         # Score
-        score_text = font.render(f"Score: {self.score:,}", True, TEXT_PRIMARY)
+        score_text = text(f"Score: {self.game.score:,}", 20, TEXT_PRIMARY)
         screen.blit(score_text, (ui_x + 10, y_offset))
         y_offset += 25
         
         # Level
-        level_text = font.render(f"Level: {self.level}", True, TEXT_PRIMARY)
+        level_text = text(f"Level: {self.game.level}", 20, TEXT_PRIMARY)
         screen.blit(level_text, (ui_x + 10, y_offset))
         y_offset += 25
         
         # Lines
-        lines_text = font.render(f"Lines: {self.lines_cleared}", True, TEXT_PRIMARY)
+        lines_text = text(f"Lines: {self.game.lines_cleared}", 20, TEXT_PRIMARY)
         screen.blit(lines_text, (ui_x + 10, y_offset))
         y_offset += 35
         
         # Boss mode indicators
-        if self.boss_mode:
+        if self.game.boss_mode:
             # Active effects
-            if self.speed_boost_timer > 0:
-                effect_text = font.render("SPEED BOOST!", True, WARNING)
+            if self.game.speed_boost_timer > 0:
+                effect_text = text("SPEED BOOST!", 20, WARNING)
                 screen.blit(effect_text, (ui_x + 10, y_offset))
                 y_offset += 20
             
-            if self.time_pressure_timer > 0:
-                effect_text = font.render("TIME PRESSURE!", True, DANGER)
+            if self.game.time_pressure_timer > 0:
+                effect_text = text("TIME PRESSURE!", 20, DANGER)
                 screen.blit(effect_text, (ui_x + 10, y_offset))
                 y_offset += 20
             
-            if 'piece_corruption' in self.boss_attacks_active:
-                effect_text = font.render("CORRUPTION!", True, CORRUPTION_COLOR)
+            if 'piece_corruption' in self.game.boss_attacks_active:
+                effect_text = text("CORRUPTION!", 20, CORRUPTION_COLOR)
                 screen.blit(effect_text, (ui_x + 10, y_offset))
                 y_offset += 20
             
-            if self.boss and self.boss.is_stunned:
-                effect_text = font.render("BOSS STUNNED", True, SUCCESS)
+            if self.game.boss and self.game.boss.is_stunned:
+                effect_text = text("BOSS STUNNED", 20, SUCCESS)
                 screen.blit(effect_text, (ui_x + 10, y_offset))
                 y_offset += 20
 
     def draw_boss_panel(self, screen):
-        if not self.boss_mode or not self.boss:
+        if not self.game.boss_mode or not self.game.boss:
             return
         
-        ui_x = GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20
-        ui_y = GRID_Y_OFFSET + 400
+        panel = self.hud.panel('boss', self.boss_hud_key(), BOSS_RECT[2:], BACKGROUND, self.render_boss_panel)
+        screen.blit(panel, BOSS_RECT[:2])
+        self.draw_boss_avatar(screen, UI_X, GRID_Y_OFFSET + 400, 200)
+    
+    def render_boss_panel(self, screen):
+        # Relative to BOSS_RECT
+        ui_x = 0
+        ui_y = GRID_Y_OFFSET + 400 - BOSS_RECT[1]
         
         # Boss health and info
-        self.boss.draw(screen, ui_x, ui_y, 200, 20)
+        self.draw_boss(screen, ui_x, ui_y, 200, 20)
         
         # Attack warning
-        if self.boss.attack_timer > self.boss.attack_cooldown * 0.8 and not self.boss.is_stunned:
+        if self.attack_warning_visible():
             warning_y = ui_y + 70
-            font = pygame.font.Font(None, 24)
-            warning_text = font.render("INCOMING ATTACK!", True, DANGER)
+            warning_text = self.hud.text("INCOMING ATTACK!", 24, DANGER)
+            screen.blit(warning_text, (ui_x, warning_y))
+    
+    def attack_warning_visible(self):
+        boss = self.game.boss
+        if boss.attack_timer > boss.attack_cooldown * 0.8 and not boss.is_stunned:
             # Blinking effect
-            if int(self.animation_time / 100) % 2:
-                screen.blit(warning_text, (ui_x, warning_y))
+            return int(self.game.animation_time / 100) % 2 == 1
+        return False
     
     def draw_victory_screen(self, screen):
-        if not self.game_won:
+        if not self.game.game_won:
             return
         
         # Victory overlay
-        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-        overlay.set_alpha(200)
-        overlay.fill((0, 0, 0))
-        screen.blit(overlay, (0, 0))
+        screen.blit(self.hud.overlay((WINDOW_WIDTH, WINDOW_HEIGHT), (0, 0, 0), 200), (0, 0))
         
         # Victory text
-        font_large = pygame.font.Font(None, 72)
-        font_medium = pygame.font.Font(None, 36)
-        
-        victory_text = font_large.render("VICTORY!", True, SUCCESS)
+        victory_text = self.hud.text("VICTORY!", 72, SUCCESS)
         victory_rect = victory_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50))
         screen.blit(victory_text, victory_rect)
         
-        score_text = font_medium.render(f"Final Score: {self.score:,}", True, TEXT_PRIMARY)
+        score_text = self.hud.text(f"Final Score: {self.game.score:,}", 36, TEXT_PRIMARY)
         score_rect = score_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 20))
         screen.blit(score_text, score_rect)
         
-        restart_text = font_medium.render("Press R to restart or ESC to quit", True, TEXT_SECONDARY)
+        restart_text = self.hud.text("Press R to restart or ESC to quit", 36, TEXT_SECONDARY)
         restart_rect = restart_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 60))
         screen.blit(restart_text, restart_rect)
     
     def draw_controls(self, screen):
-        ui_x = GRID_X_OFFSET + GRID_WIDTH * CELL_SIZE + 20
-        ui_y = GRID_Y_OFFSET + 355
+        # Never changes, so it is rendered once
+        panel = self.hud.panel('controls', None, CONTROLS_RECT[2:], BACKGROUND, self.render_controls)
+        screen.blit(panel, CONTROLS_RECT[:2])
+    
+    def render_controls(self, screen):
+        # Relative to CONTROLS_RECT
+        ui_x = 0
+        ui_y = 0
         
         panel = self.draw_ui_panel(screen, ui_x, ui_y, 150, 200, "Controls")
         
-        font = pygame.font.Font(None, 16)
-        
         controls = [
             "Arrow Key Also Works",
             "A/D Move",
@@ -884,70 +603,363 @@ class TetrisGame:
         for i, control in enumerate(controls):
             if control:
                 color = TEXT_SECONDARY if control else TEXT_PRIMARY
-                text = font.render(control, True, color)
+                text = self.hud.text(control, 16, color)
                 screen.blit(text, (ui_x + 10, ui_y + 30 + i * 18))
 
-    def draw(self, screen):
-        # Clear screen
-        screen.fill(BACKGROUND)
-        
+    def draw_board(self, screen):
         # Draw grid and pieces
         self.draw_grid(screen)
         self.draw_ghost_piece(screen)
         
-        if self.current_piece:
-            self.draw_piece(screen, self.current_piece)
+        if self.game.current_piece:
+            self.draw_piece(screen, self.game.current_piece)
+    
+    def draw_full(self, screen):
+        self.follow()
+        # Clear screen
+        screen.fill(BACKGROUND)
+        
+        self.draw_board(screen)
         
         # Draw UI
         self.draw_next_piece(screen)
         self.draw_score_panel(screen)
-        if not self.boss_mode:
+        if not self.game.boss_mode:
             self.draw_controls(screen)
         
-        if self.boss_mode:
+        if self.game.boss_mode:
             self.draw_boss_panel(screen)
         
         # Draw particles
-        for particle_effect in self.particles:
-            particle_effect.draw(screen)
+        self.particles.draw(screen)
         
         # Draw victory screen
         self.draw_victory_screen(screen)
+    
+    def draw(self, screen):
+        game = self.game
+        if not self.dirty_rects:
+            self.draw_full(screen)
+            return None
+        
+        self.follow()
+        # The victory screen is static like the game-over one: drawn whole once, then left alone
+        # until something (an expose, a restart) asks for a full redraw
+        if game.game_won and self.drawn.get('won') and not self.needs_full_redraw:
+            return []
+        # Screen shake moves everything, so fall back to full redraws (and one more once it stops)
+        shaking = game.grid_shake_x or game.grid_shake_y
+        if shaking or self.needs_full_redraw or game.game_won:
+            self.draw_full(screen)
+            self.needs_full_redraw = bool(shaking) and not game.game_won
+            self.remember_drawn_state()
+            return None
+        
+        dirty = []
+        
+        # Board: a changed layer or cell animation repaints the whole well,
+        # otherwise only the areas the piece and its ghost left or entered
+        board_state = self.board_state()
+        piece_rects = self.piece_rects()
+        if board_state != self.drawn.get('board'):
+            screen.fill(BACKGROUND, BOARD_RECT)
+            self.draw_board(screen)
+            dirty.append(pygame.Rect(BOARD_RECT))
+        elif self.piece_state() != self.drawn.get('piece'):
+            areas = self.drawn_piece_rects + piece_rects
+            for area in areas:
+                self.restore_board_area(screen, area)
+            self.draw_ghost_piece(screen)
+            self.draw_piece(screen, game.current_piece)
+            dirty.extend(areas)
+        
+        # UI panels
+        for name, rect, state, draw in self.regions:
+            if state() != self.drawn.get(name):
+                screen.fill(BACKGROUND, rect)
+                getattr(self, draw)(screen)
+                dirty.append(rect)
+        
+        # Particles: repaint everything under where they were and where they are now
+        particle_rect = self.particles.bounds()
+        if particle_rect or self.drawn_particle_rect:
+            area = particle_rect or self.drawn_particle_rect
+            if particle_rect and self.drawn_particle_rect:
+                area = particle_rect.union(self.drawn_particle_rect)
+            area = area.clip(screen.get_rect())
+            screen.set_clip(area)
+            screen.fill(BACKGROUND)
+            if area.colliderect(BOARD_RECT):
+                self.draw_board(screen)
+            screen.set_clip(None)
+            # Panels are repainted whole: clipped outlines of rounded rects come out differently
+            for name, rect, state, draw in self.regions:
+                if area.colliderect(rect):
+                    screen.fill(BACKGROUND, rect)
+                    getattr(self, draw)(screen)
+                    dirty.append(rect)
+            self.particles.draw(screen)
+            dirty.append(area)
+        
+        self.remember_drawn_state(piece_rects, particle_rect)
+        return dirty
+    
+    def remember_drawn_state(self, piece_rects=None, particle_rect=None):
+        self.drawn = {name: state() for name, rect, state, draw in self.regions}
+        # Taken after drawing, once the board layer has been brought up to date
+        self.drawn['board'] = self.board_state()
+        self.drawn['piece'] = self.piece_state()
+        self.drawn['won'] = self.game.game_won
+        self.drawn_piece_rects = self.piece_rects() if piece_rects is None else piece_rects
+        self.drawn_particle_rect = particle_rect or self.particles.bounds()
+    
+    def board_state(self):
+        game = self.game
+        return (game.board.version, tuple(game.line_clear_animation), self.left, self.top,
+                self.animation_bucket() if self.animated_cells else None)
+    
+    def piece_state(self):
+        piece = self.game.current_piece
+        return (piece.shape, piece.rotation, piece.x, piece.y, piece.color, piece.is_corrupted,
+                self.animation_bucket(), self.ghost_y(), self.fall_lift())
+    
+    def piece_rects(self):
+        """Screen rects of the falling piece and its ghost"""
+        piece = self.game.current_piece
+        offsets = SHAPES[piece.shape][piece.rotation]
+        rects = []
+        for y, lift in ((piece.y, self.fall_lift()), (self.ghost_y(), 0)):
+            left, top = self.cell_position(piece.x + offsets.min_x, y + offsets.min_y)
+            rect = pygame.Rect(left, top - lift, (offsets.max_x - offsets.min_x + 1) * self.cell,
+                               (offsets.max_y - offsets.min_y + 1) * self.cell + lift).clip(self.well_rect)
+            if rect.width and rect.height:
+                rects.append(rect)
+        return rects
+    
+    def restore_board_area(self, screen, area):
+        """Copy the cached board layer back over area, including animated cells under it"""
+        screen.blit(self.board_layer, area, area.move(5 - self.well_rect.x, 5 - self.well_rect.y))
+        screen.set_clip(area)
+        for x, y, color, shadow_color, highlight, corrupted in self.animated_cells:
+            self.draw_cell_with_gradient(screen, x, y, color, shadow_color, highlight, corrupted)
+        screen.set_clip(None)
+    
+    def next_piece_state(self):
+        piece = self.game.next_piece
+        return (piece.shape, piece.color, piece.is_corrupted,
+                self.animation_bucket() if piece.is_corrupted else None)
+    
+    def score_panel_state(self):
+        game = self.game
+        return (game.score, game.level, game.lines_cleared, game.speed_boost_timer > 0,
+                game.time_pressure_timer > 0, 'piece_corruption' in game.boss_attacks_active,
+                bool(game.boss and game.boss.is_stunned))
+    
+    def boss_hud_key(self):
+        boss = self.game.boss
+        return (boss.health, boss.max_health, boss.phase, self.attack_warning_visible())
+    
+    def boss_panel_state(self):
+        return (self.boss_hud_key(), self.game.boss.is_stunned, self.boss_face_color())
+
+def scroll_start(start, position, visible, total):
+    """First visible row or column of a view of visible out of total that keeps position in view"""
+    if visible >= total:
+        return 0
+    margin = visible // 4
+    if start + margin <= position < start + visible - margin:
+        return start
+    return max(0, min(total - visible, position - visible // 2))
+
+
+def draw_opponent(screen, game, hud):
+    """Small view of the opponent's well, its score and the garbage queued for them"""
+    x, y, width, height = OPPONENT_RECT
+    screen.fill(BACKGROUND, OPPONENT_RECT)
+    screen.fill(GRID_BG, (x, y, width, GRID_HEIGHT * OPPONENT_CELL))
+    board = game.board
+    for row in range(GRID_HEIGHT):
+        if not board.row_masks[row]:
+            continue
+        for column in range(GRID_WIDTH):
+            cell = board.get(column, row)
+            if cell:
+                color = CORRUPTION_COLOR if cell & CORRUPTED else PALETTE[cell & PALETTE_MASK]
+                screen.fill(color, (x + column * OPPONENT_CELL, y + row * OPPONENT_CELL,
+                                    OPPONENT_CELL - 1, OPPONENT_CELL - 1))
+    piece = game.current_piece
+    for column, row in piece.get_cells():
+        if row >= 0:
+            screen.fill(piece.color, (x + column * OPPONENT_CELL, y + row * OPPONENT_CELL,
+                                      OPPONENT_CELL - 1, OPPONENT_CELL - 1))
+    pygame.draw.rect(screen, UI_BORDER, (x - 2, y - 2, width + 4, GRID_HEIGHT * OPPONENT_CELL + 4), 2)
+    text_y = y + GRID_HEIGHT * OPPONENT_CELL + 8
+    screen.blit(hud.text(f"Opponent: {game.score:,}", 18, TEXT_PRIMARY), (x, text_y))
+    if game.incoming:
+        screen.blit(hud.text(f"Garbage queued: {game.incoming}", 18, DANGER), (x, text_y + 22))
+
+
+def opponent_state(game):
+    piece = game.current_piece
+    return (game.board.version, game.piece_count, piece.rotation, piece.x, piece.y, game.score, game.incoming)
+
+
+def play_versus(screen, clock, address):
+    """Versus client: inputs go to the match server, and both wells are drawn from the state it sends back"""
+    hud = Hud()
+    try:
+        client = VersusClient(address)
+    except OSError as error:
+        screen.fill(BACKGROUND)
+        message = hud.text(f"Cannot reach the match server at {address} ({error.strerror or error})", 24, DANGER)
+        screen.blit(message, message.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)))
+        pygame.display.flip()
+        pygame.time.wait(3000)
+        return
+    
+    client.send({'t': 'join'})
+    controls = Controls()
+    actions = []
+    
+    def act(action):
+        actions.append(action)
+        return True
+    
+    games = view = None
+    status = "Waiting for an opponent..."
+    redraw = True
+    running = True
+    while running and not client.closed:
+        dt = clock.tick(60)
+        
+        events = pygame.event.get()
+        now = time.perf_counter()
+        playing = view is not None and status is None
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.WINDOWFOCUSLOST:
+                controls.reset()
+            elif event.type in EXPOSE_EVENTS:
+                # Dirty rects only repaint what changed, so paint it all again
+                redraw = True
+                if view is not None:
+                    view.needs_full_redraw = True
+                drawn_opponent = None
+            elif playing and controls.handle(event, now, act):
+                pass
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    running = False
+                elif event.key == pygame.K_r and view is not None and status is not None:
+                    client.send({'t': 'join'})
+                    status = "Waiting for an opponent..."
+                    view = None
+                    redraw = True
+        if playing:
+            controls.update(now, act, view.game.board)
+        if actions:
+            client.send({'t': 'input', 'a': actions})
+            actions.clear()
+        
+        for message in client.poll():
+            kind = message['t']
+            if kind == 'start':
+                seat = message['seat']
+                games = [mirror_game(), mirror_game()]
+                view = GameView(games[seat], dirty_rects=True)
+                opponent = games[1 - seat]
+                drawn_opponent = None
+                controls.reset()
+                status = None
+            elif kind == 'state' and games is not None:
+                apply_state(games[message['seat']], message)
+            elif kind == 'end' and view is not None:
+                won = message['winner'] == seat
+                reason = " (opponent left)" if message['reason'] == 'disconnected' and won else ""
+                status = ("YOU WIN" if won else "YOU LOSE") + reason
+                redraw = True
+        
+        if view is None or status is not None:
+            # Waiting or finished: a static screen, drawn once
+            if redraw:
+                if view is None:
+                    screen.fill(BACKGROUND)
+                else:
+                    view.draw_full(screen)
+                    draw_opponent(screen, opponent, hud)
+                    screen.blit(hud.overlay((WINDOW_WIDTH, WINDOW_HEIGHT), (0, 0, 0), 200), (0, 0))
+                text = hud.text(status, 48, ACCENT)
+                screen.blit(text, text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 20)))
+                hint = "Press ESC to quit" if view is None else "Press R to play again or ESC to quit"
+                text = hud.text(hint, 28, TEXT_SECONDARY)
+                screen.blit(text, text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 30)))
+                pygame.display.flip()
+                redraw = False
+            continue
+        
+        view.game.animation_time += dt
+        view.update(dt)
+        dirty = view.draw(screen)
+        if dirty is None or opponent_state(opponent) != drawn_opponent:
+            draw_opponent(screen, opponent, hud)
+            drawn_opponent = opponent_state(opponent)
+            if dirty is not None:
+                dirty.append(pygame.Rect(OPPONENT_RECT))
+        if dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        controls.shown(time.perf_counter())
+    
+    client.close()
+
 
 def main():
+    # Initialize Pygame
+    pygame.init()
+    restrict_events()
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
     pygame.display.set_caption("Tetrizz")
     clock = pygame.time.Clock()
-    pygame.mixer.music.load('music/menutet.mp3')
-    pygame.mixer.music.play(-1)
-    pygame.mixer.music.set_volume(0.4)
+    audio = get_audio()
+    audio.play_music('menu')
+    
+    # Show mode selection; the menu text never changes, so render it once
+    font = get_font(48)
+    title_font = get_font(72)
     
-    # Show mode selection
-    font = pygame.font.Font(None, 48)
-    title_font = pygame.font.Font(None, 72)
+    title_text = title_font.render("TETRIZZ", True, ACCENT)
+    title_rect = title_text.get_rect(center=(WINDOW_WIDTH // 2, 150))
+    classic_text = font.render("1 - Classic Mode", True, TEXT_PRIMARY)
+    classic_rect = classic_text.get_rect(center=(WINDOW_WIDTH // 2, 250))
+    boss_text = font.render("2 - Boss Fight Mode", True, BOSS_COLOR)
+    boss_rect = boss_text.get_rect(center=(WINDOW_WIDTH // 2, 300))
+    ai_text = font.render("3 - AI Autoplay", True, ACCENT)
+    ai_rect = ai_text.get_rect(center=(WINDOW_WIDTH // 2, 350))
+    ai_boss_text = font.render("4 - AI vs Boss", True, ACCENT)
+    ai_boss_rect = ai_boss_text.get_rect(center=(WINDOW_WIDTH // 2, 400))
+    versus_text = font.render("5 - Versus Online", True, WARNING)
+    versus_rect = versus_text.get_rect(center=(WINDOW_WIDTH // 2, 450))
+    instruction_text = font.render("Press 1-5 to select mode", True, TEXT_SECONDARY)
+    instruction_rect = instruction_text.get_rect(center=(WINDOW_WIDTH // 2, 520))
     
     mode_selected = False
     boss_mode = False
+    autoplayer = None
     
     while not mode_selected:
         screen.fill(BACKGROUND)
         
         # Title
-        title_text = title_font.render("TETRIZZ", True, ACCENT)
-        title_rect = title_text.get_rect(center=(WINDOW_WIDTH // 2, 150))
         screen.blit(title_text, title_rect)
         
         # Mode options
-        classic_text = font.render("1 - Classic Mode", True, TEXT_PRIMARY)
-        classic_rect = classic_text.get_rect(center=(WINDOW_WIDTH // 2, 250))
         screen.blit(classic_text, classic_rect)
-        
-        boss_text = font.render("2 - Boss Fight Mode", True, BOSS_COLOR)
-        boss_rect = boss_text.get_rect(center=(WINDOW_WIDTH // 2, 300))
         screen.blit(boss_text, boss_rect)
-        
-        instruction_text = font.render("Press 1 or 2 to select mode", True, TEXT_SECONDARY)
-        instruction_rect = instruction_text.get_rect(center=(WINDOW_WIDTH // 2, 400))
+        screen.blit(ai_text, ai_rect)
+        screen.blit(ai_boss_text, ai_boss_rect)
+        screen.blit(versus_text, versus_rect)
         screen.blit(instruction_text, instruction_rect)
         
         pygame.display.flip()
@@ -958,93 +970,158 @@ def main():
                 sys.exit()
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_1:
-                    pygame.mixer.music.load('music/tetrizz.mp3')
-                    pygame.mixer.music.play(-1)
-                    pygame.mixer.music.set_volume(0.5)
+                    audio.play_music('classic')
                     boss_mode = False
                     mode_selected = True
                 elif event.key == pygame.K_2:
-                    pygame.mixer.music.load('music/TETrizzz.mp3')
-                    pygame.mixer.music.play(-1)
-                    pygame.mixer.music.set_volume(0.5)
+                    audio.play_music('boss')
                     boss_mode = True
                     mode_selected = True
+                elif event.key == pygame.K_3:
+                    audio.play_music('classic')
+                    autoplayer = AutoPlayer(time_budget=0.008)
+                    boss_mode = False
+                    mode_selected = True
+                elif event.key == pygame.K_4:
+                    audio.play_music('boss')
+                    autoplayer = AutoPlayer(time_budget=0.008)
+                    boss_mode = True
+                    mode_selected = True
+                elif event.key == pygame.K_5:
+                    audio.play_music('classic')
+                    play_versus(screen, clock, VERSUS_SERVER)
+                    pygame.quit()
+                    sys.exit()
                 elif event.key == pygame.K_ESCAPE:
                     pygame.quit()
                     sys.exit()
     
     # Initialize game
-    game = TetrisGame(boss_mode)
+    game = TetrisGame(boss_mode, None, *BOARD_SIZE)
+    view = GameView(game, dirty_rects=True)
+    recorder = InputRecorder(game)
+    profiler = Profiler()
+    profiler.attach(game, view)
+    controls = Controls()
     running = True
     game_over = False
+    overlay_shown = False
     
     while running:
         dt = clock.tick(60)
+        # Started after the tick, so frame times are the work done rather than the wait for the next frame
+        profiler.begin_frame()
         
         # Handle events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
+        with profiler.span('events'):
+            events = pygame.event.get()
+            now = time.perf_counter()
+            playing = autoplayer is None and not game_over and not game.game_won
+            for event in events:
+                if event.type == pygame.QUIT:
                     running = False
                 
-                elif game_over or game.game_won:
-                    if event.key == pygame.K_r:
-                        # Restart game
-                        game = TetrisGame(boss_mode)
-                        game_over = False
+                elif event.type == pygame.WINDOWFOCUSLOST:
+                    # Key releases go to the other window, so stop repeating
+                    controls.reset()
+                
+                elif event.type in EXPOSE_EVENTS:
+                    # Dirty rects only repaint what changed, so paint it all again,
+                    # game-over screen included
+                    view.needs_full_redraw = True
+                    overlay_shown = False
+                
+                elif playing and controls.handle(event, now, recorder.action):
+                    pass
                 
-                else:  # Game is active
-                    if event.key == pygame.K_LEFT or event.key == pygame.K_a:
-                        game.move_piece(-1, 0)
-                    elif event.key == pygame.K_RIGHT or event.key == pygame.K_d:
-                        game.move_piece(1, 0)
-                    elif event.key == pygame.K_DOWN or event.key == pygame.K_s:
-                        if game.move_piece(0, 1):
-                            game.score += 1
-                    elif event.key == pygame.K_UP or event.key == pygame.K_w:
-                        game.rotate_piece()
-                    elif event.key == pygame.K_SPACE:
-                        game.hard_drop()
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        running = False
+                    
+                    elif event.key == pygame.K_F3:
+                        profiler.toggle()
+                        view.needs_full_redraw = True
+                    
+                    elif event.key == pygame.K_F4:
+                        # Reported on the overlay's status line
+                        profiler.export_chrome_trace(TRACE_PATH.format(time.strftime('%Y%m%d-%H%M%S')))
+                    
+                    elif game_over or game.game_won:
+                        if event.key == pygame.K_r:
+                            # Restart game
+                            game = TetrisGame(boss_mode, None, *BOARD_SIZE)
+                            view = GameView(game, dirty_rects=True)
+                            recorder = InputRecorder(game)
+                            profiler.attach(game, view)
+                            controls.reset()
+                            game_over = False
+                            overlay_shown = False
+            if playing:
+                controls.update(now, recorder.action, game.board)
         
         # Update game
         if not game_over and not game.game_won:
-            if not game.update(dt):
-                game_over = True
+            if autoplayer:
+                with profiler.span('autoplayer'):
+                    autoplayer.play(game, recorder.action, dt)
+            with profiler.span('update'):
+                view.update(dt)
+                if not game.advance(dt):
+                    game_over = True
+            recorder.end_frame(dt)
+            if game_over or game.game_won:
+                recorder.replay.save(REPLAY_PATH)
         
         # Draw everything
-        game.draw(screen)
-        
-        # Game over screen
         if game_over and not game.game_won:
-            overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
-            overlay.set_alpha(200)
-            overlay.fill((0, 0, 0))
-            screen.blit(overlay, (0, 0))
-            
-            font_large = pygame.font.Font(None, 72)
-            font_medium = pygame.font.Font(None, 36)
-            
-            game_over_text = font_large.render("GAME OVER", True, DANGER)
-            game_over_rect = game_over_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50))
-            screen.blit(game_over_text, game_over_rect)
-            
-            if boss_mode and game.boss and game.boss.health > 0:
-                boss_health_text = font_medium.render(f"Boss Health Remaining: {game.boss.health}/100", True, BOSS_COLOR)
-                boss_health_rect = boss_health_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-                screen.blit(boss_health_text, boss_health_rect)
-            
-            score_text = font_medium.render(f"Final Score: {game.score:,}", True, TEXT_PRIMARY)
-            score_rect = score_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 40))
-            screen.blit(score_text, score_rect)
-            
-            restart_text = font_medium.render("Press R to restart or ESC to quit", True, TEXT_SECONDARY)
-            restart_rect = restart_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 80))
-            screen.blit(restart_text, restart_rect)
-        
-        pygame.display.flip()
+            # Game over screen; nothing moves behind it, so draw it once
+            if not overlay_shown:
+                view.draw_full(screen)
+                
+                hud = view.hud
+                screen.blit(hud.overlay((WINDOW_WIDTH, WINDOW_HEIGHT), (0, 0, 0), 200), (0, 0))
+                
+                game_over_text = hud.text("GAME OVER", 72, DANGER)
+                game_over_rect = game_over_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50))
+                screen.blit(game_over_text, game_over_rect)
+                
+                if boss_mode and game.boss and game.boss.health > 0:
+                    boss_health_text = hud.text(f"Boss Health Remaining: {game.boss.health}/100", 36, BOSS_COLOR)
+                    boss_health_rect = boss_health_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
+                    screen.blit(boss_health_text, boss_health_rect)
+                
+                score_text = hud.text(f"Final Score: {game.score:,}", 36, TEXT_PRIMARY)
+                score_rect = score_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 40))
+                screen.blit(score_text, score_rect)
+                
+                restart_text = hud.text("Press R to restart or ESC to quit", 36, TEXT_SECONDARY)
+                restart_rect = restart_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 + 80))
+                screen.blit(restart_text, restart_rect)
+                
+                pygame.display.flip()
+                overlay_shown = True
+        else:
+            with profiler.span('draw'):
+                dirty = view.draw(screen)
+                if profiler.enabled:
+                    # Drawn over the strip below the board, which nothing else uses
+                    profiler.draw_overlay(screen, PROFILER_RECT,
+                                          [f"input p50 {controls.latency.percentile(0.5):.1f}  "
+                                           f"p95 {controls.latency.percentile(0.95):.1f} ms"])
+                    if dirty is not None:
+                        dirty.append(pygame.Rect(PROFILER_RECT))
+            with profiler.span('flip'):
+                if dirty is None:
+                    pygame.display.flip()
+                else:
+                    pygame.display.update(dirty)
+            controls.shown(time.perf_counter())
+        profiler.end_frame()
+    
+    if not game_over and not game.game_won:
+        recorder.replay.save(REPLAY_PATH)
+    if controls.latency.count:
+        print(f"input to display latency: {controls.latency.summary()}")
     
     pygame.quit()
     sys.exit()
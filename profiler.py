@@ -0,0 +1,229 @@
+"""Per-frame phase profiler with an in-game overlay and Chrome trace export.
+
+Phases of the main loop are timed with ``with profiler.span(name):``.
+Methods of the game and view are timed by instrument(), which shadows them
+with timing wrappers on the instance only while the profiler is enabled,
+so a disabled profiler costs nothing beyond a flag check per span.
+
+Exported traces use the Chrome trace event format; open them in
+chrome://tracing or https://ui.perfetto.dev.
+"""
+import json
+import os
+import time
+from collections import deque
+
+# Frames kept for the overlay graph and percentiles
+HISTORY = 240
+
+# Frames kept for trace export (ten seconds at 60 fps)
+TRACE_FRAMES = 600
+
+FRAME_BUDGET_MS = 1000 / 60
+
+# Methods timed on attached objects (a TetrisGame and its GameView) that have them
+METHODS = (
+    'update', 'update_boss', 'update_effects', 'update_line_clears', 'update_gravity', 'hard_drop',
+    'draw_grid', 'draw_ghost_piece', 'draw_piece', 'draw_next_piece', 'draw_score_panel',
+    'draw_boss_panel', 'draw_controls', 'draw_victory_screen',
+)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.profiler.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        profiler = self.profiler
+        profiler.depth -= 1
+        profiler.record(self.name, self.start, end, profiler.depth)
+        return False
+
+
+class Profiler:
+    def __init__(self, enabled=False, history=HISTORY, trace_frames=TRACE_FRAMES):
+        self.enabled = enabled
+        self.depth = 0
+        self.origin = time.perf_counter()
+
+        # Per frame: (frame ms, {top-level phase: ms})
+        self.history = deque(maxlen=history)
+        # Per frame: list of (name, start s, end s, depth)
+        self.trace = deque(maxlen=trace_frames)
+        self.frame_start = None
+        self.spans = []
+
+        self.targets = []
+        # Last thing the profiler did for the player (e.g. a trace export), shown on the overlay
+        self.status = None
+
+    def span(self, name):
+        """Context manager timing one phase; a shared no-op while disabled"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name, start, end, depth):
+        if self.frame_start is not None:
+            self.spans.append((name, start, end, depth))
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = time.perf_counter()
+            self.spans = []
+
+    def end_frame(self):
+        if not self.enabled or self.frame_start is None:
+            return
+        end = time.perf_counter()
+        phases = {}
+        for name, start, stop, depth in self.spans:
+            if depth == 0:
+                phases[name] = phases.get(name, 0.0) + (stop - start) * 1000
+        self.history.append(((end - self.frame_start) * 1000, phases))
+        self.trace.append([('frame', self.frame_start, end, -1)] + self.spans)
+        self.frame_start = None
+
+    # Method instrumentation
+
+    def attach(self, *targets):
+        """Time the METHODS of these objects whenever the profiler is on"""
+        self.detach()
+        self.targets = list(targets)
+        if self.enabled:
+            for target in self.targets:
+                self.instrument(target)
+
+    def detach(self):
+        for target in self.targets:
+            for name in self.method_names(target):
+                target.__dict__.pop(name, None)
+        self.targets = []
+
+    def method_names(self, target):
+        return [name for name in METHODS if hasattr(type(target), name)]
+
+    def instrument(self, target):
+        label = type(target).__name__
+        for name in self.method_names(target):
+            setattr(target, name, self.timed(f"{label}.{name}", getattr(type(target), name).__get__(target)))
+
+    def timed(self, name, method):
+        def wrapper(*args, **kwargs):
+            with self.span(name):
+                return method(*args, **kwargs)
+        return wrapper
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.attach(*self.targets)
+        if not self.enabled:
+            self.history.clear()
+            self.frame_start = None
+        return self.enabled
+
+    # Reporting
+
+    def percentiles(self, quantiles=(0.5, 0.95, 0.99)):
+        times = sorted(frame for frame, phases in self.history)
+        if not times:
+            return [0.0] * len(quantiles)
+        return [times[min(len(times) - 1, int(q * len(times)))] for q in quantiles]
+
+    def phase_averages(self):
+        """Mean ms per frame of each top-level phase over the history, slowest first"""
+        totals = {}
+        for frame, phases in self.history:
+            for name, ms in phases.items():
+                totals[name] = totals.get(name, 0.0) + ms
+        count = max(1, len(self.history))
+        return sorted(((name, total / count) for name, total in totals.items()), key=lambda item: -item[1])
+
+    def slowest_spans(self, limit=4):
+        """Mean ms per frame of every span nested inside a phase over the trace window, slowest first"""
+        totals = {}
+        for spans in self.trace:
+            for name, start, end, depth in spans:
+                if depth < 1:
+                    continue
+                totals[name] = totals.get(name, 0.0) + (end - start) * 1000
+        count = max(1, len(self.trace))
+        return sorted(((name, total / count) for name, total in totals.items()), key=lambda item: -item[1])[:limit]
+
+    def chrome_trace(self):
+        events = []
+        for spans in self.trace:
+            for name, start, end, depth in spans:
+                events.append({
+                    'name': name,
+                    'cat': 'frame' if depth < 0 else 'phase',
+                    'ph': 'X',
+                    'ts': round((start - self.origin) * 1e6, 3),
+                    'dur': round((end - start) * 1e6, 3),
+                    'pid': os.getpid(),
+                    'tid': 1,
+                })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+        self.status = f"wrote {len(self.trace)} frames to {path}"
+        return path
+
+    # Overlay
+
+    def draw_overlay(self, screen, rect, notes=()):
+        """Frame-time graph, percentiles, the heaviest phases, any extra note lines and the status, drawn into rect"""
+        import pygame
+        from hud import get_font
+
+        x, y, width, height = rect
+        screen.fill((0, 0, 0), rect)
+
+        # Graph: one bar per frame, scaled so twice the budget fills the height
+        graph_width = min(width // 2, len(self.history) * 2)
+        graph_height = height - 10
+        scale = graph_height / (2 * FRAME_BUDGET_MS)
+        left = x + 5 + width // 2 - graph_width
+        bottom = y + 5 + graph_height
+        for i, (frame, phases) in enumerate(list(self.history)[-(graph_width // 2):]):
+            bar = min(graph_height, int(frame * scale))
+            color = (80, 220, 120) if frame <= FRAME_BUDGET_MS else (255, 90, 90)
+            pygame.draw.line(screen, color, (left + i * 2, bottom), (left + i * 2, bottom - bar))
+        budget_y = bottom - int(FRAME_BUDGET_MS * scale)
+        pygame.draw.line(screen, (255, 220, 0), (x + 5, budget_y), (x + 5 + width // 2, budget_y))
+
+        p50, p95, p99 = self.percentiles()
+        worst = max((frame for frame, phases in self.history), default=0.0)
+        lines = [f"frame p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}  max {worst:.1f} ms"]
+        lines.append('  '.join(f"{name} {ms:.2f}" for name, ms in self.phase_averages()[:4]))
+        lines.extend(notes)
+        if self.status:
+            lines.append(self.status)
+        lines.extend(f"{name} {ms:.2f} ms" for name, ms in self.slowest_spans(2))
+        # Rendered directly: these strings change every frame and would only churn the Hud text cache
+        font = get_font(18)
+        for i, line in enumerate(lines[:(height - 6) // 18]):
+            screen.blit(font.render(line, True, (230, 230, 230)), (x + width // 2 + 15, y + 6 + i * 18))
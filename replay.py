@@ -0,0 +1,254 @@
+"""Input recording and deterministic replays.
+
+A game is fully determined by its seed, its mode, its board size and, per frame, the
+inputs played and the frame time passed to TetrisGame.advance. The
+InputRecorder captures exactly that; ReplayPlayer re-simulates it headless
+and keeps a keyframe (a TetrisGame.snapshot) every keyframe_interval frames,
+so seeking only re-simulates from the nearest keyframe before the target.
+
+Replay files are JSON (gzip-compressed when the name ends in .gz). Runs of
+idle frames with the same frame time are stored once with a repeat count.
+
+Run ``python replay.py FILE [FRAME]`` to re-simulate a recording, or
+``python replay.py --check`` to record an autoplayer game and verify that
+replaying and seeking reproduce it.
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+
+from engine import TetrisGame, GRID_WIDTH, GRID_HEIGHT
+
+REPLAY_VERSION = 2
+
+# Frames between keyframes kept by ReplayPlayer (2 seconds at 60 fps)
+KEYFRAME_INTERVAL = 120
+
+
+class Replay:
+    def __init__(self, seed, boss_mode=False, frames=None, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.seed = seed
+        self.boss_mode = boss_mode
+        self.width = width
+        self.height = height
+        # One (dt, actions) pair per frame
+        self.frames = frames if frames is not None else []
+
+    def new_game(self):
+        return TetrisGame(self.boss_mode, self.seed, self.width, self.height)
+
+    def to_dict(self):
+        runs = []
+        for dt, actions in self.frames:
+            if runs and not actions and not runs[-1][1] and runs[-1][0] == dt:
+                runs[-1][2] += 1
+            else:
+                runs.append([dt, list(actions), 1])
+        return {
+            'version': REPLAY_VERSION,
+            'seed': self.seed,
+            'boss_mode': self.boss_mode,
+            'width': self.width,
+            'height': self.height,
+            'frames': [run if run[2] > 1 else run[:2] for run in runs],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != REPLAY_VERSION:
+            raise ValueError(f"unsupported replay version {data.get('version')!r}")
+        frames = []
+        for run in data['frames']:
+            frame = (run[0], tuple(run[1]))
+            frames.extend([frame] * (run[2] if len(run) > 2 else 1))
+        # Recordings made before board sizes were configurable have none
+        return cls(data['seed'], data['boss_mode'], frames, data.get('width', GRID_WIDTH),
+                   data.get('height', GRID_HEIGHT))
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'wt') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt') as f:
+            return cls.from_dict(json.load(f))
+
+
+class InputRecorder:
+    """Applies inputs to a live game and logs them, one entry per frame"""
+    def __init__(self, game):
+        self.game = game
+        self.replay = Replay(game.seed, game.boss_mode, width=game.board.width, height=game.board.height)
+        self.pending = []
+
+    def action(self, action):
+        self.pending.append(action)
+        return self.game.apply_action(action)
+
+    def end_frame(self, dt):
+        """Call right after game.advance(dt)"""
+        self.replay.frames.append((dt, tuple(self.pending)))
+        self.pending = []
+
+
+def simulate_frame(game, dt, actions):
+    """One frame exactly as main() plays it: inputs first, then the update"""
+    for action in actions:
+        game.apply_action(action)
+    return game.advance(dt)
+
+
+def state_digest(game):
+    """Short hash of everything that decides how the game continues"""
+    board = game.board
+    piece = game.current_piece
+    boss = game.boss
+    state = (
+        b''.join(board.row(y) for y in range(board.height)),
+        piece.shape, piece.rotation, piece.x, piece.y, piece.is_corrupted,
+        game.next_piece.shape, game.next_piece.is_corrupted,
+        game.score, game.level, game.lines_cleared, game.fall_time, game.accumulator, game.game_won,
+        tuple(game.pending_line_clears), game.speed_boost_timer, game.time_pressure_timer,
+        tuple(game.boss_attacks_active), game.grid_shake_x, game.grid_shake_y,
+        (boss.health, boss.phase, boss.attack_timer, boss.attack_cooldown, boss.stun_timer, boss.last_attack,
+         boss.shake_timer, boss.shake_intensity, boss.rng.getstate()) if boss else None,
+        game.piece_rng.getstate(), game.garbage_rng.getstate(), game.shake_rng.getstate(),
+    )
+    return hashlib.md5(repr(state).encode()).hexdigest()[:12]
+
+
+class ReplayPlayer:
+    """Re-simulates a Replay headless; game is the state after `frame` frames"""
+    def __init__(self, replay, keyframe_interval=KEYFRAME_INTERVAL):
+        self.replay = replay
+        self.keyframe_interval = keyframe_interval
+        self.game = replay.new_game()
+        self.frame = 0
+        self.alive = True
+        self.keyframes = {0: (self.game.snapshot(), True)}
+
+    def __len__(self):
+        return len(self.replay.frames)
+
+    def step(self):
+        """Play the next recorded frame; returns False at the end of the recording"""
+        if self.frame >= len(self.replay.frames):
+            return False
+        dt, actions = self.replay.frames[self.frame]
+        self.alive = simulate_frame(self.game, dt, actions)
+        self.frame += 1
+        if self.frame % self.keyframe_interval == 0 and self.frame not in self.keyframes:
+            self.keyframes[self.frame] = (self.game.snapshot(), self.alive)
+        return True
+
+    def run(self):
+        while self.step():
+            pass
+        return self.game
+
+    def seek(self, frame):
+        """Move to the state after `frame` frames, starting from the closest keyframe at or before it"""
+        frame = max(0, min(frame, len(self.replay.frames)))
+        start = max(key for key in self.keyframes if key <= frame)
+        if not self.frame <= frame or start > self.frame:
+            snapshot, alive = self.keyframes[start]
+            self.game.restore(snapshot)
+            self.alive = alive
+            self.frame = start
+        while self.frame < frame:
+            self.step()
+        return self.game
+
+
+def check(seed=7, boss_mode=False, max_frames=20000, seeks=50):
+    """Record an autoplayer game, then verify that replays and seeks land on identical states"""
+    import random
+
+    from ai import AutoPlayer
+
+    game = TetrisGame(boss_mode, seed)
+    recorder = InputRecorder(game)
+    player = AutoPlayer(time_budget=0.002)
+    frame_times = random.Random(seed)
+    digests = [state_digest(game)]
+    alive = True
+    dt = 0
+    while alive and not game.game_won and len(digests) <= max_frames:
+        # The autoplayer's inputs come at a human pace, so the timing resembles a real session
+        player.play(game, recorder.action, dt)
+        # Uneven frame times, like clock.tick
+        dt = frame_times.choice((15, 16, 17, 17, 33))
+        alive = game.advance(dt)
+        recorder.end_frame(dt)
+        digests.append(state_digest(game))
+
+    replay = Replay.from_dict(json.loads(json.dumps(recorder.replay.to_dict())))
+    player = ReplayPlayer(replay)
+    start = time.perf_counter()
+    player.run()
+    elapsed = time.perf_counter() - start
+    assert state_digest(player.game) == digests[-1], 'replay diverged'
+
+    targets = random.Random(seed + 1)
+    seek_time = 0.0
+    for _ in range(seeks):
+        frame = targets.randrange(len(replay.frames) + 1)
+        start = time.perf_counter()
+        player.seek(frame)
+        seek_time += time.perf_counter() - start
+        assert state_digest(player.game) == digests[frame], f'seek to {frame} diverged'
+
+    check_snapshots(replay, digests, targets)
+
+    game_time = sum(dt for dt, actions in replay.frames) / 1000
+    return len(replay.frames), game_time / elapsed, seek_time / seeks
+
+
+def check_snapshots(replay, digests, rng, rollbacks=200, window=60):
+    """Take a snapshot every frame, and at random frames roll back a few frames and re-simulate them"""
+    game = replay.new_game()
+    snapshots = [game.snapshot()]
+    for frame, (dt, actions) in enumerate(replay.frames):
+        simulate_frame(game, dt, actions)
+        snapshots.append(game.snapshot())
+
+        if rng.random() < rollbacks / len(replay.frames):
+            back = rng.randrange(min(window, frame + 1) + 1)
+            game.restore(snapshots[frame + 1 - back])
+            for dt, actions in replay.frames[frame + 1 - back:frame + 1]:
+                simulate_frame(game, dt, actions)
+            assert state_digest(game) == digests[frame + 1], f'rollback of {back} frames at {frame} diverged'
+
+    # The snapshots must be unaffected by everything that was simulated after them
+    for frame in range(0, len(snapshots), max(1, len(snapshots) // 50)):
+        game.restore(snapshots[frame])
+        assert state_digest(game) == digests[frame], f'snapshot of frame {frame} changed'
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--check':
+        for boss_mode in (False, True):
+            frames, speedup, seek = check(boss_mode=boss_mode)
+            print(f"replay check passed ({'boss' if boss_mode else 'classic'}): {frames} frames "
+                  f"re-simulated at {speedup:,.0f}x real time, {seek * 1000:.1f} ms per seek")
+        sys.exit()
+
+    replay = Replay.load(sys.argv[1])
+    player = ReplayPlayer(replay)
+    start = time.perf_counter()
+    if len(sys.argv) > 2:
+        game = player.seek(int(sys.argv[2]))
+    else:
+        game = player.run()
+    elapsed = time.perf_counter() - start
+    print(f"frame {player.frame}/{len(player)}: score {game.score}, lines {game.lines_cleared}, "
+          f"level {game.level}, state {state_digest(game)} ({elapsed * 1000:.0f} ms)")
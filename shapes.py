@@ -0,0 +1,139 @@
+"""Tetromino shape tables, compiled once at import time"""
+from collections import namedtuple
+
+# Tetromino shapes
+TETROMINOES = {
+    'I': [['.....',
+           '..#..',
+           '..#..',
+           '..#..',
+           '..#..'],
+          ['.....',
+           '.....',
+           '####.',
+           '.....',
+           '.....']],
+    
+    'O': [['.....',
+           '.....',
+           '.##..',
+           '.##..',
+           '.....']],
+    
+    'T': [['.....',
+           '.....',
+           '..#..',
+           '.###.',
+           '.....'],
+          ['.....',
+           '.....',
+           '.#...',
+           '.##..',
+           '.#...'],
+          ['.....',
+           '.....',
+           '.....',
+           '.###.',
+           '..#..'],
+          ['.....',
+           '.....',
+           '.#...',
+           '##...',
+           '.#...']],
+    
+    'S': [['.....',
+           '.....',
+           '..##.',
+           '.##..',
+           '.....'],
+          ['.....',
+           '.#...',
+           '.##..',
+           '..#..',
+           '.....']],
+    
+    'Z': [['.....',
+           '.....',
+           '##...',
+           '.##..',
+           '.....'],
+          ['.....',
+           '..#..',
+           '.##..',
+           '.#...',
+           '.....']],
+    
+    'J': [['.....',
+           '..#..',
+           '..#..',
+           '.##..',
+           '.....'],
+          ['.....',
+           '.....',
+           '#....',
+           '###..',
+           '.....'],
+          ['.....',
+           '.##..',
+           '.#...',
+           '.#...',
+           '.....'],
+          ['.....',
+           '.....',
+           '###..',
+           '..#..',
+           '.....']],
+    
+    'L': [['.....',
+           '..#..',
+           '..#..',
+           '..##.',
+           '.....'],
+          ['.....',
+           '.....',
+           '###..',
+           '#....',
+           '.....'],
+          ['.....',
+           '##...',
+           '.#...',
+           '.#...',
+           '.....'],
+          ['.....',
+           '.....',
+           '..#..',
+           '###..',
+           '.....']]
+}
+
+# A compiled rotation: cell offsets inside the 5x5 box plus their bounding box.
+# row_masks holds one (dy, bitmask) pair per occupied row, bit j = column offset j.
+# column_bottoms holds one (dx, lowest dy) pair per occupied column.
+Rotation = namedtuple('Rotation', ['cells', 'min_x', 'max_x', 'min_y', 'max_y', 'row_masks', 'column_bottoms'])
+
+
+def compile_rotation(rows):
+    """Turn a 5x5 string grid into a Rotation of (dx, dy) cell offsets"""
+    cells = tuple((j, i) for i, row in enumerate(rows)
+                  for j, cell in enumerate(row) if cell == '#')
+    xs = [dx for dx, _ in cells]
+    ys = [dy for _, dy in cells]
+    row_masks = []
+    for i, row in enumerate(rows):
+        mask = sum(1 << j for j, cell in enumerate(row) if cell == '#')
+        if mask:
+            row_masks.append((i, mask))
+    column_bottoms = tuple((dx, max(dy for cx, dy in cells if cx == dx)) for dx in sorted(set(xs)))
+    return Rotation(cells, min(xs), max(xs), min(ys), max(ys), tuple(row_masks), column_bottoms)
+
+
+# Shape names in table order (random piece selection depends on this order)
+SHAPE_NAMES = tuple(TETROMINOES.keys())
+
+# SHAPES[shape][rotation] -> Rotation
+SHAPES = {
+    shape: tuple(compile_rotation(rows) for rows in rotations)
+    for shape, rotations in TETROMINOES.items()
+}
+
+ROTATION_COUNTS = {shape: len(rotations) for shape, rotations in SHAPES.items()}
@@ -0,0 +1,118 @@
+"""Pre-rendered block sprites so drawing a cell is a single blit"""
+import math
+
+import pygame
+
+# Pulse/flicker animations are quantized into this many brightness steps
+ANIMATION_BUCKETS = 16
+
+CORRUPTION_OVERLAY = (150, 0, 0)
+
+# Cells smaller than this (zoomed-out boards) are drawn as plain rounded squares
+MIN_DETAIL_SIZE = 12
+
+
+def animation_bucket(animation_time):
+    """Quantized abs(sin(t * 0.01)), the phase shared by the pulse and flicker effects"""
+    return int(abs(math.sin(animation_time * 0.01)) * ANIMATION_BUCKETS + 0.5)
+
+
+def bucket_level(bucket):
+    return bucket / ANIMATION_BUCKETS
+
+
+def scale_color(color, factor):
+    return tuple(min(255, max(0, int(c * factor))) for c in color)
+
+
+class SpriteAtlas:
+    """Renders each block variant once, on first use, and hands back the cached surface"""
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.sprites = {}
+
+    def new_surface(self, width, height):
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        surface.fill((0, 0, 0, 0))
+        return surface
+
+    def cell(self, color, shadow_color, highlight_bucket=None, corrupted_bucket=None):
+        """Block sprite; pass an animation bucket to get the pulsing or corrupted variant"""
+        key = ('cell', color, shadow_color, highlight_bucket, corrupted_bucket)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = self.render_cell(color, shadow_color, highlight_bucket, corrupted_bucket)
+        return sprite
+
+    def render_cell(self, color, shadow_color, highlight_bucket, corrupted_bucket):
+        size = self.cell_size - 2
+        surface = self.new_surface(size, size)
+        rect = pygame.Rect(0, 0, size, size)
+
+        # Corrupted blocks have special color
+        if corrupted_bucket is not None:
+            # Flickering corruption effect
+            flicker = bucket_level(corrupted_bucket) * 0.5 + 0.5
+            pygame.draw.rect(surface, scale_color(color, flicker), rect, border_radius=3)
+            if size < MIN_DETAIL_SIZE:
+                return surface
+
+            # Corruption overlay
+            overlay_rect = pygame.Rect(rect.x + 4, rect.y + 4, rect.width - 8, rect.height - 8)
+            pygame.draw.rect(surface, CORRUPTION_OVERLAY, overlay_rect, 1)
+            return surface
+
+        # Normal block rendering, pulsing while highlighted
+        if highlight_bucket is not None:
+            color_now = scale_color(color, bucket_level(highlight_bucket) * 0.3 + 0.7)
+        else:
+            color_now = color
+        pygame.draw.rect(surface, color_now, rect, border_radius=3)
+        if size < MIN_DETAIL_SIZE:
+            return surface
+
+        # Inner highlight
+        inner_rect = pygame.Rect(rect.x + 2, rect.y + 2, rect.width - 8, 4)
+        highlight_color = tuple(min(255, max(0, c + 40)) for c in color)
+        pygame.draw.rect(surface, highlight_color, inner_rect, border_radius=2)
+
+        # Shadow - ensure no negative values
+        shadow_rect = pygame.Rect(rect.x + 2, rect.bottom - 6, rect.width - 4, 4)
+        safe_shadow_color = tuple(max(0, min(255, c)) for c in shadow_color)
+        pygame.draw.rect(surface, safe_shadow_color, shadow_rect, border_radius=2)
+        return surface
+
+    def ghost(self, color):
+        """Outline used for the ghost piece"""
+        key = ('ghost', color)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            size = self.cell_size - 2
+            sprite = self.sprites[key] = self.new_surface(size, size)
+            ghost_color = tuple(max(0, c // 3) for c in color)
+            pygame.draw.rect(sprite, ghost_color, sprite.get_rect(), 2, border_radius=3)
+        return sprite
+
+    def mini(self, color, size=18, corrupted_bucket=None):
+        """Small block used by the next piece preview"""
+        key = ('mini', color, size, corrupted_bucket)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = self.new_surface(size, size)
+            if corrupted_bucket is not None:
+                color = scale_color(color, bucket_level(corrupted_bucket) * 0.5 + 0.5)
+            pygame.draw.rect(sprite, color, sprite.get_rect(), border_radius=3)
+        return sprite
+
+
+_atlases = {}
+
+
+def get_atlas(cell_size):
+    """Shared atlas per cell size, so restarting a game keeps the rendered sprites"""
+    atlas = _atlases.get(cell_size)
+    if atlas is None:
+        atlas = _atlases[cell_size] = SpriteAtlas(cell_size)
+    return atlas
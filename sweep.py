@@ -0,0 +1,282 @@
+"""Balance sweeps: thousands of headless autoplayer games across a process pool.
+
+Every point of a parameter grid is played with the same seeds, so points
+differ only in the parameters (common random numbers), and a game's result
+depends only on its seed and point. Games are handed out to one worker
+process per core and their results stream back as they finish; each point
+keeps running totals only, so memory stays flat however many games are
+played. --out also writes every game as one JSON line while the sweep runs.
+
+The autoplayer plays each piece's planned moves one every --input-ms
+(all at once by default); at a human pace fall speed matters too.
+Parameters (each option may be repeated to sweep it; the engine's tables
+are the default):
+
+    --cooldowns 5000/2500/2000    boss attack cooldown (ms) in phases 1/2/3 (engine.ATTACK_COOLDOWNS)
+    --damage 5/10/15/25           boss damage for 1/2/3/4 lines at once (engine.LINE_DAMAGE)
+    --fall 500/25/50              fall speed at level 1 / less per level / fastest (engine.FALL_SPEED_CURVE)
+    --input-ms 120                autoplayer time between inputs (0)
+
+    python sweep.py --games 200 --cooldowns 5000/2500/2000 --cooldowns 4000/2000/1500 --damage 4/8/12/20
+    python sweep.py --classic --games 50 --fall 500/25/50 --fall 400/30/40 --out results.jsonl
+    python sweep.py --check
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+from ai import AutoPlayer, INPUT_MS
+from engine import TetrisGame, ATTACK_COOLDOWNS, LINE_DAMAGE, FALL_SPEED_CURVE
+
+FRAME_MS = 16
+
+# Longest game played, in game seconds; games still running then count as survived
+MAX_SECONDS = 600
+
+# Generous enough that the autoplayer's lookahead cutoff never fires, so a game's
+# result does not depend on how busy the machine is
+BOT_TIME_BUDGET = 1.0
+
+# Grid parameters: (option, per-game key, number of values, what the values are)
+PARAMETERS = (
+    ('cooldowns', 'attack_cooldowns', len(ATTACK_COOLDOWNS), 'boss cooldown ms per phase'),
+    ('damage', 'line_damage', len(LINE_DAMAGE), 'boss damage per 1-4 lines'),
+    ('fall', 'fall_speed_curve', len(FALL_SPEED_CURVE), 'fall ms at level 1/step/fastest'),
+)
+
+
+def apply_params(game, params):
+    """Give one game its own balance tables, before it has been updated"""
+    if 'attack_cooldowns' in params and game.boss:
+        cooldowns = params['attack_cooldowns']
+        game.boss.attack_cooldowns = {phase: cooldowns[phase - 1] for phase in ATTACK_COOLDOWNS}
+        game.boss.attack_cooldown = game.boss.attack_cooldowns[game.boss.phase]
+        game.boss.schedule_attack()
+    if 'line_damage' in params:
+        damage = params['line_damage']
+        game.line_damage = {lines: damage[lines - 1] for lines in LINE_DAMAGE}
+    if 'fall_speed_curve' in params:
+        game.fall_speed_curve = tuple(params['fall_speed_curve'])
+        game.base_fall_speed = game.fall_speed = game.level_fall_speed(game.level)
+
+
+def play(task, frame_by_frame=False, player=None):
+    """Play one game; task is (point index, seed, boss_mode, params, max_seconds).
+
+    Frames in which the autoplayer has nothing to do are skipped over in one
+    go with TetrisGame.skip_frames; frame_by_frame advances every frame
+    instead, with the same result.
+    """
+    point, seed, boss_mode, params, max_seconds = task
+    game = TetrisGame(boss_mode, seed)
+    apply_params(game, params)
+    player = player or AutoPlayer(time_budget=BOT_TIME_BUDGET)
+    player.input_ms = params.get('input_ms', 0)
+
+    elapsed = 0
+    dt = 0
+    alive = True
+    limit = max_seconds * 1000
+    while alive and not game.game_won and elapsed < limit:
+        player.play(game, dt=dt)
+
+        # Frames until the autoplayer next acts (its next input, or else the next piece) or time is up
+        frames = math.ceil((limit - elapsed) / FRAME_MS)
+        if frame_by_frame or game.current_piece is not player.planned_piece:
+            frames = 1
+        elif player.queued:
+            frames = min(frames, max(1, math.ceil(player.wait / FRAME_MS)))
+        if frames == 1:
+            alive = game.advance(FRAME_MS)
+        else:
+            frames, alive = game.skip_frames(frames, FRAME_MS)
+        dt = frames * FRAME_MS
+        elapsed += dt
+
+    boss = game.boss
+    return {
+        'point': point,
+        'seed': seed,
+        'score': game.score,
+        'lines': game.lines_cleared,
+        'level': game.level,
+        'seconds': elapsed / 1000,
+        'topped_out': not alive,
+        'won': game.game_won,
+        'boss_health': boss.health if boss else None,
+        'phase': boss.phase if boss else None,
+    }
+
+
+class Totals:
+    """Running aggregate of one grid point's results (count, sums and a phase histogram)"""
+    def __init__(self):
+        self.games = 0
+        self.won = 0
+        self.topped_out = 0
+        self.sums = {'score': 0, 'lines': 0, 'seconds': 0.0, 'boss_health': 0}
+        self.seconds_squared = 0.0
+        self.phases = {}
+
+    def add(self, result):
+        self.games += 1
+        self.won += result['won']
+        self.topped_out += result['topped_out']
+        for key in self.sums:
+            if result[key] is not None:
+                self.sums[key] += result[key]
+        self.seconds_squared += result['seconds'] ** 2
+        if result['phase'] is not None:
+            self.phases[result['phase']] = self.phases.get(result['phase'], 0) + 1
+
+    def mean(self, key):
+        return self.sums[key] / self.games if self.games else 0.0
+
+    def seconds_error(self):
+        """Standard error of the mean survival time"""
+        if self.games < 2:
+            return 0.0
+        mean = self.mean('seconds')
+        variance = max(0.0, (self.seconds_squared - self.games * mean * mean) / (self.games - 1))
+        return math.sqrt(variance / self.games)
+
+
+def grid(options):
+    """Every combination of the swept parameters, as per-game params dicts"""
+    axes = []
+    for option, key, count, description in PARAMETERS:
+        values = getattr(options, option)
+        if values:
+            axes.append([(key, value) for value in values])
+    if options.input_ms:
+        axes.append([('input_ms', value) for value in options.input_ms])
+    return [dict(point) for point in itertools.product(*axes)]
+
+
+def tasks(points, games, boss_mode, max_seconds):
+    # Seed-major, so every point has results early on
+    for seed in range(games):
+        for index, params in enumerate(points):
+            yield index, seed, boss_mode, params, max_seconds
+
+
+def run(points, games, boss_mode=True, max_seconds=MAX_SECONDS, workers=None, out=None, progress=None):
+    """Play games seeds at every point across a process pool; returns one Totals per point"""
+    totals = [Totals() for _ in points]
+    total_games = len(points) * games
+    done = 0
+    with multiprocessing.Pool(workers) as pool:
+        # imap_unordered hands back each result as soon as it is ready, and nothing is kept once it is added
+        for result in pool.imap_unordered(play, tasks(points, games, boss_mode, max_seconds), chunksize=4):
+            totals[result['point']].add(result)
+            if out:
+                out.write(json.dumps(result) + '\n')
+            done += 1
+            if progress:
+                progress(done, total_games)
+    return totals
+
+
+def describe(params):
+    parts = []
+    for option, key, count, description in PARAMETERS:
+        if key in params:
+            parts.append(f"{option} {'/'.join(str(value) for value in params[key])}")
+    if 'input_ms' in params:
+        parts.append(f"input {params['input_ms']} ms")
+    return ', '.join(parts) or 'engine defaults'
+
+
+def report(points, totals, boss_mode):
+    for params, point in zip(points, totals):
+        line = (f"{describe(params)}: {point.games} games, score {point.mean('score'):,.0f}, "
+                f"lines {point.mean('lines'):.1f}, survived {point.mean('seconds'):.1f} "
+                f"+- {point.seconds_error():.1f} s, topped out {point.topped_out / point.games:.0%}")
+        if boss_mode:
+            phases = ' '.join(f"{phase}:{point.phases.get(phase, 0) / point.games:.0%}" for phase in ATTACK_COOLDOWNS)
+            line += (f", boss beaten {point.won / point.games:.0%}, health left {point.mean('boss_health'):.1f}, "
+                     f"phase reached {phases}")
+        print(line)
+
+
+def check(games=6, max_seconds=120):
+    """Play games both frame by frame and skipping idle frames, compare the results and time the simulation"""
+    for boss_mode in (True, False):
+        for input_ms in (0, INPUT_MS, 400):
+            params = {'input_ms': input_ms}
+            # Played at full speed a classic game never tops out, so a shorter limit keeps the check quick
+            limit = max_seconds if input_ms else max_seconds // 10
+            timings = []
+            for frame_by_frame in (True, False):
+                results = []
+                simulated = 0.0
+                for seed in range(games):
+                    player = AutoPlayer(time_budget=BOT_TIME_BUDGET)
+                    start = time.perf_counter()
+                    results.append(play((0, seed, boss_mode, params, limit), frame_by_frame, player))
+                    # Everything but the autoplayer's search
+                    simulated += time.perf_counter() - start - player.search_time
+                timings.append(simulated)
+                if frame_by_frame:
+                    expected = results
+            assert results == expected, (boss_mode, input_ms)
+            seconds = sum(result['seconds'] for result in results)
+            print(f"sweep check passed ({'boss' if boss_mode else 'classic'}, input {input_ms} ms): "
+                  f"{games} games, {seconds:.0f} game seconds simulated in {timings[0] * 1000:.0f} ms "
+                  f"frame by frame, {timings[1] * 1000:.0f} ms skipping idle frames "
+                  f"({timings[0] / timings[1]:.1f}x)")
+
+
+def values(count):
+    def parse(text):
+        numbers = tuple(int(value) for value in text.split('/'))
+        if len(numbers) != count:
+            raise argparse.ArgumentTypeError(f"expected {count} values separated by '/'")
+        return numbers
+    return parse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--games', type=int, default=100, help='games (seeds) per grid point')
+    parser.add_argument('--classic', action='store_true', help='play classic games instead of the boss fight')
+    parser.add_argument('--max-seconds', type=float, default=MAX_SECONDS)
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    parser.add_argument('--out', help='also write every game result to this file, one JSON object per line')
+    for option, key, count, description in PARAMETERS:
+        parser.add_argument(f'--{option}', type=values(count), action='append', help=description)
+    parser.add_argument('--input-ms', type=int, action='append', help='autoplayer ms between inputs')
+    parser.add_argument('--check', action='store_true',
+                        help='check that skipping idle frames changes no result, and time it')
+    options = parser.parse_args()
+    if options.check:
+        check()
+        return
+
+    boss_mode = not options.classic
+    points = grid(options)
+    start = time.perf_counter()
+
+    def progress(done, total):
+        if done % 50 == 0 or done == total:
+            print(f"\r{done}/{total} games, {done / (time.perf_counter() - start):.1f}/s", end='', file=sys.stderr)
+
+    out = open(options.out, 'w') if options.out else None
+    try:
+        totals = run(points, options.games, boss_mode, options.max_seconds, options.workers, out, progress)
+    finally:
+        if out:
+            out.close()
+    print(file=sys.stderr)
+    print(f"{len(points) * options.games} games on {options.workers or os.cpu_count()} workers "
+          f"in {time.perf_counter() - start:.1f} s")
+    report(points, totals, boss_mode)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,10 @@
+import pytest
+
+from batch import differential_check
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_batch_matches_scalar_engine(seed):
+    # differential_check asserts cells, score, level and game over against TetrisGame after every placement
+    lines = differential_check(games=16, placements=150, seed=seed)
+    assert lines > 0
@@ -0,0 +1,10 @@
+import pytest
+
+from replay import check
+
+
+@pytest.mark.parametrize('boss_mode', [False, True])
+def test_replay_seek_and_rollback(boss_mode):
+    # Replaying, seeking and restoring snapshots must all land on the recorded state digests
+    frames, speedup, seek = check(boss_mode=boss_mode, max_frames=3000, seeks=20)
+    assert frames > 0
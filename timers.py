@@ -0,0 +1,62 @@
+"""Named timers kept as expiry times in a heap, for the game's effects and the boss"""
+import heapq
+
+
+class Timers:
+    """Timers by name, each expiring at a time on its owner's clock.
+
+    Starting a timer again replaces its expiry and cancelling it just forgets
+    it; outdated heap entries are dropped lazily when they reach the top, so
+    neither ever searches the heap. Nothing counts down: owners compare the
+    next expiry with their clock, which is what lets a headless simulation
+    jump straight to it.
+    """
+
+    def __init__(self):
+        self.expiries = {}
+        self.heap = []
+
+    def __contains__(self, name):
+        return name in self.expiries
+
+    def start(self, name, now, ms):
+        """Run name for ms from now; ms <= 0 cancels it"""
+        if ms > 0:
+            self.expiries[name] = now + ms
+            heapq.heappush(self.heap, (now + ms, name))
+        else:
+            self.expiries.pop(name, None)
+
+    def cancel(self, name):
+        self.expiries.pop(name, None)
+
+    def remaining(self, name, now):
+        """ms until name expires, 0 when it is not running"""
+        expiry = self.expiries.get(name)
+        return expiry - now if expiry is not None else 0
+
+    def next_expiry(self):
+        """Earliest expiry time, or None when no timer is running"""
+        heap = self.heap
+        while heap and self.expiries.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def expire(self, now):
+        """Remove the timers that have expired by now; returns their names, earliest first"""
+        expired = []
+        while True:
+            expiry = self.next_expiry()
+            if expiry is None or expiry > now:
+                return expired
+            name = heapq.heappop(self.heap)[1]
+            del self.expiries[name]
+            expired.append(name)
+
+    def snapshot(self):
+        return tuple(self.expiries.items())
+
+    def restore(self, snapshot):
+        self.expiries = dict(snapshot)
+        self.heap = [(expiry, name) for name, expiry in snapshot]
+        heapq.heapify(self.heap)
@@ -0,0 +1,484 @@
+"""Head-to-head versus mode: an asyncio match server and the client connection.
+
+The server pairs players in the order they join and runs both TetrisGames
+of every match itself; all matches advance together on one fixed tick.
+Clearing lines sends garbage to the opponent (GARBAGE_SENT). Incoming
+garbage first cancels against the receiver's own clears and is pushed in
+once their next piece has locked. Players only send inputs; the server
+sends each game's state to both players whenever it changes.
+
+Messages are JSON objects, one per line:
+
+    client -> server  {"t": "join"}                 queue for the next match
+                      {"t": "input", "a": [...]}    engine.ACTIONS, played on the next tick
+                      {"t": "stats"}                server load figures
+    server -> client  {"t": "wait"}                 queued, waiting for an opponent
+                      {"t": "start", "seat": 0|1, "seed": n, "tick_rate": hz}
+                      {"t": "state", "seat": 0|1, ...}   see state_message()
+                      {"t": "end", "winner": 0|1, "reason": "topped_out"|"disconnected"}
+                      {"t": "stats", ...}
+
+    python versus.py serve [--host 127.0.0.1] [--port 7777] [--tick-rate 60]
+    python versus.py loadtest [--matches 50,100,200,400] [--seconds 5]
+
+The load test starts a server process and one bot client per player, each
+pressing a random key a few times a second, then reports for every match
+count whether the tick rate held, the server's tick times and CPU use, and
+how many matches one core can host at that tick rate.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import deque
+
+from engine import TetrisGame, Tetromino, ACTIONS, TETROMINO_COLORS
+
+HOST = '127.0.0.1'
+PORT = 7777
+TICK_RATE = 60
+
+# Garbage rows sent for clearing 1-4 lines
+GARBAGE_SENT = {1: 0, 2: 1, 3: 2, 4: 4}
+
+# Inputs accepted from one player per tick; the rest are dropped
+MAX_INPUTS = 16
+
+# A client whose unsent output grows past this cannot keep up and is disconnected
+MAX_BUFFERED = 256 * 1024
+
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def state_message(game, seat, pieces, incoming, board=True):
+    """State of one game; the board is only included when board is true"""
+    piece = game.current_piece
+    message = {
+        't': 'state',
+        'seat': seat,
+        'n': pieces,
+        'piece': [piece.shape, piece.rotation, piece.x, piece.y, piece.is_corrupted],
+        'next': [game.next_piece.shape, game.next_piece.is_corrupted],
+        'score': game.score,
+        'lines': game.lines_cleared,
+        'level': game.level,
+        'clearing': game.line_clear_animation,
+        'incoming': incoming,
+    }
+    if board:
+        message['board'] = base64.b64encode(game.board.dump()).decode()
+    return message
+
+
+def apply_state(game, message):
+    """Mirror a state message into a local TetrisGame that is only drawn, never simulated.
+
+    Emits the game's events for what changed, so a GameView on it plays
+    the matching sounds and particles.
+    """
+    if 'board' in message:
+        game.board.load(base64.b64decode(message['board']))
+    if message['clearing'] and message['clearing'] != game.line_clear_animation:
+        game.emit('lines_full', message['clearing'])
+    game.line_clear_animation = message['clearing']
+
+    shape, rotation, x, y, corrupted = message['piece']
+    if message['n'] != game.piece_count:
+        game.current_piece = Tetromino(shape, TETROMINO_COLORS[shape])
+        game.piece_count = message['n']
+    piece = game.current_piece
+    piece.rotation, piece.x, piece.y, piece.is_corrupted = rotation, x, y, corrupted
+
+    shape, corrupted = message['next']
+    if game.next_piece.shape != shape or game.next_piece.is_corrupted != corrupted:
+        game.next_piece = Tetromino(shape, TETROMINO_COLORS[shape])
+        game.next_piece.is_corrupted = corrupted
+
+    if message['lines'] > game.lines_cleared:
+        game.emit('line_cleared', message['lines'] - game.lines_cleared)
+    game.score, game.lines_cleared, game.level = message['score'], message['lines'], message['level']
+    game.incoming = message['incoming']
+
+
+def mirror_game():
+    """TetrisGame to apply_state() into"""
+    game = TetrisGame(False, 0)
+    game.piece_count = None
+    game.incoming = 0
+    return game
+
+
+class Player:
+    def __init__(self, writer):
+        self.writer = writer
+        self.inputs = []
+        self.match = None
+        self.seat = None
+
+    def send(self, data):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+
+class Match:
+    """Two authoritative games on the same seed, exchanging garbage"""
+    def __init__(self, players, seed):
+        self.players = players
+        self.seed = seed
+        self.games = [TetrisGame(False, seed) for _ in players]
+        self.incoming = [0, 0]
+        self.garbage_due = [False, False]
+        self.pieces = [game.current_piece for game in self.games]
+        self.piece_counts = [0, 0]
+        # What the players were last sent about each game, to skip unchanged ones
+        self.sent = [None, None]
+        self.sent_boards = [None, None]
+        self.winner = None
+        self.reason = None
+        for seat, game in enumerate(self.games):
+            game.subscribe('line_cleared', lambda count, seat=seat: self.on_line_cleared(seat, count))
+
+    def on_line_cleared(self, seat, count):
+        sent = GARBAGE_SENT.get(count, 4)
+        cancelled = min(sent, self.incoming[seat])
+        self.incoming[seat] -= cancelled
+        self.incoming[1 - seat] += sent - cancelled
+
+    def tick(self, dt):
+        """Play the queued inputs and advance both games by dt ms; returns the state update to send"""
+        for seat, game in enumerate(self.games):
+            player = self.players[seat]
+            for action in player.inputs:
+                game.apply_action(action)
+            player.inputs = []
+            alive = game.advance(dt)
+
+            if game.current_piece is not self.pieces[seat]:
+                self.pieces[seat] = game.current_piece
+                self.piece_counts[seat] += 1
+                self.garbage_due[seat] = True
+            # Garbage goes in between pieces, once any line clear has resolved
+            if alive and self.garbage_due[seat] and not game.pending_line_clears:
+                self.garbage_due[seat] = False
+                if self.incoming[seat]:
+                    game.add_garbage_lines(self.incoming[seat])
+                    self.incoming[seat] = 0
+                    alive = game.is_valid_position(game.current_piece)
+
+            if not alive:
+                self.end(1 - seat, 'topped_out')
+                break
+        return self.updates()
+
+    def updates(self):
+        data = b''
+        for seat, game in enumerate(self.games):
+            piece = game.current_piece
+            key = (game.board.version, self.piece_counts[seat], piece.rotation, piece.x, piece.y,
+                   game.next_piece.shape, game.score, tuple(game.line_clear_animation), self.incoming[seat])
+            if key == self.sent[seat]:
+                continue
+            self.sent[seat] = key
+            board = game.board.version != self.sent_boards[seat]
+            self.sent_boards[seat] = game.board.version
+            data += encode(state_message(game, seat, self.piece_counts[seat], self.incoming[seat], board))
+        return data
+
+    def end(self, winner, reason):
+        if self.winner is None:
+            self.winner = winner
+            self.reason = reason
+
+
+class MatchServer:
+    def __init__(self, tick_rate=TICK_RATE, seed=None):
+        self.tick_rate = tick_rate
+        self.waiting = None
+        self.matches = set()
+        self.seeds = random.Random(seed)
+
+        # Load figures reported by stats()
+        self.ticks = 0
+        self.late_ticks = 0
+        self.tick_times = deque(maxlen=tick_rate * 5)
+        self.matches_played = 0
+
+    async def handle(self, reader, writer):
+        player = Player(writer)
+        try:
+            async for line in reader:
+                try:
+                    message = json.loads(line)
+                    kind = message['t']
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if kind == 'input':
+                    actions = message.get('a')
+                    if player.match is not None and isinstance(actions, list):
+                        room = MAX_INPUTS - len(player.inputs)
+                        player.inputs.extend(action for action in actions[:room] if action in ACTIONS)
+                elif kind == 'join':
+                    self.join(player)
+                elif kind == 'stats':
+                    player.send(encode(self.stats()))
+        except (ConnectionError, ValueError, asyncio.LimitOverrunError):
+            # Disconnected, or sent a line longer than the stream limit: drop just this client
+            pass
+        finally:
+            self.leave(player)
+            writer.close()
+
+    def join(self, player):
+        if player.match is not None or self.waiting is player:
+            return
+        if self.waiting is None or self.waiting.writer.is_closing():
+            self.waiting = player
+            player.send(encode({'t': 'wait'}))
+            return
+        players = [self.waiting, player]
+        self.waiting = None
+        match = Match(players, self.seeds.randrange(1 << 63))
+        for seat, each in enumerate(players):
+            each.match = match
+            each.seat = seat
+            each.send(encode({'t': 'start', 'seat': seat, 'seed': match.seed, 'tick_rate': self.tick_rate}))
+        self.matches.add(match)
+        self.matches_played += 1
+
+    def leave(self, player):
+        if self.waiting is player:
+            self.waiting = None
+        if player.match is not None:
+            player.match.end(1 - player.seat, 'disconnected')
+            self.finish(player.match)
+
+    def finish(self, match):
+        if match not in self.matches:
+            return
+        self.matches.discard(match)
+        data = encode({'t': 'end', 'winner': match.winner, 'reason': match.reason})
+        for player in match.players:
+            player.match = None
+            player.inputs = []
+            player.send(data)
+
+    def step(self, dt):
+        """One server tick of every match"""
+        for match in list(self.matches):
+            data = match.tick(dt)
+            for player in match.players:
+                if data:
+                    player.send(data)
+                if player.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                    player.writer.close()
+                    match.end(1 - player.seat, 'disconnected')
+            if match.winner is not None:
+                self.finish(match)
+
+    async def run(self):
+        """Tick forever; ticks that fall more than one interval behind are dropped, slowing the games down"""
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        dt = 1000 / self.tick_rate
+        deadline = loop.time()
+        while True:
+            start = time.perf_counter()
+            self.step(dt)
+            self.tick_times.append(time.perf_counter() - start)
+            self.ticks += 1
+
+            deadline += interval
+            delay = deadline - loop.time()
+            if delay < 0:
+                self.late_ticks += 1
+                if delay < -interval:
+                    deadline = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        times = sorted(self.tick_times)
+        return {
+            't': 'stats',
+            'matches': len(self.matches),
+            'matches_played': self.matches_played,
+            'tick_rate': self.tick_rate,
+            'ticks': self.ticks,
+            'late_ticks': self.late_ticks,
+            'tick_ms_mean': sum(times) / len(times) * 1000 if times else 0.0,
+            'tick_ms_p99': times[int(len(times) * 0.99)] * 1000 if times else 0.0,
+            'cpu_s': time.process_time(),
+            'wall_s': time.perf_counter(),
+        }
+
+
+async def serve(host=HOST, port=PORT, tick_rate=TICK_RATE):
+    server = MatchServer(tick_rate)
+    listener = await asyncio.start_server(server.handle, host, port, backlog=1024)
+    port = listener.sockets[0].getsockname()[1]
+    print(f"listening on {host}:{port}", flush=True)
+    async with listener:
+        await server.run()
+
+
+class VersusClient:
+    """Non-blocking connection to a match server, polled once per frame from the pygame loop"""
+    def __init__(self, address, timeout=3.0):
+        host, _, port = address.rpartition(':')
+        self.sock = socket.create_connection((host or HOST, int(port or PORT)), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setblocking(False)
+        self.buffer = b''
+        # Bytes the socket would not take yet; retried on every send and poll
+        self.unsent = b''
+        self.closed = False
+
+    def send(self, message):
+        self.unsent += encode(message)
+        self.flush()
+
+    def flush(self):
+        """Send as much of the unsent data as the socket takes without blocking"""
+        while self.unsent and not self.closed:
+            try:
+                sent = self.sock.send(self.unsent)
+            except BlockingIOError:
+                break
+            except OSError:
+                self.closed = True
+                break
+            self.unsent = self.unsent[sent:]
+        if len(self.unsent) > MAX_BUFFERED:
+            self.closed = True
+
+    def poll(self):
+        """Messages received since the last poll"""
+        self.flush()
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b''
+            if not data:
+                self.closed = True
+                break
+            self.buffer += data
+        *lines, self.buffer = self.buffer.split(b'\n')
+        return [json.loads(line) for line in lines if line]
+
+    def close(self):
+        self.sock.close()
+
+
+# Load test
+
+async def bot(host, port, rng, stop):
+    """One player pressing a random key a few times a second, rejoining after every match"""
+    reader, writer = await asyncio.open_connection(host, port)
+    join = encode({'t': 'join'})
+    writer.write(join)
+
+    async def read():
+        # Only scanned for the end of a match; never parsed
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return
+            if b'"t":"end"' in data:
+                writer.write(join)
+
+    reading = asyncio.create_task(read())
+    try:
+        while not stop.is_set() and not reading.done():
+            await asyncio.sleep(rng.uniform(0.1, 0.4))
+            writer.write(encode({'t': 'input', 'a': [rng.choice(ACTIONS)]}))
+    finally:
+        reading.cancel()
+        writer.close()
+
+
+async def request_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode({'t': 'stats'}))
+    line = await reader.readline()
+    writer.close()
+    return json.loads(line)
+
+
+async def load_test(match_counts, seconds, tick_rate, seed=0):
+    process = subprocess.Popen([sys.executable, __file__, 'serve', '--port', '0', '--tick-rate', str(tick_rate)],
+                               stdout=subprocess.PIPE, text=True)
+    try:
+        host, port = process.stdout.readline().split()[-1].rsplit(':', 1)
+        port = int(port)
+        rng = random.Random(seed)
+        stop = asyncio.Event()
+        bots = []
+        budget_ms = 1000 / tick_rate
+        results = []
+        print(f"{'matches':>8} {'tick rate':>10} {'late':>7} {'tick ms':>8} {'p99 ms':>8} {'server cpu':>11}")
+        for matches in match_counts:
+            while len(bots) < 2 * matches:
+                bots.append(asyncio.create_task(bot(host, port, random.Random(rng.random()), stop)))
+                if len(bots) % 50 == 0:
+                    await asyncio.sleep(0.01)
+            await asyncio.sleep(1.0)
+            before = await request_stats(host, port)
+            await asyncio.sleep(seconds)
+            after = await request_stats(host, port)
+
+            wall = after['wall_s'] - before['wall_s']
+            ticks = after['ticks'] - before['ticks']
+            late = (after['late_ticks'] - before['late_ticks']) / max(1, ticks)
+            cpu = (after['cpu_s'] - before['cpu_s']) / wall
+            results.append((after['matches'], after['tick_ms_mean'], cpu))
+            print(f"{after['matches']:>8} {ticks / wall:>10.1f} {late:>7.1%} {after['tick_ms_mean']:>8.2f} "
+                  f"{after['tick_ms_p99']:>8.2f} {cpu:>11.0%}")
+
+        # Capacity from the largest load measured: the tick work alone, and the whole server process
+        hosted, tick_ms, cpu = results[-1]
+        if hosted and tick_ms and cpu:
+            per_match = tick_ms / hosted
+            print(f"{per_match * 1000:.1f} us of tick work per match: {budget_ms / per_match:,.0f} matches per core "
+                  f"at {tick_rate} Hz; {hosted / cpu:,.0f} counting socket I/O")
+        stop.set()
+        await asyncio.gather(*bots, return_exceptions=True)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help='run a match server')
+    serve_parser.add_argument('--host', default=HOST)
+    serve_parser.add_argument('--port', type=int, default=PORT)
+    serve_parser.add_argument('--tick-rate', type=int, default=TICK_RATE)
+    load_parser = commands.add_parser('loadtest', help='measure how many matches a server process can host')
+    load_parser.add_argument('--matches', default='50,100,200,400', help='comma-separated match counts')
+    load_parser.add_argument('--seconds', type=float, default=5.0, help='measuring time per match count')
+    load_parser.add_argument('--tick-rate', type=int, default=TICK_RATE)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args.host, args.port, args.tick_rate))
+        except KeyboardInterrupt:
+            pass
+    else:
+        counts = [int(count) for count in args.matches.split(',')]
+        asyncio.run(load_test(counts, args.seconds, args.tick_rate))
+
+
+if __name__ == '__main__':
+    main()